@@ -1,101 +1,208 @@
-from flask import Flask, jsonify, request
+import hmac
+import json
+import os
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from utils.data_loader import ClimateDataLoader
-from utils.metric_mapper import get_metric_name, get_available_metrics, get_nasa_metric_name
+from utils.metric_mapper import get_metric_name, get_available_metrics, get_nasa_metric_name, get_indicators
+from utils.response_cache import ResponseCache, normalize_params, request_cache_key
+from utils.reloader import DataReloader
+from utils.export import EXPORT_FORMATS, encode_export
+from utils.spatial import parse_bbox
+from utils.instrumentation import SamplingProfiler, record_error, record_request, registry
 
 app = Flask(__name__)
 CORS(app)
-loader = ClimateDataLoader()
+BATCH_MAX_QUERIES = 50
+BATCH_EXCLUDED_ENDPOINTS = {'batch', 'export', 'admin_reload', 'admin_profiler', 'metrics', 'health', 'ready', 'static'}
+LOADER_FREE_ENDPOINTS = {'admin_reload', 'admin_profiler', 'metrics', 'health', 'ready', 'static'}
+
+data_reloader = DataReloader(ClimateDataLoader)
+response_cache = ResponseCache()
+profiler = SamplingProfiler(
+    os.environ.get('CLIMATEPULSE_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'climatepulse-profiles')),
+    slow_ms=float(os.environ.get('CLIMATEPULSE_PROFILE_SLOW_MS', 500))
+)
+
+def start_background_tasks():
+    watch_interval = float(os.environ.get('CLIMATEPULSE_WATCH_INTERVAL', 0))
+    if watch_interval > 0:
+        data_reloader.watch(watch_interval)
+    if os.environ.get('CLIMATEPULSE_PROFILE') == '1':
+        profiler.configure(enabled=True)
+
+def route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profile_token = profiler.start_request()
+
+@app.before_request
+def wait_for_loader():
+    # until the first build finishes there is no loader to answer from
+    if request.endpoint not in LOADER_FREE_ENDPOINTS | {None} and not data_reloader.ready():
+        return jsonify(data_reloader.status), 503
+
+@app.after_request
+def record_request_timing(response):
+    duration = time.perf_counter() - g.request_start
+    record_request(route_label(), request.method, response.status_code, duration, response.content_length)
+    profiler.finish_request(g.profile_token, duration, f'{request.method} {request.path}')
+    return response
+
+def error_response(e, status=400):
+    record_error(route_label(), e)
+    # bad parameters surface as ValueError; anything else keeps its traceback
+    app.logger.warning('%s %s failed: %s', request.method, request.full_path, e,
+                       exc_info=None if isinstance(e, ValueError) else e)
+    return jsonify({'error': str(e)}), status
+
+def admin_forbidden():
+    # admin routes stay closed until a token is configured
+    token = os.environ.get('CLIMATEPULSE_ADMIN_TOKEN')
+    presented = request.headers.get('X-Admin-Token', '')
+    return not token or not hmac.compare_digest(presented.encode(), token.encode())
+
+def cached_json(build, loader):
+    return response_cache.respond(request_cache_key(), build, loader)
+
+def series_window():
+    return {
+        'year_from': request.args.get('from', type=int),
+        'year_to': request.args.get('to', type=int),
+        'max_points': request.args.get('max_points', type=int)
+    }
 
 @app.route('/api/metrics', methods=['GET'])
 def list_metrics():
-    return jsonify({
+    return cached_json(lambda: {
         'metrics': get_available_metrics(),
         'default': 'co2'
-    })
+    }, data_reloader.loader)
+
+@app.route('/api/indicators', methods=['GET'])
+def list_indicators():
+    source = request.args.get('source')
+    return cached_json(lambda: get_indicators(source), data_reloader.loader)
 
 @app.route('/api/nasa', methods=['GET'])
 def nasa_global_data():
-    return jsonify(loader.nasa_data)
+    loader = data_reloader.loader
+    return cached_json(lambda: loader.nasa_data, loader)
 
 @app.route('/api/nasa/<metric_key>', methods=['GET'])
 def nasa_metric_data(metric_key):
-    try:
-        years, values = loader.get_global_data_by_metric(metric_key)
-        return jsonify({
+    loader = data_reloader.loader
+    window = series_window()
+
+    def build():
+        years, values = loader.get_global_data_by_metric(metric_key, **window)
+        return {
             'years': years,
             'values': values,
             'metric': get_nasa_metric_name(metric_key)
-        })
+        }
+
+    try:
+        return cached_json(build, loader)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
     
 @app.route('/api/countries', methods=['GET'])
 def country_list():
-    return jsonify(loader.get_country_names())
+    loader = data_reloader.loader
+    return cached_json(loader.get_country_names, loader)
 
 @app.route('/api/wb/metric', methods=['GET'])
 def wb_metric():
+    loader = data_reloader.loader
     metric = request.args.get('metric')
     country = request.args.get('country')
     
     if not metric:
         return jsonify({'error': 'Metric parameter is required'}), 400
+    window = series_window()
     
-    if country:
-        years, values = loader.get_local_data_by_metric(metric, country)
-        if years is None:
-            return jsonify({'error': 'Data not found'}), 404
-        return jsonify({
-            'years': years,
-            'values': values,
-            'country': country,
-            'metric': get_metric_name(metric)
-        })
-    else:
-        data = loader.get_local_data_by_metric(metric)
-        return jsonify(data)
+    def build():
+        if country:
+            years, values = loader.get_local_data_by_metric(metric, country, **window)
+            if years is None:
+                return {'error': 'Data not found'}, 404
+            return {
+                'years': years,
+                'values': values,
+                'country': loader.countries.canonical(country),
+                'metric': get_metric_name(metric)
+            }
+        return loader.get_local_data_by_metric(metric, **window)
+
+    try:
+        return cached_json(build, loader)
+    except Exception as e:
+        return error_response(e)
 
 @app.route('/api/wb/country', methods=['GET'])
 def wb_country():
+    loader = data_reloader.loader
     country = request.args.get('country')
     metric = request.args.get('metric')
     
     if not country:
         return jsonify({'error': 'Country parameter is required'}), 400
+    window = series_window()
     
-    if metric:
-        years, values = loader.get_local_data_by_country(country, metric)
-        if years is None:
-            return jsonify({'error': 'Data not found'}), 404
-        return jsonify({
-            'years': years,
-            'values': values,
-            'country': country,
-            'metric': get_metric_name(metric)
-        })
-    else:
-        data = loader.get_local_data_by_country(country)
-        return jsonify(data)
+    def build():
+        if metric:
+            years, values = loader.get_local_data_by_country(country, metric, **window)
+            if years is None:
+                return {'error': 'Data not found'}, 404
+            return {
+                'years': years,
+                'values': values,
+                'country': loader.countries.canonical(country),
+                'metric': get_metric_name(metric)
+            }
+        return loader.get_local_data_by_country(country, **window)
+
+    try:
+        return cached_json(build, loader)
+    except Exception as e:
+        return error_response(e)
 
 @app.route('/api/top/<metric_key>', methods=['GET'])
 def top_countries(metric_key):
+    loader = data_reloader.loader
     try:
         limit = int(request.args.get('limit', 10))
         ascending = request.args.get('ascending', 'false').lower() == 'true'
+        aggregate = request.args.get('aggregate', 'mean')
+        year = request.args.get('year', type=int)
+        year_from = request.args.get('from', type=int)
+        year_to = request.args.get('to', type=int)
         
-        results = loader.get_top_countries_by_metric(
+        return cached_json(lambda: loader.get_top_countries_by_metric(
             metric_key,
             limit=limit,
-            ascending=ascending
-        )
-        return jsonify(results)
+            ascending=ascending,
+            aggregate=aggregate,
+            year=year,
+            year_from=year_from,
+            year_to=year_to
+        ), loader)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
 
 @app.route('/api/country/<country_name>/metrics', methods=['GET'])
 def country_metrics(country_name):
-    try:
+    loader = data_reloader.loader
+
+    def build():
         # NASA global data
         temp_years, temp_values = loader.get_global_data_by_metric('temperature')
         co2_years, co2_values = loader.get_global_data_by_metric('co2')
@@ -103,7 +210,7 @@ def country_metrics(country_name):
         # country-specific data
         country_data = loader.get_local_data_by_country(country_name)
         
-        return jsonify({
+        return {
             'global': {
                 'temperature': {
                     'years': temp_years,
@@ -115,39 +222,278 @@ def country_metrics(country_name):
                 }
             },
             'country': {
-                'name': country_name,
+                'name': loader.countries.canonical(country_name) or country_name,
                 'metrics': country_data,
-                'metadata': loader.country_metadata.get(country_name, {})
+                'metadata': loader.get_country_metadata(country_name)
             }
-        })
+        }
+
+    try:
+        return cached_json(build, loader)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
+
 
+@app.route('/api/map', methods=['GET'])
+def map_data():
+    loader = data_reloader.loader
+    try:
+        metric = request.args.get('metric', 'co2')
+        year = request.args.get('year', type=int)
+        bbox = request.args.get('bbox')
+        bbox = parse_bbox(bbox) if bbox else None
+        return cached_json(lambda: loader.get_map_data(metric, year, bbox), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/map/classes', methods=['GET'])
+def map_classes():
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_map_classes(
+            request.args.get('metric', 'co2'),
+            year=request.args.get('year', type=int),
+            method=request.args.get('method', 'quantile')
+        ), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/map/nearest', methods=['GET'])
+def nearest_countries():
+    loader = data_reloader.loader
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lon'])
+        k = request.args.get('k', 1, type=int)
+        return cached_json(lambda: loader.get_nearest_countries(latitude, longitude, k), loader)
+    except KeyError:
+        return error_response(ValueError('lat and lon parameters are required'))
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/analytics/correlations', methods=['GET'])
+def correlations():
+    loader = data_reloader.loader
+    try:
+        metrics = request.args.get('metrics')
+        return cached_json(lambda: loader.get_correlations(
+            metrics.split(',') if metrics else None,
+            year_from=request.args.get('from', type=int),
+            year_to=request.args.get('to', type=int),
+            by_year=request.args.get('by') == 'year'
+        ), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/analytics/trends/<metric_key>', methods=['GET'])
+def trend_slopes(metric_key):
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_trend_slopes(
+            metric_key,
+            year_from=request.args.get('from', type=int),
+            year_to=request.args.get('to', type=int)
+        ), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/analytics/yoy/<metric_key>', methods=['GET'])
+def year_over_year(metric_key):
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_year_over_year(
+            metric_key,
+            country=request.args.get('country'),
+            year_from=request.args.get('from', type=int),
+            year_to=request.args.get('to', type=int)
+        ), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/regions', methods=['GET'])
+def regions():
+    loader = data_reloader.loader
+    try:
+        return cached_json(loader.get_regions, loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/rollups/<metric_key>', methods=['GET'])
+def rollups(metric_key):
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_rollups(
+            metric_key,
+            region=request.args.get('region'),
+            year_from=request.args.get('from', type=int),
+            year_to=request.args.get('to', type=int)
+        ), loader)
+    except Exception as e:
+        return error_response(e)
 
 @app.route('/api/predict/<n_years>', methods=['GET'])
 def predict_endpoint(n_years):
     try:
-        predictions = loader.get_predictions(n_years)
+        predictions = data_reloader.loader.get_predictions(n_years, request.args.get('model', 'polynomial'))
         return jsonify(predictions)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
+
+@app.route('/api/forecast/<metric_key>', methods=['GET'])
+def forecast(metric_key):
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_forecast(
+            metric_key,
+            country=request.args.get('country'),
+            model=request.args.get('model', 'polynomial'),
+            n_years=request.args.get('years', 10, type=int)
+        ), loader)
+    except Exception as e:
+        return error_response(e)
     
 @app.route('/api/countries_data', methods=['GET'])
 def countries_data():
+    loader = data_reloader.loader
     try:
-        countries_data = loader.load_country_metadata()
-        return jsonify(countries_data)
+        return cached_json(lambda: loader.country_metadata, loader)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
     
+@app.route('/api/balance', methods=['GET'])
+def get_balance_range():
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_forest_data_range(
+            request.args.get('from'),
+            request.args.get('to')
+        ), loader)
+    except Exception as e:
+        return error_response(e)
+
 @app.route('/api/balance/<year>', methods=['GET'])
 def get_balance_data(year):
+    loader = data_reloader.loader
+    try:
+        return cached_json(lambda: loader.get_forest_data(year), loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/export', methods=['GET'])
+def export():
+    loader = data_reloader.loader
+    source = request.args.get('source', 'worldbank')
+    export_format = request.args.get('format', 'ndjson')
     try:
-        data = loader.get_forest_data(year)
-        return jsonify(data)
+        chunks = loader.iter_export_chunks(
+            source,
+            metric=request.args.get('metric'),
+            country=request.args.get('country'),
+            year_from=request.args.get('from', type=int),
+            year_to=request.args.get('to', type=int)
+        )
+        body = encode_export(source, chunks, export_format)
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return error_response(e)
+
+    # no Content-Length, so the body goes out chunked as it is generated
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=climatepulse-{source}.{extension}'
+    })
+
+def parse_batch_query(query):
+    if isinstance(query, str):
+        url = urlsplit(query)
+        path, params = url.path, parse_qsl(url.query)
+    else:
+        path, params = query.get('path', ''), (query.get('params') or {}).items()
+    return path, normalize_params((key, str(value)) for key, value in params)
+
+def run_batch_query(path, params):
+    try:
+        endpoint, view_args = app.url_map.bind('localhost').match(path, method='GET')
+    except HTTPException as e:
+        return e.code, json.dumps({'error': e.name}).encode()
+    if endpoint in BATCH_EXCLUDED_ENDPOINTS:
+        return 400, json.dumps({'error': 'Endpoint not allowed in a batch'}).encode()
+
+    with app.test_request_context(path, query_string=list(params)):
+        response = app.make_response(app.view_functions[endpoint](**view_args))
+    return response.status_code, response.get_data()
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+def batch():
+    if request.method == 'POST':
+        queries = (request.get_json(silent=True) or {}).get('queries', [])
+    else:
+        queries = request.args.getlist('q')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'At least one query is required'}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({'error': f'At most {BATCH_MAX_QUERIES} queries per batch'}), 400
+
+    def build():
+        # identical sub-queries run once; their JSON bodies are spliced in as is
+        parsed = [parse_batch_query(query) for query in queries]
+        results = {key: run_batch_query(*key) for key in dict.fromkeys(parsed)}
+        parts = []
+        for path, params in parsed:
+            status, body = results[(path, params)]
+            label = path + ('?' + urlencode(params) if params else '')
+            parts.append(b'{"query":%s,"status":%d,"data":%s}' % (json.dumps(label).encode(), status, body))
+        return b'{"results":[' + b','.join(parts) + b']}'
+
+    try:
+        if request.method == 'POST':
+            return app.response_class(build(), mimetype='application/json')
+        return cached_json(build, data_reloader.loader)
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    if admin_forbidden():
+        return jsonify({'error': 'Forbidden'}), 403
+
+    if request.method == 'POST':
+        started = data_reloader.request_reload()
+        return jsonify(dict(data_reloader.status, started=started, scope=data_reloader.scope())), 202
+    return jsonify(data_reloader.status)
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST'])
+def admin_profiler():
+    if admin_forbidden():
+        return jsonify({'error': 'Forbidden'}), 403
+
+    if request.method == 'POST':
+        settings = request.get_json(silent=True) or {}
+        try:
+            return jsonify(profiler.configure(
+                enabled=settings.get('enabled'),
+                slow_ms=settings.get('slow_ms'),
+                interval_ms=settings.get('interval_ms')
+            ))
+        except Exception as e:
+            return error_response(e)
+    return jsonify(profiler.status())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    if not data_reloader.ready():
+        return jsonify(data_reloader.status), 503
+    return jsonify(data_reloader.status)
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # development server only, production runs gunicorn with gunicorn.conf.py
+    start_background_tasks()
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG', '1') == '1')
@@ -0,0 +1,475 @@
+import asyncio
+import hmac
+import json
+import os
+import re
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from aiohttp import web
+from utils.data_loader import ClimateDataLoader
+from utils.metric_mapper import get_metric_name, get_available_metrics, get_nasa_metric_name, get_indicators
+from utils.response_cache import CachedResponse, ResponseCache, normalize_params
+from utils.reloader import DataReloader
+from utils.compute_pool import ComputePool, encode_json
+from utils.export import EXPORT_FORMATS, encode_export
+from utils.spatial import parse_bbox
+from utils.instrumentation import record_error, record_request, registry
+
+# asyncio front with the same routes as app.py: in-memory getters answer on the
+# event loop, CPU-heavy ones go to a bounded process pool
+#   python backend/async_app.py
+#   gunicorn --chdir backend async_app:app --worker-class aiohttp.GunicornWebWorker
+BATCH_MAX_QUERIES = 50
+LOADER_FREE_PATHS = {'/api/admin/reload', '/api/health', '/api/ready', '/metrics'}
+POOL_WORKERS = int(os.environ.get('CLIMATEPULSE_POOL_WORKERS', 2))
+POOL_MAX_PENDING = int(os.environ.get('CLIMATEPULSE_POOL_MAX_PENDING', 64))
+
+data_reloader = DataReloader(ClimateDataLoader)
+response_cache = ResponseCache()
+routes = []
+
+
+def route(path, batchable=True):
+    def register(handler):
+        pattern = re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', path) + '$')
+        routes.append((path, pattern, handler, batchable))
+        return handler
+    return register
+
+
+def query_int(query, name, default=None):
+    value = query.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def series_window(query):
+    return {
+        'year_from': query_int(query, 'from'),
+        'year_to': query_int(query, 'to'),
+        'max_points': query_int(query, 'max_points')
+    }
+
+
+async def run_heavy(request_app, getter, *args):
+    # the pool returns encoded JSON so large payloads are not pickled as objects
+    generation = data_reloader.status.get('loaded_at')
+    return await request_app['compute_pool'].run(generation, getter, *args)
+
+
+async def resolve_entry(request_app, handler, loader, path, query, match_info):
+    key = (path, normalize_params(query.items()))
+    entry = response_cache.lookup(key, loader)
+    if entry is not None:
+        return entry
+
+    try:
+        result = await handler(request_app, loader, query, **match_info)
+    except Exception as e:
+        record_error(path, e)
+        return CachedResponse(encode_json({'error': str(e)}), 400)
+    data, status = result if isinstance(result, tuple) else (result, 200)
+    entry = CachedResponse(data if isinstance(data, bytes) else encode_json(data), status)
+    if status == 200:
+        entry.add_compressed_variants(response_cache.min_compress_size)
+        response_cache.store(key, entry, loader)
+    return entry
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def entry_response(request, entry):
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding = next(
+        (name for name in ('br', 'gzip') if name in entry.variants and (name in accepted or '*' in accepted)),
+        'identity'
+    )
+    headers = {}
+    if len(entry.variants) > 1:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if entry.status == 200:
+        etags = {etag.value for etag in request.if_none_match or ()}
+        if any(entry.variant_etag(name) in etags for name in entry.variants):
+            response = web.Response(status=304, headers=headers)
+            response.etag = entry.variant_etag(encoding)
+            return response
+        headers['Cache-Control'] = 'no-cache'
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+
+    response = web.Response(
+        body=entry.variants[encoding], status=entry.status, content_type='application/json', headers=headers
+    )
+    if entry.status == 200:
+        response.etag = entry.variant_etag(encoding)
+    return response
+
+
+def make_view(handler):
+    async def view(request):
+        entry = await resolve_entry(
+            request.app, handler, data_reloader.loader, request.path, request.query, request.match_info
+        )
+        return entry_response(request, entry)
+    return view
+
+
+@route('/api/metrics')
+async def list_metrics(request_app, loader, query):
+    return {
+        'metrics': get_available_metrics(),
+        'default': 'co2'
+    }
+
+@route('/api/indicators')
+async def list_indicators(request_app, loader, query):
+    return get_indicators(query.get('source'))
+
+@route('/api/nasa')
+async def nasa_global_data(request_app, loader, query):
+    return loader.nasa_data
+
+@route('/api/nasa/{metric_key}')
+async def nasa_metric_data(request_app, loader, query, metric_key):
+    years, values = loader.get_global_data_by_metric(metric_key, **series_window(query))
+    return {
+        'years': years,
+        'values': values,
+        'metric': get_nasa_metric_name(metric_key)
+    }
+
+@route('/api/countries')
+async def country_list(request_app, loader, query):
+    return loader.get_country_names()
+
+@route('/api/wb/metric')
+async def wb_metric(request_app, loader, query):
+    metric = query.get('metric')
+    country = query.get('country')
+    if not metric:
+        raise ValueError('Metric parameter is required')
+
+    if country:
+        years, values = loader.get_local_data_by_metric(metric, country, **series_window(query))
+        if years is None:
+            return {'error': 'Data not found'}, 404
+        return {
+            'years': years,
+            'values': values,
+            'country': loader.countries.canonical(country),
+            'metric': get_metric_name(metric)
+        }
+    return loader.get_local_data_by_metric(metric, **series_window(query))
+
+@route('/api/wb/country')
+async def wb_country(request_app, loader, query):
+    country = query.get('country')
+    metric = query.get('metric')
+    if not country:
+        raise ValueError('Country parameter is required')
+
+    if metric:
+        years, values = loader.get_local_data_by_country(country, metric, **series_window(query))
+        if years is None:
+            return {'error': 'Data not found'}, 404
+        return {
+            'years': years,
+            'values': values,
+            'country': loader.countries.canonical(country),
+            'metric': get_metric_name(metric)
+        }
+    return loader.get_local_data_by_country(country, **series_window(query))
+
+@route('/api/top/{metric_key}')
+async def top_countries(request_app, loader, query, metric_key):
+    return loader.get_top_countries_by_metric(
+        metric_key,
+        limit=int(query.get('limit', 10)),
+        ascending=query.get('ascending', 'false').lower() == 'true',
+        aggregate=query.get('aggregate', 'mean'),
+        year=query_int(query, 'year'),
+        year_from=query_int(query, 'from'),
+        year_to=query_int(query, 'to')
+    )
+
+@route('/api/country/{country_name}/metrics')
+async def country_metrics(request_app, loader, query, country_name):
+    temp_years, temp_values = loader.get_global_data_by_metric('temperature')
+    co2_years, co2_values = loader.get_global_data_by_metric('co2')
+    return {
+        'global': {
+            'temperature': {
+                'years': temp_years,
+                'values': temp_values
+            },
+            'co2': {
+                'years': co2_years,
+                'values': co2_values
+            }
+        },
+        'country': {
+            'name': loader.countries.canonical(country_name) or country_name,
+            'metrics': loader.get_local_data_by_country(country_name),
+            'metadata': loader.get_country_metadata(country_name)
+        }
+    }
+
+@route('/api/map')
+async def map_data(request_app, loader, query):
+    bbox = query.get('bbox')
+    return loader.get_map_data(query.get('metric', 'co2'), query_int(query, 'year'), parse_bbox(bbox) if bbox else None)
+
+@route('/api/map/classes')
+async def map_classes(request_app, loader, query):
+    return loader.get_map_classes(
+        query.get('metric', 'co2'), year=query_int(query, 'year'), method=query.get('method', 'quantile')
+    )
+
+@route('/api/map/nearest')
+async def nearest_countries(request_app, loader, query):
+    if 'lat' not in query or 'lon' not in query:
+        raise ValueError('lat and lon parameters are required')
+    return loader.get_nearest_countries(float(query['lat']), float(query['lon']), query_int(query, 'k', 1))
+
+@route('/api/analytics/correlations')
+async def correlations(request_app, loader, query):
+    metrics = query.get('metrics')
+    return loader.get_correlations(
+        metrics.split(',') if metrics else None,
+        year_from=query_int(query, 'from'),
+        year_to=query_int(query, 'to'),
+        by_year=query.get('by') == 'year'
+    )
+
+@route('/api/analytics/trends/{metric_key}')
+async def trend_slopes(request_app, loader, query, metric_key):
+    return loader.get_trend_slopes(metric_key, year_from=query_int(query, 'from'), year_to=query_int(query, 'to'))
+
+@route('/api/analytics/yoy/{metric_key}')
+async def year_over_year(request_app, loader, query, metric_key):
+    return loader.get_year_over_year(
+        metric_key, country=query.get('country'), year_from=query_int(query, 'from'), year_to=query_int(query, 'to')
+    )
+
+@route('/api/regions')
+async def regions(request_app, loader, query):
+    return loader.get_regions()
+
+@route('/api/rollups/{metric_key}')
+async def rollups(request_app, loader, query, metric_key):
+    return loader.get_rollups(
+        metric_key, region=query.get('region'), year_from=query_int(query, 'from'), year_to=query_int(query, 'to')
+    )
+
+@route('/api/predict/{n_years}')
+async def predict_endpoint(request_app, loader, query, n_years):
+    return await run_heavy(request_app, 'get_predictions', int(n_years), query.get('model', 'polynomial'))
+
+@route('/api/forecast/{metric_key}')
+async def forecast(request_app, loader, query, metric_key):
+    args = (metric_key, query.get('country'), query.get('model', 'polynomial'), query_int(query, 'years', 10))
+    # a lookup in a precomputed table is cheap; a fit never runs on the event loop
+    if loader.has_forecast_table(metric_key):
+        return loader.get_forecast(*args)
+    return await run_heavy(request_app, 'get_forecast', *args)
+
+@route('/api/countries_data')
+async def countries_data(request_app, loader, query):
+    return loader.country_metadata
+
+@route('/api/balance')
+async def get_balance_range(request_app, loader, query):
+    return await run_heavy(request_app, 'get_forest_data_range', query.get('from'), query.get('to'))
+
+@route('/api/balance/{year}')
+async def get_balance_data(request_app, loader, query, year):
+    return await run_heavy(request_app, 'get_forest_data', year)
+
+
+def parse_batch_query(query):
+    if isinstance(query, str):
+        url = urlsplit(query)
+        path, params = url.path, parse_qsl(url.query)
+    else:
+        path, params = query.get('path', ''), (query.get('params') or {}).items()
+    return path, normalize_params((key, str(value)) for key, value in params)
+
+async def run_batch_query(request_app, loader, path, params):
+    for _, pattern, handler, batchable in routes:
+        match = pattern.match(path)
+        if match:
+            break
+    else:
+        return 404, encode_json({'error': 'Not Found'})
+    if not batchable:
+        return 400, encode_json({'error': 'Endpoint not allowed in a batch'})
+
+    entry = await resolve_entry(request_app, handler, loader, path, dict(params), match.groupdict())
+    return entry.status, entry.variants['identity']
+
+@route('/api/batch', batchable=False)
+async def batch(request_app, loader, query, queries=None):
+    if queries is None:
+        queries = query.getall('q', [])
+    if not isinstance(queries, list) or not queries:
+        raise ValueError('At least one query is required')
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f'At most {BATCH_MAX_QUERIES} queries per batch')
+
+    # identical sub-queries run once; their JSON bodies are spliced in as is
+    parsed = [parse_batch_query(q) for q in queries]
+    unique = list(dict.fromkeys(parsed))
+    results = dict(zip(unique, await asyncio.gather(
+        *(run_batch_query(request_app, loader, path, params) for path, params in unique)
+    )))
+    parts = []
+    for path, params in parsed:
+        status, body = results[(path, params)]
+        label = path + ('?' + urlencode(params) if params else '')
+        parts.append(b'{"query":%s,"status":%d,"data":%s}' % (json.dumps(label).encode(), status, body))
+    return b'{"results":[' + b','.join(parts) + b']}'
+
+async def batch_post(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    queries = (payload if isinstance(payload, dict) else {}).get('queries', [])
+    loader = data_reloader.loader
+    try:
+        result = await batch(request.app, loader, {}, queries=queries)
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=400)
+    return web.Response(body=result, content_type='application/json')
+
+
+async def export(request):
+    loader = data_reloader.loader
+    source = request.query.get('source', 'worldbank')
+    export_format = request.query.get('format', 'ndjson')
+    try:
+        chunks = loader.iter_export_chunks(
+            source,
+            metric=request.query.get('metric'),
+            country=request.query.get('country'),
+            year_from=query_int(request.query, 'from'),
+            year_to=query_int(request.query, 'to')
+        )
+        body = encode_export(source, chunks, export_format)
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=400)
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = web.StreamResponse(headers={
+        'Content-Type': mimetype,
+        'Content-Disposition': f'attachment; filename=climatepulse-{source}.{extension}'
+    })
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    for part in body:
+        await response.write(part)
+    await response.write_eof()
+    return response
+
+
+def admin_forbidden(request):
+    # admin routes stay closed until a token is configured
+    token = os.environ.get('CLIMATEPULSE_ADMIN_TOKEN')
+    presented = request.headers.get('X-Admin-Token', '')
+    return not token or not hmac.compare_digest(presented.encode(), token.encode())
+
+async def admin_reload(request):
+    if admin_forbidden(request):
+        return web.json_response({'error': 'Forbidden'}, status=403)
+
+    if request.method == 'POST':
+        started = data_reloader.request_reload()
+        return web.json_response(dict(data_reloader.status, started=started, scope=data_reloader.scope()), status=202)
+    return web.json_response(data_reloader.status)
+
+async def health(request):
+    return web.json_response({'status': 'ok'})
+
+async def ready(request):
+    if not data_reloader.ready():
+        return web.json_response(data_reloader.status, status=503)
+    return web.json_response(data_reloader.status)
+
+
+async def metrics(request):
+    return web.Response(body=registry.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+
+@web.middleware
+async def wait_for_loader(request, handler):
+    # until the first build finishes there is no loader to answer from
+    if request.path not in LOADER_FREE_PATHS and request.match_info.route.resource is not None \
+            and not data_reloader.ready():
+        return web.json_response(data_reloader.status, status=503)
+    return await handler(request)
+
+@web.middleware
+async def cors(request, handler):
+    response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+def route_label(request):
+    resource = request.match_info.route.resource
+    return resource.canonical if resource is not None else 'unmatched'
+
+@web.middleware
+async def timing(request, handler):
+    start = time.perf_counter()
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        record_request(route_label(request), request.method, e.status, time.perf_counter() - start, 0)
+        raise
+    record_request(route_label(request), request.method, response.status, time.perf_counter() - start,
+                   response.content_length)
+    return response
+
+async def start_compute_pool(request_app):
+    request_app['compute_pool'] = ComputePool(POOL_WORKERS, POOL_MAX_PENDING)
+    watch_interval = float(os.environ.get('CLIMATEPULSE_WATCH_INTERVAL', 0))
+    if watch_interval > 0:
+        data_reloader.watch(watch_interval)
+
+async def stop_compute_pool(request_app):
+    request_app['compute_pool'].shutdown()
+
+def create_app():
+    request_app = web.Application(middlewares=[timing, cors, wait_for_loader])
+    for path, _, handler, _ in routes:
+        request_app.router.add_get(path, make_view(handler))
+    request_app.router.add_post('/api/batch', batch_post)
+    request_app.router.add_get('/api/export', export)
+    request_app.router.add_route('*', '/api/admin/reload', admin_reload)
+    # no /api/admin/profiler: the sampler charges a thread's stacks to the request
+    # running on it, and here every request shares the event loop thread while
+    # the heavy work runs in the compute pool's processes
+    request_app.router.add_get('/api/health', health)
+    request_app.router.add_get('/api/ready', ready)
+    request_app.router.add_get('/metrics', metrics)
+    request_app.on_startup.append(start_compute_pool)
+    request_app.on_cleanup.append(stop_compute_pool)
+    return request_app
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    web.run_app(app, host='0.0.0.0', port=int(os.environ.get('CLIMATEPULSE_ASYNC_PORT', 5001)))
@@ -0,0 +1,10 @@
+import time
+from utils.data_loader import ClimateDataLoader
+from utils.snapshot import write_snapshot
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    loader = ClimateDataLoader(use_snapshot=False)
+    write_snapshot(loader.snapshot_path, loader, loader.source_paths())
+    print(f"Snapshot with {len(loader.wb_store)} World Bank records written to {loader.snapshot_path} "
+          f"in {time.perf_counter() - start:.2f}s")
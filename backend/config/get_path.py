@@ -4,8 +4,17 @@ def get_root_directory():
     file_path = os.path.abspath(__file__)
     return os.path.dirname(os.path.dirname(os.path.dirname(file_path)))
 
+def get_indicators_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicators.json')
+
+def get_country_aliases_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'country_aliases.json')
+
 def get_data_path():
-    return os.path.join(get_root_directory(), 'data')
+    return os.environ.get('CLIMATEPULSE_DATA_DIR') or os.path.join(get_root_directory(), 'data')
+
+def get_raw_data_path():
+    return os.environ.get('CLIMATEPULSE_RAW_DATA_DIR') or os.path.join(get_data_path(), 'raw')
 
 def get_country_data_path():
     return os.path.join(get_data_path(), 'countries_data.json')
@@ -18,3 +27,19 @@ def get_worldbank_data_path():
 
 def get_worldbank_csv_data_path():
     return os.path.join(get_data_path(), 'worldbank_data.csv')
+
+def get_nasa_csv_data_path():
+    return os.path.join(get_data_path(), 'nasa_data.csv')
+
+def get_etl_state_path():
+    return os.path.join(get_data_path(), '.etl_state.json')
+
+def get_snapshot_path():
+    return os.path.join(get_data_path(), 'snapshot')
+
+def get_reload_stamp_path():
+    return os.path.join(get_data_path(), '.reload_stamp')
+
+def get_file_fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,73 @@
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# run from the repository root with: gunicorn -c backend/gunicorn.conf.py app:app
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get('CLIMATEPULSE_BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('CLIMATEPULSE_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('CLIMATEPULSE_THREADS', 4))
+worker_class = 'gthread'
+
+# the loader is built once in the master and shared copy-on-write by the workers
+preload_app = True
+timeout = int(os.environ.get('CLIMATEPULSE_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('CLIMATEPULSE_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('CLIMATEPULSE_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('CLIMATEPULSE_LOG_LEVEL', 'info')
+
+# workers poll the data files and the reload stamp, so a new ETL run or a
+# POST /api/admin/reload to any one worker reaches all of them
+os.environ.setdefault('CLIMATEPULSE_WATCH_INTERVAL', '5')
+
+# every process writes its metrics here and /metrics adds them up
+metrics_dir = os.environ.get(
+    'CLIMATEPULSE_METRICS_DIR', os.path.join(tempfile.gettempdir(), f'climatepulse-metrics-{os.getpid()}')
+)
+metrics_flush_interval = float(os.environ.get('CLIMATEPULSE_METRICS_FLUSH_INTERVAL', 1))
+
+
+def on_starting(server):
+    # series left behind by an earlier server would be counted again
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def when_ready(server):
+    # the preload builds the loader in a background thread, which would not
+    # survive the fork; workers are only forked once it has finished
+    from app import data_reloader
+    data_reloader.wait()
+    # keep the preloaded objects out of the collector so refcount-only pages are
+    # not touched (and copied) by gc passes in the workers
+    gc.freeze()
+    # the master keeps what the preload recorded and, later, what exited workers
+    # recorded; it writes only when a worker exits, never from a thread, so no
+    # lock can be held across a fork
+    from utils.instrumentation import registry
+    registry.share(metrics_dir)
+
+
+def post_fork(server, worker):
+    # threads do not survive fork, per-worker background work starts here
+    from app import start_background_tasks
+    from utils.instrumentation import registry
+    registry.share(metrics_dir, interval=metrics_flush_interval, reset=True)
+    start_background_tasks()
+
+
+def worker_exit(server, worker):
+    from utils.instrumentation import registry
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from utils.instrumentation import registry
+    registry.absorb(worker.pid)
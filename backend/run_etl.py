@@ -0,0 +1,14 @@
+import argparse
+import time
+from utils.etl import run_etl
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the served data files and the snapshot from the raw spider outputs')
+    parser.add_argument('--force', action='store_true', help='rebuild every stage even if its inputs are unchanged')
+    parser.add_argument('--workers', type=int, help='processes for the per-indicator work (default: CPU count)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = run_etl(force=args.force, max_workers=args.workers)
+    print(f"ETL finished in {time.perf_counter() - start:.2f}s: "
+          + ', '.join(f"{stage} {outcome}" for stage, outcome in report.items()))
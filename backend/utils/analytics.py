@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class PanelCube:
+    # the World Bank table, or the given metrics of it, as a dense country x
+    # year x metric array, NaN where there is no observation; every statistic
+    # below is a reduction over it
+    def __init__(self, store, metrics=None):
+        self.countries = list(store.countries)
+        self.metrics = list(store.metrics if metrics is None else metrics)
+        partitions = [store.partition(metric) for metric in self.metrics]
+        all_years = np.concatenate([np.asarray(partition.years) for partition in partitions] or [np.empty(0)])
+        first, last = (int(all_years.min()), int(all_years.max())) if len(all_years) else (0, -1)
+        self.years = np.arange(first, last + 1)
+
+        self.values = np.full((len(self.countries), len(self.years), len(self.metrics)), np.nan)
+        for m, partition in enumerate(partitions):
+            years = np.asarray(partition.years, dtype=np.int64)
+            self.values[np.asarray(partition.country_codes), years - first, m] = partition.values
+
+    def window(self, year_from=None, year_to=None):
+        start = 0 if year_from is None else np.searchsorted(self.years, year_from, 'left')
+        end = len(self.years) if year_to is None else np.searchsorted(self.years, year_to, 'right')
+        return slice(start, end)
+
+
+def pairwise_correlations(x):
+    # Pearson r over pairwise-complete observations; x is (..., observations,
+    # metrics) and the leading axes are batched, e.g. one matrix per year
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    weights = valid.astype(np.float64)
+
+    n = np.einsum('...oi,...oj->...ij', weights, weights)
+    sum_x = np.einsum('...oi,...oj->...ij', filled, weights)
+    sum_xx = np.einsum('...oi,...oj->...ij', filled ** 2, weights)
+    sum_xy = np.einsum('...oi,...oj->...ij', filled, filled)
+
+    sum_y = np.swapaxes(sum_x, -1, -2)
+    sum_yy = np.swapaxes(sum_xx, -1, -2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = n * sum_xy - sum_x * sum_y
+        spread = np.sqrt((n * sum_xx - sum_x ** 2) * (n * sum_yy - sum_y ** 2))
+        r = np.clip(covariance / spread, -1.0, 1.0)
+    r[(n < 3) | ~(spread > 0)] = np.nan
+    return r, n.astype(np.int64)
+
+
+def trend_slopes(values, years):
+    # least-squares slope per series along the year axis, NaN with < 2 points;
+    # values is (countries, years, metrics)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    t = (years - years.mean() if len(years) else years).astype(np.float64)[None, :, None]
+
+    n = valid.sum(axis=1)
+    sum_t = (valid * t).sum(axis=1)
+    sum_tt = (valid * t ** 2).sum(axis=1)
+    sum_y = filled.sum(axis=1)
+    sum_ty = (filled * t).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+    slopes[n < 2] = np.nan
+    return slopes, n
+
+
+def year_over_year(values):
+    # change against the previous year along axis 1, absolute and relative
+    previous, current = values[:, :-1], values[:, 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(previous != 0, (current - previous) / np.abs(previous), np.nan)
+    return current - previous, relative
+
+
+def to_json_list(values, digits=6):
+    # NaN is not valid JSON, missing statistics are served as null
+    rounded = np.round(np.asarray(values, dtype=np.float64), digits)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
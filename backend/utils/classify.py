@@ -0,0 +1,74 @@
+import numpy as np
+from utils.instrumentation import timed
+
+CLASS_COUNT = 5
+JENKS_SAMPLE = 512
+
+
+def quantile_breaks(values, k):
+    return np.quantile(values, np.linspace(0, 1, k + 1))
+
+
+def equal_interval_breaks(values, k):
+    return np.linspace(values.min(), values.max(), k + 1)
+
+
+def jenks_breaks(values, k):
+    # Fisher's exact optimal partition of the sorted values: each pass extends
+    # the best (m - 1)-class split by one class over a full cost matrix, so
+    # large inputs are reduced to JENKS_SAMPLE evenly spaced order statistics
+    # first and memory stays bounded whatever the number of countries
+    values = np.sort(values)
+    if len(values) > JENKS_SAMPLE:
+        values = values[np.linspace(0, len(values) - 1, JENKS_SAMPLE).round().astype(np.int64)]
+    n = len(values)
+    k = min(k, n)
+    s1 = np.concatenate([[0.0], np.cumsum(values)])
+    s2 = np.concatenate([[0.0], np.cumsum(values ** 2)])
+    i, j = np.triu_indices(n)
+    size = j - i + 1
+    cost = np.full((n, n), np.inf)
+    # squared deviation of values[i..j] from its mean
+    cost[i, j] = np.maximum((s2[j + 1] - s2[i]) - (s1[j + 1] - s1[i]) ** 2 / size, 0)
+
+    best = cost[0]
+    starts = []
+    for _ in range(1, k):
+        # best[j] covers values[..j]; the new class starts at i and ends at j
+        totals = np.concatenate([[np.inf], best[:-1]])[:, None] + cost
+        starts.append(np.argmin(totals, axis=0))
+        best = totals[starts[-1], np.arange(n)]
+
+    uppers = [n - 1]
+    for start in reversed(starts):
+        uppers.append(start[uppers[-1]] - 1)
+    return np.concatenate([[values[0]], values[uppers[::-1]]])
+
+
+CLASSIFIERS = {
+    'quantile': quantile_breaks,
+    'equal_interval': equal_interval_breaks,
+    'jenks': jenks_breaks
+}
+
+
+def get_classifier(method):
+    if method not in CLASSIFIERS:
+        raise ValueError(f"Unknown classification '{method}', expected one of {', '.join(CLASSIFIERS)}")
+    return CLASSIFIERS[method]
+
+
+def assign_bins(values, breaks):
+    # class i holds (breaks[i], breaks[i + 1]], the first class also its lower bound
+    return np.searchsorted(breaks[1:-1], values, side='left')
+
+
+@timed('classify')
+def classify(values, method, k=CLASS_COUNT):
+    # breaks over the values that are present and each value's class as int8,
+    # -1 where the value is missing
+    present = ~np.isnan(values)
+    breaks = get_classifier(method)(values[present], k)
+    bins = np.full(len(values), -1, dtype=np.int8)
+    bins[present] = assign_bins(values[present], breaks)
+    return breaks, bins
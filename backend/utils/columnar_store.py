@@ -0,0 +1,195 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+
+class SeriesPartition:
+    # one indicator's (country, year) -> value rows as flat numpy columns sorted
+    # once by country and year, so every series is a contiguous slice;
+    # starts/ends[country] delimit the slice of that country's series
+    COLUMNS = ('country_codes', 'years', 'values', 'starts', 'ends')
+
+    def __init__(self, country_codes, years, values, starts, ends):
+        self.country_codes = country_codes
+        self.years = years
+        self.values = values
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_codes(cls, n_countries, country_codes, years, values):
+        order = np.lexsort((years, country_codes))
+        country_codes = np.asarray(country_codes, dtype=np.int32)[order]
+        years = np.asarray(years, dtype=np.int16)[order]
+        values = np.asarray(values, dtype=np.float64)[order]
+
+        # duplicated (country, year) rows: the last one read wins
+        if len(years):
+            same_as_next = (country_codes[1:] == country_codes[:-1]) & (years[1:] == years[:-1])
+            keep = np.append(~same_as_next, True)
+            country_codes, years, values = country_codes[keep], years[keep], values[keep]
+
+        all_countries = np.arange(n_countries)
+        starts = np.searchsorted(country_codes, all_countries, 'left')
+        ends = np.searchsorted(country_codes, all_countries, 'right')
+        return cls(country_codes, years, values, starts, ends)
+
+    def __len__(self):
+        return len(self.values)
+
+    def columns(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def has_series(self, c):
+        return self.ends[c] > self.starts[c]
+
+    def series(self, c):
+        start, end = self.starts[c], self.ends[c]
+        if end == start:
+            return None, None
+        return self.years[start:end], self.values[start:end]
+
+    def present_countries(self):
+        return np.flatnonzero(self.ends > self.starts)
+
+
+class ColumnarStore:
+    # World Bank table split into one SeriesPartition per indicator over a shared
+    # country dimension; partitions come from partition_loader on first use, so
+    # an indicator costs no memory until it is queried. country_index maps any
+    # country key to its code, a CountryDimension also resolves ISO codes and aliases;
+    # present (codes with any series) and row_counts (rows per indicator) can be
+    # given up front so neither forces every partition to load
+    def __init__(self, countries, metrics, partition_loader, country_index=None, present=None, row_counts=None):
+        self.countries = list(countries)
+        self.metrics = list(metrics)
+        self.country_index = {name: i for i, name in enumerate(self.countries)} if country_index is None else country_index
+        self.metric_index = {name: i for i, name in enumerate(self.metrics)}
+        self.partition_loader = partition_loader
+        self.partitions = {}
+        self.present = None if present is None else np.asarray(present, dtype=np.int64)
+        self.row_counts = row_counts
+
+    @classmethod
+    def from_codes(cls, countries, metrics, country_codes, metric_codes, years, values, country_index=None):
+        country_codes = np.asarray(country_codes, dtype=np.int32)
+        metric_codes = np.asarray(metric_codes, dtype=np.int32)
+        years = np.asarray(years, dtype=np.int16)
+        values = np.asarray(values, dtype=np.float64)
+
+        partitions = {}
+        for m, metric in enumerate(metrics):
+            rows = metric_codes == m
+            partitions[metric] = SeriesPartition.from_codes(
+                len(countries), country_codes[rows], years[rows], values[rows]
+            )
+        return cls(countries, metrics, partitions.get, country_index)
+
+    @classmethod
+    def from_records(cls, countries, metrics, years, values):
+        # codes follow order of first appearance, like the old nested dicts did
+        country_codes, country_names = pd.factorize(pd.Series(countries, dtype=object))
+        metric_codes, metric_names = pd.factorize(pd.Series(metrics, dtype=object))
+        return cls.from_codes(country_names, metric_names, country_codes, metric_codes, years, values)
+
+    def partition(self, metric):
+        partition = self.partitions.get(metric)
+        if partition is None and metric in self.metric_index:
+            partition = self.partitions[metric] = self.partition_loader(metric)
+        return partition
+
+    def __len__(self):
+        if self.row_counts is not None:
+            return sum(self.row_counts[metric] for metric in self.metrics)
+        return sum(len(self.partition(metric)) for metric in self.metrics)
+
+    def metric_row_counts(self):
+        if self.row_counts is not None:
+            return dict(self.row_counts)
+        return {metric: len(self.partition(metric)) for metric in self.metrics}
+
+    def has_series(self, country, metric):
+        c = self.country_index.get(country)
+        if c is None or metric not in self.metric_index:
+            return False
+        return self.partition(metric).has_series(c)
+
+    def series(self, country, metric):
+        c = self.country_index.get(country)
+        if c is None or metric not in self.metric_index:
+            return None, None
+        return self.partition(metric).series(c)
+
+    def series_dict(self, country, metric):
+        years, values = self.series(country, metric)
+        if years is None:
+            return None
+        return dict(zip(map(str, years.tolist()), values.tolist()))
+
+    def country_metrics(self, country):
+        c = self.country_index.get(country)
+        if c is None:
+            return []
+        return [metric for metric in self.metrics if self.partition(metric).has_series(c)]
+
+    def data_countries(self):
+        # codes of countries with at least one series, in code order
+        if self.present is None:
+            present = np.zeros(len(self.countries), dtype=bool)
+            for metric in self.metrics:
+                partition = self.partition(metric)
+                present |= np.asarray(partition.ends) > np.asarray(partition.starts)
+            self.present = np.flatnonzero(present)
+        return self.present
+
+    def metric_countries(self, metric):
+        if metric not in self.metric_index:
+            return []
+        return [self.countries[c] for c in self.partition(metric).present_countries()]
+
+
+class CountryView(Mapping):
+    # read-only dict[country][metric][year] built on demand from the store
+    def __init__(self, store):
+        self.store = store
+        self.present = {int(c) for c in store.data_countries()}
+
+    def __getitem__(self, country):
+        if country not in self:
+            raise KeyError(country)
+        return {
+            metric: self.store.series_dict(country, metric)
+            for metric in self.store.country_metrics(country)
+        }
+
+    def __contains__(self, country):
+        return self.store.country_index.get(country) in self.present
+
+    def __iter__(self):
+        return (self.store.countries[c] for c in sorted(self.present))
+
+    def __len__(self):
+        return len(self.present)
+
+
+class MetricView(Mapping):
+    # read-only dict[metric][country][year] built on demand from the store
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, metric):
+        if metric not in self.store.metric_index:
+            raise KeyError(metric)
+        return {
+            country: self.store.series_dict(country, metric)
+            for country in self.store.metric_countries(metric)
+        }
+
+    def __contains__(self, metric):
+        return metric in self.store.metric_index
+
+    def __iter__(self):
+        return iter(self.store.metrics)
+
+    def __len__(self):
+        return len(self.store.metrics)
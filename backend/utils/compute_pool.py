@@ -0,0 +1,51 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+worker_state = {'generation': None, 'loader': None}
+
+
+def encode_json(data):
+    # same shape as Flask's provider so both fronts serve byte-identical bodies
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def worker_loader(generation):
+    # every pool process keeps its own loader and rebuilds it after a reload
+    if worker_state['generation'] != generation:
+        from utils.data_loader import ClimateDataLoader
+        worker_state['loader'] = ClimateDataLoader()
+        worker_state['generation'] = generation
+    return worker_state['loader']
+
+
+def run_getter(generation, getter, args):
+    loader = worker_loader(generation)
+    return encode_json(getattr(loader, getter)(*args))
+
+
+class ComputePool:
+    # bounded process pool for CPU-heavy getters; identical calls that are in
+    # flight at the same time share one computation
+    def __init__(self, max_workers=2, max_pending=64):
+        self.executor = ProcessPoolExecutor(max_workers)
+        self.slots = asyncio.Semaphore(max_pending)
+        self.pending = {}
+
+    async def run(self, generation, getter, *args):
+        key = (generation, getter, args)
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.submit(key))
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        # a client that disconnects must not cancel the work for the others
+        return await asyncio.shield(future)
+
+    async def submit(self, key):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, run_getter, *key)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
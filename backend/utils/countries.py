@@ -0,0 +1,96 @@
+import json
+import unicodedata
+import numpy as np
+from config.get_path import get_country_aliases_path
+
+
+def normalize_country_key(key):
+    # case, accents and repeated whitespace never decide a match
+    key = unicodedata.normalize('NFKD', str(key)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(key.casefold().split())
+
+
+def load_country_aliases():
+    with open(get_country_aliases_path(), encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CountryDimension:
+    # every country is interned once as an integer id; its display name, ISO3
+    # and ISO2 codes and known aliases all resolve to that id in one dict
+    # lookup, and per-country arrays in the loader are indexed by it
+    def __init__(self, names=(), iso3=(), iso2=(), aliases=None):
+        self.names = []
+        self.iso3 = []
+        self.iso2 = []
+        self.exact = {}
+        self.index = {}
+        self.aliases = {
+            normalize_country_key(alias): normalize_country_key(name)
+            for alias, name in (load_country_aliases() if aliases is None else aliases).items()
+        }
+        for name, code3, code2 in zip(names, iso3, iso2):
+            self.add(name, code3, code2)
+
+    @classmethod
+    def from_records(cls, records, aliases=None):
+        # records in the World Bank /country format: name, id (ISO3), iso2Code
+        return cls(
+            [record['name'].strip() for record in records],
+            [record.get('id') or '' for record in records],
+            [record.get('iso2Code') or '' for record in records],
+            aliases
+        )
+
+    def columns(self):
+        return {'names': self.names, 'iso3': self.iso3, 'iso2': self.iso2}
+
+    def add(self, name, iso3='', iso2=''):
+        country_id = self.get(name)
+        if country_id is not None:
+            return country_id
+        country_id = len(self.names)
+        self.names.append(name)
+        self.iso3.append(iso3)
+        self.iso2.append(iso2)
+        for key in (name, iso3, iso2):
+            if key:
+                self.exact.setdefault(key, country_id)
+                self.index.setdefault(normalize_country_key(key), country_id)
+        return country_id
+
+    def get(self, key, default=None):
+        if key is None:
+            return default
+        country_id = self.exact.get(key)
+        if country_id is None:
+            normalized = normalize_country_key(key)
+            country_id = self.index.get(normalized)
+            if country_id is None and normalized in self.aliases:
+                country_id = self.index.get(self.aliases[normalized])
+        return default if country_id is None else country_id
+
+    def __getitem__(self, key):
+        country_id = self.get(key)
+        if country_id is None:
+            raise KeyError(key)
+        return country_id
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.names)
+
+    def require(self, key):
+        country_id = self.get(key)
+        if country_id is None:
+            raise ValueError(f"Unknown country '{key}'")
+        return country_id
+
+    def canonical(self, key):
+        country_id = self.get(key)
+        return None if country_id is None else self.names[country_id]
+
+    def ids(self, keys):
+        return np.array([self.get(key, -1) for key in keys], dtype=np.int64)
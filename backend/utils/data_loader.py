@@ -1,65 +1,144 @@
 import json
-from config.get_path import get_worldbank_csv_data_path, get_nasa_data_path, get_worldbank_data_path, get_country_data_path
-from utils.metric_mapper import get_metric_name, get_metric_key, get_nasa_metric_name, get_available_metrics
-from utils.train import predict_metrics
+import os
+import threading
+from config.get_path import get_file_fingerprint, get_snapshot_path, get_worldbank_csv_data_path, get_nasa_data_path, get_worldbank_data_path, get_country_data_path, get_indicators_path, get_country_aliases_path
+from utils.metric_mapper import get_metric_name, get_metric_key, get_metric_column, get_nasa_metric_name, get_available_metrics, get_indicators
+from utils.train import fit_polynomial_models, predict_metrics
+from utils.forecast import build_forecast_table, fit_forecasts, get_forecast_model
+from utils.columnar_store import ColumnarStore, CountryView, MetricView
+from utils.countries import CountryDimension
+from utils.snapshot import read_snapshot
+from utils.ranking import AGGREGATES, compute_aggregates, top_n
+from utils.downsample import select_series
+from utils.export import iter_worldbank_chunks, iter_nasa_chunks
+from utils.spatial import CentroidGrid
+from utils.instrumentation import timed, record_cache
+from utils.analytics import PanelCube, pairwise_correlations, trend_slopes, year_over_year, to_json_list
+from utils.rollups import Rollups
+from utils.classify import CLASSIFIERS, classify
+import numpy as np
 import pandas as pd
 
+BALANCE_COLUMNS = [get_metric_column(key) for key in ('co2', 'forest', 'air_pollution')]
+RANKING_CACHE_SIZE = 1024
+ANALYTICS_CACHE_SIZE = 256
+BALANCE_EXCLUDED_COUNTRIES = [
+    'Curacao', 'Gibraltar', 'Hong Kong SAR, China', 'Macao SAR, China', 'Montenegro', 'Serbia',
+    'South Sudan', 'Sudan', 'Sint Maarten (Dutch part)', 'Liechtenstein', 'Isle of Man',
+    'Channel Islands', 'Andorra', 'Monaco', 'San Marino', 'St. Martin (French part)',
+    'West Bank and Gaza', 'Aruba', 'British Virgin Islands', 'Cayman Islands',
+    'Faroe Islands', 'French Polynesia', 'New Caledonia', 'Turks and Caicos Islands'
+]
+
 class ClimateDataLoader:
-    def __init__(self):
+    @timed('construct')
+    def __init__(self, use_snapshot=True):
         self.nasa_path = get_nasa_data_path()
         self.wb_path = get_worldbank_data_path()
         self.wb_csv_path = get_worldbank_csv_data_path()
         self.country_path = get_country_data_path()
-        self.load_nasa_data()
-        self.load_worldbank_data()
-        self.load_country_metadata()
+        self.snapshot_path = get_snapshot_path()
+        if not (use_snapshot and self.load_snapshot()):
+            self.load_country_metadata()
+            self.load_nasa_data()
+            self.load_worldbank_data()
+        self.index_countries()
+        self.index_nasa_series()
+        self.load_spatial_index()
+        self.balance_snapshots = None
+        self.forecast_models = {}
+        self.forecast_tables = {}
+        self.map_classes = {}
+        self.ranking_cache = {}
+        self.panel_cubes = {}
+        self.rollups = None
+        self.analytics_cache = {}
+        self.forecast_lock = threading.Lock()
+        self.forecast_table_locks = {}
         
+    def source_paths(self):
+        return {
+            'nasa': self.nasa_path,
+            'worldbank': self.wb_path,
+            'countries': self.country_path,
+            # the registry and the aliases shape what a snapshot holds too
+            'indicators': get_indicators_path(),
+            'aliases': get_country_aliases_path()
+        }
+
+    def record_counts(self):
+        return {
+            'nasa_series': len(self.nasa_data),
+            'nasa_points': sum(len(series) for series in self.nasa_data.values()),
+            'worldbank_records': len(self.wb_store),
+            'worldbank_countries': len(self.wb_country_data),
+            'countries': len(self.countries),
+            'worldbank_metrics': len(self.wb_store.metrics),
+            'countries_metadata': len(self.country_metadata)
+        }
+
+    @timed('load_snapshot')
+    def load_snapshot(self):
+        snapshot = read_snapshot(self.snapshot_path, self.source_paths())
+        if snapshot is None:
+            return False
+        self.nasa_data = snapshot['nasa_data']
+        self.wb_store = snapshot['wb_store']
+        self.countries = snapshot['countries']
+        self.wb_country_data = CountryView(self.wb_store)
+        self.wb_metric_data = MetricView(self.wb_store)
+        self.country_metadata = snapshot['country_metadata']
+        return True
+
+    @timed('load_nasa_data')
     def load_nasa_data(self):
         with open(self.nasa_path) as f:
             data = json.load(f)
         self.nasa_data = {
-            'global-temperature': data.get('global-temperature', {}),
-            'ocean-warming': data.get('ocean-warming', {}),
-            'methane': data.get('methane', {}), 
-            'carbon-dioxide': data.get('carbon-dioxide', {}),
-            'sea-level': data.get('sea-level', {}),
-            'arctic-sea-ice': data.get('arctic-sea-ice', {}), 
+            indicator['code']: data.get(indicator['code'], {})
+            for indicator in get_indicators('nasa')
         }
     
+    @timed('index_nasa_series')
+    def index_nasa_series(self):
+        # year keys parsed and sorted once; sub-annual records keep their
+        # fractional year so the order is chronological
+        self.nasa_series = {}
+        for metric, data in self.nasa_data.items():
+            years = np.array([float(year) for year in data.keys()], dtype=np.float64)
+            values = np.array(list(data.values()), dtype=np.float64)
+            order = np.argsort(years, kind='stable')
+            self.nasa_series[metric] = (years[order], values[order])
+
+    @timed('load_worldbank_data')
     def load_worldbank_data(self):
         with open(self.wb_path) as f:
-            self.wb_raw_data = json.load(f)
-        
-        self.wb_country_data = {}
-        self.wb_metric_data = {}
-        
-        for entry in self.wb_raw_data:
-            country = entry['country']
-            metric = get_metric_key(entry['meaning'])
-            year = entry['year']
-            value = float(entry['value']) if entry['value'] else None
-            
-            if value is None:
-                continue
-                
-            if country not in self.wb_country_data:
-                self.wb_country_data[country] = {}
-            if metric not in self.wb_country_data[country]:
-                self.wb_country_data[country][metric] = {}
-            self.wb_country_data[country][metric][year] = value
-            
-            if metric not in self.wb_metric_data:
-                self.wb_metric_data[metric] = {}
-            if country not in self.wb_metric_data[metric]:
-                self.wb_metric_data[metric][country] = {}
-            self.wb_metric_data[metric][country][year] = value
+            wb_raw_data = json.load(f)
+
+        entries = [entry for entry in wb_raw_data if entry['value']]
+        # names the metadata does not know join the dimension without codes
+        country_ids = [self.countries.add(entry['country']) for entry in entries]
+        metric_codes, metrics = pd.factorize(pd.Series([get_metric_key(entry['meaning']) for entry in entries], dtype=object))
+        self.wb_store = ColumnarStore.from_codes(
+            self.countries.names,
+            metrics,
+            country_ids,
+            metric_codes,
+            [int(entry['year']) for entry in entries],
+            [float(entry['value']) for entry in entries],
+            country_index=self.countries
+        )
+        self.wb_country_data = CountryView(self.wb_store)
+        self.wb_metric_data = MetricView(self.wb_store)
             
+    @timed('load_country_metadata')
     def load_country_metadata(self):
         with open(self.country_path) as f:
             raw_data = json.load(f)
 
+        self.countries = CountryDimension.from_records(raw_data[0])
         self.country_metadata = {
-            country['name']: {
+            country['name'].strip(): {
                 'id': country['id'],
                 'code': country['iso2Code'],
                 'longitude': float(country['longitude']),
@@ -71,146 +150,506 @@ class ClimateDataLoader:
         }
         return self.country_metadata
 
-    def load_predict_metrics(self, n_years):
-        with open(self.nasa_path, 'r') as f:
-            data = json.load(f)
+    @timed('index_countries')
+    def index_countries(self):
+        # metadata laid out over the country ids, so every join is an array lookup
+        n = len(self.countries)
+        self.country_info = [None] * n
+        self.country_latitudes = np.full(n, np.nan)
+        self.country_longitudes = np.full(n, np.nan)
+        for name, metadata in self.country_metadata.items():
+            c = self.countries[name]
+            self.country_info[c] = metadata
+            self.country_latitudes[c] = metadata['latitude']
+            self.country_longitudes[c] = metadata['longitude']
+        self.located = ~np.isnan(self.country_latitudes)
+        excluded = self.countries.ids(BALANCE_EXCLUDED_COUNTRIES)
+        self.balance_excluded = excluded[excluded >= 0]
+
+    def get_country_metadata(self, country):
+        c = self.countries.get(country)
+        return (self.country_info[c] or {}) if c is not None else {}
+
+    @timed('load_spatial_index')
+    def load_spatial_index(self):
+        located = np.flatnonzero(self.located)
+        self.spatial_index = CentroidGrid(
+            located, self.country_latitudes[located], self.country_longitudes[located]
+        )
+        return self.spatial_index
+
+    @timed('load_forecast_models')
+    def load_forecast_models(self):
+        fingerprint = get_file_fingerprint(self.nasa_path)
+        models = self.forecast_models
+        if models and all(key[1] == fingerprint for key in models):
+            record_cache('forecast_models', True)
+            return models
+        record_cache('forecast_models', False)
+
+        with self.forecast_lock:
+            if self.forecast_models is not models:
+                return self.forecast_models
+
+            with open(self.nasa_path, 'r') as f:
+                data = json.load(f)
+
+            rows = []
+            for metric, year_values in data.items():
+                for year_str, value in year_values.items():
+                    rows.append({
+                        'metric': metric,
+                        'year': float(year_str),
+                        'value': float(value)
+                    })
+            # cache keyed by (metric, data-file fingerprint), swapped in as a whole
+            self.forecast_models = {
+                (metric, fingerprint): model
+                for metric, model in fit_polynomial_models(rows).items()
+            }
+        return self.forecast_models
 
-        rows = []
-        for metric, year_values in data.items():
-            for year_str, value in year_values.items():
-                rows.append({
-                    'metric': metric,
-                    'year': float(year_str),
-                    'value': float(value)
-                })
-        predictions = predict_metrics(int(n_years), rows)
-        self.predictions = predictions
+    def forecast_model_names(self):
+        models = os.environ.get('CLIMATEPULSE_FORECAST_MODELS')
+        return models.split(',') if models else None
+
+    @timed('load_forecast_tables')
+    def load_forecast_tables(self):
+        # every indicator in one fit, run by the reloader before the swap so no
+        # request waits for it; the partitions it reads are views of the snapshot
+        # mapping, shared by every worker through the page cache
+        table = build_forecast_table(self.wb_store, self.forecast_model_names())
+        self.forecast_tables = dict.fromkeys(self.wb_store.metrics, table)
+        return self.forecast_tables
+
+    @timed('load_forecast_table')
+    def load_forecast_table(self, metric_key):
+        # a loader that was not warmed up fits one indicator on first use, under
+        # that indicator's lock only
+        if metric_key not in self.forecast_tables:
+            with self.forecast_table_locks.setdefault(metric_key, threading.Lock()):
+                if metric_key not in self.forecast_tables:
+                    self.forecast_tables[metric_key] = build_forecast_table(
+                        self.wb_store, self.forecast_model_names(), metrics=[metric_key]
+                    )
+        return self.forecast_tables[metric_key]
+
+    def has_forecast_table(self, metric):
+        return self.resolve_metric_keys([metric])[0] in self.forecast_tables
+
+    @timed('load_balance_snapshots')
+    def load_balance_snapshots(self):
+        wb_csv = pd.read_csv(self.wb_csv_path)
+        names = wb_csv['country'].unique()
+        wb_csv['country_id'] = wb_csv['country'].map(dict(zip(names, self.countries.ids(names))))
+        wb_csv = wb_csv[~wb_csv['country_id'].isin(self.balance_excluded)].copy()
+
+        # min-max normalization is done within each year
+        by_year = wb_csv.groupby('year')[BALANCE_COLUMNS]
+        min_vals = by_year.transform('min')
+        max_vals = by_year.transform('max')
+        wb_csv[BALANCE_COLUMNS] = ((wb_csv[BALANCE_COLUMNS] - min_vals) / (max_vals - min_vals)).round(3)
+        wb_csv = wb_csv[(wb_csv['country_id'] >= 0) & self.located[wb_csv['country_id']]]
+
+        # a missing value, or a year where every country has the same one, is
+        # served as null rather than NaN
+        snapshots = {}
+        for year, group in wb_csv.groupby('year'):
+            snapshots[int(year)] = [
+                {
+                    "country": self.countries.names[c],
+                    "co2_emissions": co2,
+                    "forest_area": forest,
+                    "air_pollution": air,
+                    "coordinates": [
+                        float(self.country_latitudes[c]),
+                        float(self.country_longitudes[c])
+                    ]
+                }
+                for c, co2, forest, air in zip(
+                    group['country_id'], *(to_json_list(group[column], 3) for column in BALANCE_COLUMNS)
+                )
+            ]
+        self.balance_snapshots = snapshots
+        return snapshots
+
+    @timed('load_panel_cube')
+    def load_panel_cube(self, metric_key):
+        # one single-metric cube per metric, built on its first trend or
+        # year-over-year request
+        cube = self.panel_cubes.get(metric_key)
+        if cube is None:
+            cube = self.panel_cubes[metric_key] = PanelCube(self.wb_store, [metric_key])
+        return cube
+
+    @timed('load_rollups')
+    def load_rollups(self):
+        # only located countries carry a region, aggregates like "World" stay out
+        if self.rollups is None:
+            regions = [(info or {}).get('region', '').strip() or None for info in self.country_info]
+            self.rollups = Rollups(self.wb_store, regions)
+        return self.rollups
 
 # data getters ========================================================================
-    def get_global_data_by_metric(self, metric):
+    @timed('get_global_data_by_metric')
+    def get_global_data_by_metric(self, metric, year_from=None, year_to=None, max_points=None):
         metric_key = get_nasa_metric_name(metric)
-        data = self.nasa_data.get(metric_key, {})
+        years, values = self.nasa_series.get(metric_key, (np.empty(0), np.empty(0)))
+        if not len(years):
+            raise ValueError(f"No data for metric '{metric}'")
 
-        years = [int(float(year)) for year in data.keys()]
-        values = list(data.values())
+        years, values = select_series(years, values, year_from, year_to, max_points)
+        return years.astype(int).tolist(), values.tolist()
 
-        sorted_years_values = sorted(zip(years, values))
-        sorted_years, sorted_values = zip(*sorted_years_values)
+    def get_local_series(self, country, metric_key, year_from=None, year_to=None, max_points=None):
+        years, values = self.wb_store.series(country, metric_key)
+        if years is None:
+            return None, None
+        years, values = select_series(years, values, year_from, year_to, max_points)
+        return years.tolist(), values.tolist()
 
-        return list(sorted_years), list(sorted_values)
+    def get_local_series_dict(self, country, metric_key, year_from=None, year_to=None, max_points=None):
+        years, values = self.get_local_series(country, metric_key, year_from, year_to, max_points)
+        return dict(zip(map(str, years), values))
 
-    def get_local_data_by_country(self, country, metric=None):
+    @timed('get_local_data_by_country')
+    def get_local_data_by_country(self, country, metric=None, year_from=None, year_to=None, max_points=None):
         if country not in self.wb_country_data:
             return None if metric else {}
             
         if metric:
-            metric_key = get_metric_key(metric)
-            if metric_key not in self.wb_country_data[country]:
-                return None, None
-                
-            years = sorted(self.wb_country_data[country][metric_key].keys())
-            values = [self.wb_country_data[country][metric_key][year] for year in years]
-            return years, values
-        
-        return self.wb_country_data[country]
+            return self.get_local_series(country, get_metric_key(metric), year_from, year_to, max_points)
 
-    def get_local_data_by_metric(self, metric, country=None):
+        if year_from is None and year_to is None and max_points is None:
+            return self.wb_country_data[country]
+        return {
+            metric_key: self.get_local_series_dict(country, metric_key, year_from, year_to, max_points)
+            for metric_key in self.wb_store.country_metrics(country)
+        }
+
+    @timed('get_local_data_by_metric')
+    def get_local_data_by_metric(self, metric, country=None, year_from=None, year_to=None, max_points=None):
         metric_key = get_metric_key(metric)
         if metric_key not in self.wb_metric_data:
             return None if country else {}
             
         if country:
-            if country not in self.wb_metric_data[metric_key]:
-                return None, None
-                
-            years = sorted(self.wb_metric_data[metric_key][country].keys())
-            values = [self.wb_metric_data[metric_key][country][year] for year in years]
-            return years, values
-        
-        return self.wb_metric_data[metric_key]
+            return self.get_local_series(country, metric_key, year_from, year_to, max_points)
+
+        if year_from is None and year_to is None and max_points is None:
+            return self.wb_metric_data[metric_key]
+        return {
+            name: self.get_local_series_dict(name, metric_key, year_from, year_to, max_points)
+            for name in self.wb_store.metric_countries(metric_key)
+        }
+
+    def iter_export_chunks(self, source, metric=None, country=None, year_from=None, year_to=None):
+        # validated eagerly so a bad request fails before the response starts
+        if source == 'worldbank':
+            metrics = self.wb_store.metrics if metric is None else [get_metric_key(metric)]
+            if any(metric_key not in self.wb_store.metric_index for metric_key in metrics):
+                raise ValueError(f"Unknown metric '{metric}'")
+            if country is not None and country not in self.wb_store.country_index:
+                raise ValueError(f"Unknown country '{country}'")
+            return iter_worldbank_chunks(self.wb_store, metrics, country, year_from, year_to)
+        if source == 'nasa':
+            metrics = list(self.nasa_series) if metric is None else [get_nasa_metric_name(metric)]
+            if any(metric_key not in self.nasa_series for metric_key in metrics):
+                raise ValueError(f"Unknown metric '{metric}'")
+            return iter_nasa_chunks(self.nasa_series, metrics, year_from, year_to)
+        raise ValueError(f"Unknown source '{source}', expected worldbank or nasa")
 
+    @timed('get_country_names')
     def get_country_names(self):
-        return list(self.wb_country_data.keys())
+        return sorted(self.wb_country_data.keys())
     
 
-    def get_top_countries_by_metric(self, metric, limit=10, ascending=False):
+    @timed('get_rank_aggregates')
+    def get_rank_aggregates(self, metric_key, year_from=None, year_to=None):
+        key = (metric_key, year_from, year_to)
+        aggregates = self.ranking_cache.get(key)
+        record_cache('ranking', aggregates is not None)
+        if aggregates is None:
+            if len(self.ranking_cache) >= RANKING_CACHE_SIZE:
+                self.ranking_cache.clear()
+            aggregates = compute_aggregates(
+                self.wb_store.partition(metric_key), len(self.wb_store.countries), year_from, year_to
+            )
+            self.ranking_cache[key] = aggregates
+        return aggregates
+
+    @timed('get_top_countries_by_metric')
+    def get_top_countries_by_metric(self, metric, limit=10, ascending=False, aggregate='mean',
+                                    year=None, year_from=None, year_to=None):
         metric_key = get_metric_key(metric)
         if metric_key not in self.wb_metric_data:
             return []
-        
-        country_avgs = []
-        for country, years_data in self.wb_metric_data[metric_key].items():
-            values = list(years_data.values())
-            if values:
-                avg = sum(values) / len(values)
-                country_avgs.append((country, avg))
-        
-        country_avgs.sort(key=lambda x: x[1], reverse=not ascending)
-        
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}', expected one of {', '.join(AGGREGATES)}")
+        if year is not None:
+            year_from = year_to = year
+
+        values = self.get_rank_aggregates(metric_key, year_from, year_to)[aggregate]
         return [
             {
-                'country': country,
-                'value': avg,
-                'metadata': self.country_metadata.get(country, {})
+                'country': self.wb_store.countries[c],
+                'value': float(values[c]),
+                'metadata': self.country_info[c] or {}
             }
-            for country, avg in country_avgs[:limit]
+            for c in top_n(values, limit, ascending)
         ]
 
-    def get_predictions(self, n_years):
-        self.load_predict_metrics(n_years)
-        return self.predictions
-    
-    def get_forest_data(self, year):
-        # path = '/app/data'
-        # wb_csv = pd.read_csv(path + '/worldbank_data.csv')
+    @timed('get_map_data')
+    def get_map_data(self, metric, year=None, bbox=None):
+        metric_key = get_metric_key(metric)
+        if metric_key not in self.wb_metric_data:
+            raise ValueError(f"Unknown metric '{metric}'")
+        years = np.unique(np.asarray(self.wb_store.partition(metric_key).years)).tolist()
+        if year is None:
+            year = years[-1] if years else None
 
-        with open(self.wb_csv_path) as f:
-            self.wb_csv_raw_data = pd.read_csv(f)
+        # one year's value per country is the 'latest' aggregate over [year, year]
+        values = self.get_rank_aggregates(metric_key, year, year)['latest']
+        indexed = values[self.spatial_index.keys]
 
+        visible = np.arange(len(indexed)) if bbox is None else self.spatial_index.within(*bbox)
+        visible = visible[~np.isnan(indexed[visible])]
+        present = indexed[~np.isnan(indexed)]
+        return {
+            'metric': metric_key,
+            'year': year,
+            'years': years,
+            'range': {
+                'min': float(present.min()) if len(present) else None,
+                'max': float(present.max()) if len(present) else None
+            },
+            'countries': [
+                {
+                    'country': self.countries.names[self.spatial_index.keys[i]],
+                    'value': float(indexed[i]),
+                    'coordinates': [
+                        float(self.spatial_index.latitudes[i]),
+                        float(self.spatial_index.longitudes[i])
+                    ]
+                }
+                for i in visible
+            ]
+        }
 
-        wb_csv = self.wb_csv_raw_data
-        # wb_csv = wb_csv[wb_csv['year'] >= 2000]
-        # wb_csv = wb_csv[wb_csv['year'] <= 2021]
-        wb_csv = wb_csv[wb_csv['year'] == int(year)]
+    @timed('load_map_classes')
+    def load_map_classes(self):
+        # breaks and bins of every indicator, year and method, run by the reloader
+        # before the swap like the forecast tables; a year's values are the ones
+        # the map shows for it, over the located countries
+        located = np.flatnonzero(self.located)
+        classes = {}
+        for metric_key in self.wb_store.metrics:
+            partition = self.wb_store.partition(metric_key)
+            years = np.asarray(partition.years)
+            codes = np.asarray(partition.country_codes)
+            for year in np.unique(years).tolist():
+                rows = years == year
+                values = np.full(len(self.wb_store.countries), np.nan)
+                values[codes[rows]] = np.asarray(partition.values)[rows]
+                values = values[located]
+                if not np.isnan(values).all():
+                    for method in CLASSIFIERS:
+                        classes[metric_key, year, method] = classify(values, method)
+        self.map_classes = classes
+        return classes
 
-        wb_csv = wb_csv[~wb_csv['country'].isin(['Curacao', 'Gibraltar', 'Hong Kong SAR, China', 
-                                                'Macao SAR, China', 'Montenegro', 'Serbia', 'South Sudan', 
-                                                'Sudan', 'Sint Maarten (Dutch part)', 'Liechtenstein', 'Isle of Man', 
-                                                'Channel Islands', 'Andorra', 'Monaco', 'San Marino', 'St. Martin (French part)',
-                                                'West Bank and Gaza', 'Aruba', 'British Virgin Islands', 'Cayman Islands',
-                                                'Channel Islands', 'Faroe Islands', 'French Polynesia', 'New Caledonia',
-                                                'Turks and Caicos Islands'])]
-        unique_countries = wb_csv['country'].unique()
-        print('!'*100, wb_csv.isna().sum())
+    @timed('get_map_classes')
+    def get_map_classes(self, metric, year=None, method='quantile'):
+        metric_key = self.resolve_metric_keys([metric])[0]
+        if year is None:
+            years = np.asarray(self.wb_store.partition(metric_key).years)
+            year = int(years.max()) if len(years) else None
 
-        with open(self.country_path) as f:
-            countries_data = json.load(f)[0]
-        country_coords = {}
-        for country in countries_data:
-            if country['name'] in unique_countries:
-                try:
-                    country_coords[country['name']] = [
-                        float(country['latitude']),
-                        float(country['longitude'])
-                    ]
-                except (ValueError, KeyError):
-                    continue
+        def compute():
+            located = np.flatnonzero(self.located)
+            classes = self.map_classes.get((metric_key, year, method))
+            if classes is None:
+                # a loader that was not warmed up, or a year without data
+                values = self.get_rank_aggregates(metric_key, year, year)['latest'][located]
+                if np.isnan(values).all():
+                    raise ValueError(f"No data for metric '{metric_key}' in {year}")
+                classes = classify(values, method)
+            breaks, bins = classes
+            present = np.flatnonzero(bins >= 0)
+            return {
+                'metric': metric_key,
+                'year': year,
+                'method': method,
+                'breaks': breaks.tolist(),
+                'countries': [self.countries.names[c] for c in located[present]],
+                'bins': bins[present].tolist()
+            }
 
-        for col in ['carbon_dioxide', 'forests_ratio', 'air_pollution']:
-            min_val = wb_csv[col].min()
-            max_val = wb_csv[col].max()
-            wb_csv[col] = (wb_csv[col] - min_val) / (max_val - min_val)
-        
-        result = []
-        for _, row in wb_csv.iterrows():
-            country_name = row['country']
-            if country_name in country_coords:
-                result.append({
-                    "country": country_name,
-                    "co2_emissions": round(row['carbon_dioxide'], 3),
-                    "forest_area": round(row['forests_ratio'], 3),
-                    "air_pollution": round(row['air_pollution'], 3),
-                    "coordinates": country_coords[country_name]
-                })
+        return self.get_analytics(('map_classes', metric_key, year, method), compute)
+
+    @timed('get_nearest_countries')
+    def get_nearest_countries(self, latitude, longitude, k=1):
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('lat/lon are out of range')
+        found, distances = self.spatial_index.nearest(latitude, longitude, max(1, k))
+        return [
+            {
+                'country': self.countries.names[self.spatial_index.keys[i]],
+                'distance_km': round(float(distance), 1),
+                'metadata': self.country_info[self.spatial_index.keys[i]]
+            }
+            for i, distance in zip(found, distances)
+        ]
+
+    def get_analytics(self, key, compute):
+        result = self.analytics_cache.get(key)
+        record_cache('analytics', result is not None)
+        if result is None:
+            if len(self.analytics_cache) >= ANALYTICS_CACHE_SIZE:
+                self.analytics_cache.clear()
+            result = self.analytics_cache[key] = compute()
         return result
-    
\ No newline at end of file
+
+    def resolve_metric_keys(self, metrics=None):
+        metric_keys = [get_metric_key(metric) for metric in metrics] if metrics else list(self.wb_store.metrics)
+        unknown = [metric for metric in metric_keys if metric not in self.wb_store.metric_index]
+        if unknown:
+            raise ValueError(f"Unknown metric '{unknown[0]}'")
+        return metric_keys
+
+    @timed('get_correlations')
+    def get_correlations(self, metrics=None, year_from=None, year_to=None, by_year=False):
+        metric_keys = self.resolve_metric_keys(metrics)
+
+        def compute():
+            # a cube over just the requested metrics; the result is cached
+            cube = PanelCube(self.wb_store, metric_keys)
+            window = cube.window(year_from, year_to)
+            # aggregates such as regions or "World" would be counted twice
+            rows = self.located
+            values = cube.values[rows][:, window]
+            years = cube.years[window].tolist()
+
+            if by_year:
+                matrices, observations = pairwise_correlations(np.swapaxes(values, 0, 1))
+                return {
+                    'metrics': metric_keys,
+                    'years': years,
+                    'matrices': [to_json_list(matrix, 4) for matrix in matrices],
+                    'observations': observations.tolist()
+                }
+            matrix, observations = pairwise_correlations(values.reshape(-1, len(metric_keys)))
+            return {
+                'metrics': metric_keys,
+                'from': years[0] if years else None,
+                'to': years[-1] if years else None,
+                'matrix': to_json_list(matrix, 4),
+                'observations': observations.tolist()
+            }
+
+        return self.get_analytics(('correlations', tuple(metric_keys), year_from, year_to, by_year), compute)
+
+    @timed('get_trend_slopes')
+    def get_trend_slopes(self, metric, year_from=None, year_to=None):
+        metric_key = self.resolve_metric_keys([metric])[0]
+
+        def compute():
+            cube = self.load_panel_cube(metric_key)
+            window = cube.window(year_from, year_to)
+            slopes, observations = trend_slopes(cube.values[:, window], cube.years[window])
+            slopes, observations = slopes[:, 0], observations[:, 0]
+            present = np.flatnonzero(~np.isnan(slopes))
+            return {
+                'metric': metric_key,
+                'countries': {
+                    cube.countries[c]: {'slope': float(slopes[c]), 'observations': int(observations[c])}
+                    for c in present
+                }
+            }
+
+        return self.get_analytics(('trends', metric_key, year_from, year_to), compute)
+
+    @timed('get_year_over_year')
+    def get_year_over_year(self, metric, country=None, year_from=None, year_to=None):
+        metric_key = self.resolve_metric_keys([metric])[0]
+        country_id = self.countries.require(country) if country is not None else None
+
+        def compute():
+            cube = self.load_panel_cube(metric_key)
+            window = cube.window(year_from, year_to)
+            rows = [country_id] if country_id is not None else list(range(len(cube.countries)))
+            deltas, relative = year_over_year(cube.values[rows, window, 0])
+            present = ~np.all(np.isnan(deltas), axis=1)
+            return {
+                'metric': metric_key,
+                'years': cube.years[window][1:].tolist(),
+                'countries': {
+                    cube.countries[c]: {'delta': to_json_list(deltas[i]), 'relative': to_json_list(relative[i])}
+                    for i, c in enumerate(rows) if present[i]
+                }
+            }
+
+        return self.get_analytics(('yoy', metric_key, country_id, year_from, year_to), compute)
+
+    @timed('get_rollups')
+    def get_rollups(self, metric, region=None, year_from=None, year_to=None):
+        metric_key = self.resolve_metric_keys([metric])[0]
+        return {
+            'metric': metric_key,
+            'regions': self.load_rollups().get(metric_key, region, year_from, year_to)
+        }
+
+    def get_regions(self):
+        return self.load_rollups().describe()
+
+    @timed('get_predictions')
+    def get_predictions(self, n_years, model='polynomial'):
+        if model == 'polynomial':
+            models = self.load_forecast_models()
+            return predict_metrics(int(n_years), {metric: model for (metric, _), model in models.items()})
+
+        # the NASA series are few, other models are fitted on request over annual means
+        get_forecast_model(model)
+        predictions = {}
+        for metric, (years, values) in self.nasa_series.items():
+            if len(years) == 0:
+                continue
+            annual_years, codes = np.unique(np.floor(years).astype(int), return_inverse=True)
+            annual_values = np.bincount(codes, values) / np.bincount(codes)
+            forecast = fit_forecasts(model, [(annual_years, annual_values)], int(n_years))[0]
+            predictions[metric] = [] if np.isnan(forecast).any() else forecast.tolist()
+        return predictions
+
+    @timed('get_forecast')
+    def get_forecast(self, metric, country=None, model='polynomial', n_years=10):
+        metric_key = self.resolve_metric_keys([metric])[0]
+        get_forecast_model(model)
+        table = self.load_forecast_table(metric_key)
+        if model not in table.models():
+            raise ValueError(f"Forecast model '{model}' is not precomputed")
+        if not 1 <= n_years <= table.horizon:
+            raise ValueError(f"Forecast horizon must be between 1 and {table.horizon} years")
+        country_ids = [self.countries.require(country)] if country is not None else range(len(self.countries))
+        forecasts = {}
+        for c in country_ids:
+            forecast = table.lookup(model, metric_key, c, n_years)
+            if forecast is not None:
+                forecasts[self.countries.names[c]] = forecast
+        return {'metric': metric_key, 'model': model, 'countries': forecasts}
+    
+    @timed('get_forest_data')
+    def get_forest_data(self, year):
+        if self.balance_snapshots is None:
+            self.load_balance_snapshots()
+        return self.balance_snapshots.get(int(year), [])
+
+    @timed('get_forest_data_range')
+    def get_forest_data_range(self, year_from=None, year_to=None):
+        if self.balance_snapshots is None:
+            self.load_balance_snapshots()
+        year_from = int(year_from) if year_from else None
+        year_to = int(year_to) if year_to else None
+        return {
+            year: snapshot for year, snapshot in self.balance_snapshots.items()
+            if (year_from is None or year >= year_from) and (year_to is None or year <= year_to)
+        }
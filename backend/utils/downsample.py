@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    # each bucket in between, the point spanning the largest triangle with the
+    # previously kept point and the average of the next bucket
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:n_out], dtype=np.intp)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i == n_out - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def select_series(years, values, year_from=None, year_to=None, max_points=None):
+    # years are sorted once at load, so a window is two binary searches; a
+    # fractional year (sub-annual record) counts as part of its calendar year
+    if max_points is not None and max_points < 2:
+        raise ValueError('max_points must be at least 2')
+    start = 0 if year_from is None else np.searchsorted(years, year_from, 'left')
+    end = len(years) if year_to is None else np.searchsorted(years, year_to + 1, 'left')
+    years, values = years[start:end], values[start:end]
+
+    if max_points is not None and max_points < len(years):
+        keep = lttb_indices(np.asarray(years, dtype=np.float64), np.asarray(values, dtype=np.float64), max_points)
+        years, values = years[keep], values[keep]
+    return years, values
@@ -0,0 +1,323 @@
+import csv
+import hashlib
+import heapq
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config.get_path import (
+    get_data_path, get_raw_data_path, get_country_data_path, get_country_aliases_path, get_indicators_path, get_etl_state_path,
+    get_snapshot_path, get_nasa_data_path, get_nasa_csv_data_path, get_worldbank_data_path, get_worldbank_csv_data_path
+)
+from utils.metric_mapper import get_indicators
+from utils.instrumentation import timed
+
+ETL_VERSION = 1
+CHUNK_SIZE = 1 << 20
+SPOOL_BATCH = 10000
+SEPARATORS = re.compile(r'[\s,:]*')
+
+
+def iter_json_items(path, chunk_size=CHUNK_SIZE):
+    # the elements of a top-level array, or the (key, value) pairs of a top-level
+    # object, decoded one at a time from fixed-size chunks of the file
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def read_more():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        def peek():
+            nonlocal pos
+            while True:
+                pos = SEPARATORS.match(buffer, pos).end()
+                if pos < len(buffer):
+                    return buffer[pos]
+                if eof:
+                    return None
+                read_more()
+
+        def decode():
+            # a value reaching the end of the buffer may be cut short, e.g. a number
+            nonlocal pos
+            while True:
+                peek()
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                read_more()
+
+        opening = peek()
+        if opening not in ('[', '{'):
+            raise ValueError(f"{path} does not hold a JSON array or object")
+        pos += 1
+        while True:
+            char = peek()
+            if char is None:
+                raise ValueError(f"{path} ends before its closing bracket")
+            if char in ']}':
+                return
+            yield (decode(), decode()) if opening == '{' else decode()
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_atomic(path, write, newline=None):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline=newline) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+# per-indicator work, run in the process pool =========================================
+def clean_worldbank_indicator(name, countries, years, values):
+    frame = pd.DataFrame({
+        'country': countries,
+        'year': pd.to_numeric(pd.Series(years, dtype=object), errors='coerce'),
+        'value': pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    })
+    # the last row read for a (country, year) wins, as in the crawl pipeline
+    frame = frame.dropna().drop_duplicates(['country', 'year'], keep='last')
+    frame = frame.sort_values(['country', 'year'], kind='stable')
+    return name, frame['country'].to_numpy(object), frame['year'].to_numpy(np.int64), frame['value'].to_numpy(np.float64)
+
+
+def build_worldbank_indicator(name, prefix):
+    # reads the indicator's spooled rows and leaves its part of each output next
+    # to them, so only file names travel between the processes
+    with open(prefix + '.rows', encoding='utf-8') as f:
+        rows = [row for line in f for row in json.loads(line)]
+    countries, years, values = ([row[i] for row in rows] for i in range(3))
+    _, countries, years, values = clean_worldbank_indicator(name, countries, years, values)
+
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        for country, year, value in zip(countries, years.tolist(), values.tolist()):
+            f.write(json.dumps({'country': country, 'year': str(year), 'meaning': name, 'value': value}) + '\n')
+    with open(prefix + '.csv', 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(zip(countries, years.tolist(), values.tolist()))
+    return name, prefix
+
+
+def clean_nasa_series(code, values):
+    points = {}
+    for year, value in values.items():
+        try:
+            points[float(year)] = (year, float(value))
+        except (TypeError, ValueError):
+            continue
+    return code, dict(points[year] for year in sorted(points))
+
+
+def run_task(task):
+    function, *args = task
+    return function(*args)
+
+
+# readers and writers ==================================================================
+def read_worldbank_tasks(path, indicators, work_dir):
+    # rows are spooled to one file per indicator, a batch per line, as they are
+    # read, so the parent never holds more than a chunk of the raw file
+    prefixes = {indicator['name']: os.path.join(work_dir, f'worldbank-{i}') for i, indicator in enumerate(indicators)}
+    spools = {name: (open(prefix + '.rows', 'w', encoding='utf-8'), []) for name, prefix in prefixes.items()}
+    try:
+        for entry in iter_json_items(path):
+            spool = spools.get(entry.get('meaning'))
+            if spool is not None:
+                f, batch = spool
+                batch.append((entry['country'], entry['year'], entry['value']))
+                if len(batch) == SPOOL_BATCH:
+                    f.write(json.dumps(batch) + '\n')
+                    batch.clear()
+        for f, batch in spools.values():
+            if batch:
+                f.write(json.dumps(batch) + '\n')
+    finally:
+        for f, _ in spools.values():
+            f.close()
+    return [(build_worldbank_indicator, name, prefix) for name, prefix in prefixes.items()]
+
+
+def read_nasa_tasks(path, indicators, work_dir):
+    codes = {indicator['code'] for indicator in indicators}
+    return [(clean_nasa_series, code, values) for code, values in iter_json_items(path) if code in codes]
+
+
+def write_worldbank(results, indicators, json_path, csv_path):
+    # joins the per-indicator parts written by build_worldbank_indicator, a line
+    # at a time
+    def write_json(f):
+        f.write('[')
+        separator = '\n'
+        for _, prefix in results:
+            with open(prefix + '.json', encoding='utf-8') as part:
+                for line in part:
+                    f.write(separator + line.rstrip('\n'))
+                    separator = ',\n'
+        f.write('\n]\n')
+
+    write_atomic(json_path, write_json)
+
+    # wide table for the balance view, one column per indicator ordered by name
+    # as the exploration notebook pivoted it; every part is sorted by country and
+    # year, so the rows come out of a merge of the parts
+    columns = {indicator['name']: indicator['column'] for indicator in indicators}
+    prefixes = sorted((name, prefix) for name, prefix in results if os.path.getsize(prefix + '.csv'))
+
+    def write_csv(f):
+        parts = [open(prefix + '.csv', encoding='utf-8', newline='') for _, prefix in prefixes]
+        try:
+            def rows(i, part):
+                for country, year, value in csv.reader(part):
+                    yield country, int(year), i, value
+
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['country', 'year'] + [columns[name] for name, _ in prefixes])
+            row, key = None, None
+            for country, year, i, value in heapq.merge(*(rows(i, part) for i, part in enumerate(parts))):
+                if (country, year) != key:
+                    if row is not None:
+                        writer.writerow(row)
+                    key, row = (country, year), [country, year] + [''] * len(parts)
+                row[2 + i] = value
+            if row is not None:
+                writer.writerow(row)
+        finally:
+            for part in parts:
+                part.close()
+
+    write_atomic(csv_path, write_csv, newline='')
+
+
+def write_nasa(results, json_path, csv_path):
+    series = dict(results)
+    write_atomic(json_path, lambda f: json.dump(series, f, indent=4))
+
+    def write_csv(f):
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['', 'metric', 'year', 'value'])
+        rows = ((metric, float(year), value) for metric, values in series.items() for year, value in values.items())
+        for i, (metric, year, value) in enumerate(rows):
+            writer.writerow([i, metric, year, value])
+
+    write_atomic(csv_path, write_csv, newline='')
+
+
+def write_snapshot_files():
+    # imported here so the loader is only built when the snapshot is stale
+    from utils.data_loader import ClimateDataLoader
+    from utils.snapshot import write_snapshot
+
+    loader = ClimateDataLoader(use_snapshot=False)
+    write_snapshot(loader.snapshot_path, loader, loader.source_paths())
+
+
+# the stage runner =====================================================================
+def load_state(path):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get('version') == ETL_VERSION else {}
+
+
+def digests(paths):
+    return {name: file_digest(path) for name, path in paths.items()}
+
+
+def is_fresh(state, stage, inputs, outputs):
+    return state.get(stage) == inputs and all(os.path.exists(path) for path in outputs)
+
+
+@timed('run_etl')
+def run_etl(force=False, max_workers=None, log=print):
+    # raw spider outputs -> served JSON/CSV files -> snapshot; a stage whose
+    # input hashes match the last run and whose outputs exist is skipped
+    state_path = get_etl_state_path()
+    state = {} if force else load_state(state_path)
+    new_state = {'version': ETL_VERSION}
+    raw_dir = get_raw_data_path()
+    registry = get_indicators_path()
+    sources = {
+        'worldbank': (
+            read_worldbank_tasks, get_indicators('worldbank'),
+            [get_worldbank_data_path(), get_worldbank_csv_data_path()]
+        ),
+        'nasa': (read_nasa_tasks, get_indicators('nasa'), [get_nasa_data_path(), get_nasa_csv_data_path()])
+    }
+    report = {}
+    # spooled rows and per-indicator parts, on the same disk as the outputs
+    work_dir = tempfile.TemporaryDirectory(prefix='.etl-', dir=get_data_path())
+
+    tasks, pending = [], []
+    for source, (read_tasks, indicators, outputs) in sources.items():
+        raw_path = os.path.join(raw_dir, os.path.basename(outputs[0]))
+        if not os.path.exists(raw_path):
+            report[source] = 'no raw input'
+            log(f"{source}: no raw output at {raw_path}, keeping the served files")
+            continue
+        inputs = digests({'raw': raw_path, 'indicators': registry})
+        new_state[source] = inputs
+        if is_fresh(state, source, inputs, outputs):
+            report[source] = 'unchanged'
+            log(f"{source}: unchanged")
+            continue
+        source_tasks = read_tasks(raw_path, indicators, work_dir.name)
+        pending.append((source, len(tasks), len(tasks) + len(source_tasks)))
+        tasks.extend(source_tasks)
+
+    # every indicator of every stale source is one task
+    if max_workers is None:
+        max_workers = int(os.environ.get('CLIMATEPULSE_ETL_WORKERS', os.cpu_count() or 1))
+    if max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(max_workers, len(tasks))) as executor:
+            results = list(executor.map(run_task, tasks))
+    else:
+        results = list(map(run_task, tasks))
+
+    for source, start, end in pending:
+        _, indicators, outputs = sources[source]
+        if source == 'worldbank':
+            write_worldbank(results[start:end], indicators, *outputs)
+        else:
+            write_nasa(results[start:end], *outputs)
+        report[source] = 'built'
+        log(f"{source}: {end - start} indicators written to {', '.join(outputs)}")
+    work_dir.cleanup()
+
+    snapshot_inputs = digests({
+        'worldbank': get_worldbank_data_path(),
+        'nasa': get_nasa_data_path(),
+        'countries': get_country_data_path(),
+        'aliases': get_country_aliases_path(),
+        'indicators': registry
+    })
+    new_state['snapshot'] = snapshot_inputs
+    if is_fresh(state, 'snapshot', snapshot_inputs, [get_snapshot_path()]):
+        report['snapshot'] = 'unchanged'
+        log("snapshot: unchanged")
+    else:
+        write_snapshot_files()
+        report['snapshot'] = 'built'
+        log(f"snapshot: written to {get_snapshot_path()}")
+
+    write_atomic(state_path, lambda f: json.dump(new_state, f, indent=4))
+    return report
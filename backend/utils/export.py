@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow')
+}
+EXPORT_COLUMNS = {
+    'worldbank': (('country', 'string'), ('metric', 'string'), ('year', 'int16'), ('value', 'float64')),
+    'nasa': (('metric', 'string'), ('year', 'float64'), ('value', 'float64'))
+}
+
+
+def window_mask(years, year_from, year_to):
+    mask = np.ones(len(years), dtype=bool)
+    if year_from is not None:
+        mask &= years >= year_from
+    if year_to is not None:
+        mask &= years < year_to + 1
+    return mask
+
+
+def iter_worldbank_chunks(store, metrics, country=None, year_from=None, year_to=None):
+    # rows leave the (possibly memory-mapped) partitions one slice at a time
+    names = np.array(store.countries, dtype=object)
+    for metric in metrics:
+        partition = store.partition(metric)
+        if country is None:
+            start, end = 0, len(partition)
+        else:
+            c = store.country_index[country]
+            start, end = int(partition.starts[c]), int(partition.ends[c])
+
+        for offset in range(start, end, EXPORT_CHUNK_ROWS):
+            rows = slice(offset, min(offset + EXPORT_CHUNK_ROWS, end))
+            years = np.asarray(partition.years[rows])
+            mask = window_mask(years, year_from, year_to)
+            if mask.any():
+                codes = np.asarray(partition.country_codes[rows])[mask]
+                yield {
+                    'country': names[codes],
+                    'metric': np.full(len(codes), metric, dtype=object),
+                    'year': years[mask],
+                    'value': np.asarray(partition.values[rows])[mask]
+                }
+
+
+def iter_nasa_chunks(nasa_series, metrics, year_from=None, year_to=None):
+    for metric in metrics:
+        years, values = nasa_series[metric]
+        mask = window_mask(years, year_from, year_to)
+        years, values = years[mask], values[mask]
+        for offset in range(0, len(years), EXPORT_CHUNK_ROWS):
+            rows = slice(offset, offset + EXPORT_CHUNK_ROWS)
+            yield {
+                'metric': np.full(len(years[rows]), metric, dtype=object),
+                'year': years[rows],
+                'value': values[rows]
+            }
+
+
+def encode_ndjson(columns, chunks):
+    names = [name for name, _ in columns]
+    for chunk in chunks:
+        rows = zip(*(chunk[name].tolist() for name in names))
+        yield ''.join(json.dumps(dict(zip(names, row))) + '\n' for row in rows).encode('utf-8')
+
+
+def encode_csv(columns, chunks):
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(names)
+    for chunk in chunks:
+        writer.writerows(zip(*(chunk[name].tolist() for name in names)))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_arrow(columns, chunks):
+    # one record batch per chunk on an IPC stream, flushed after every batch
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in chunks:
+        writer.write_batch(pa.record_batch([chunk[name] for name, _ in columns], schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def encode_export(source, chunks, export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    if export_format == 'arrow' and pa is None:
+        raise ValueError('Arrow export requires pyarrow')
+    encoder = {'ndjson': encode_ndjson, 'csv': encode_csv, 'arrow': encode_arrow}[export_format]
+    return encoder(EXPORT_COLUMNS[source], chunks)
@@ -0,0 +1,176 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.train import PolynomialTrend
+from utils.instrumentation import timed
+
+try:
+    import xgboost
+except ImportError:
+    xgboost = None
+
+FORECAST_HORIZON = 50
+MIN_FORECAST_POINTS = 5
+SMOOTHING_GRID = np.linspace(0.05, 0.95, 19)
+BOOSTING_LAGS = 3
+
+
+def annual_series(years, values):
+    # gaps are filled by linear interpolation so every model sees one value per year
+    years = np.asarray(years, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    full_years = np.arange(int(years[0]), int(years[-1]) + 1)
+    return full_years, np.interp(full_years, years, values)
+
+
+def forecast_years(last_year, n_years):
+    return list(range(last_year + 1, last_year + 1 + n_years))
+
+
+def fit_polynomial(years, values, degree=2):
+    years = np.asarray(years, dtype=np.float64)
+    center = years.mean()
+    scale = years.std() or 1.0
+    features = np.vander((years - center) / scale, degree + 1, increasing=True)
+    coefs = np.linalg.lstsq(features, values, rcond=None)[0]
+    return PolynomialTrend(coefs, center, scale, int(years[-1]), values[-1])
+
+
+def polynomial_forecasts(series, horizon):
+    return np.array([fit_polynomial(years, values).forecast(horizon) for years, values in series])
+
+
+def linear_forecasts(series, horizon):
+    return np.array([fit_polynomial(years, values, 1).forecast(horizon) for years, values in series])
+
+
+def exponential_smoothing_forecasts(series, horizon):
+    # Holt's linear method; alpha and beta are picked per series from a grid by
+    # one-step-ahead squared error, every grid point smoothed in one pass
+    alpha, beta = (grid.ravel() for grid in np.meshgrid(SMOOTHING_GRID, SMOOTHING_GRID, indexing='ij'))
+    steps = np.arange(1, horizon + 1)
+    forecasts = []
+    for years, values in series:
+        _, values = annual_series(years, values)
+        level = np.full(len(alpha), values[0])
+        trend = np.full(len(alpha), values[1] - values[0])
+        errors = np.zeros(len(alpha))
+        for value in values[1:]:
+            predicted = level + trend
+            errors += (value - predicted) ** 2
+            new_level = alpha * value + (1 - alpha) * predicted
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            level = new_level
+        best = np.argmin(errors)
+        forecasts.append(level[best] + trend[best] * steps)
+    return np.array(forecasts)
+
+
+def gradient_boosting_forecasts(series, horizon):
+    # one model per metric pooled over all countries: the next year-on-year change
+    # from the previous BOOSTING_LAGS changes, each series scaled by its own
+    # typical change, then rolled forward for every country at once
+    histories, scales, features, targets = [], [], [], []
+    for years, values in series:
+        _, values = annual_series(years, values)
+        changes = np.diff(values)
+        scale = np.abs(changes).mean() or 1.0
+        scaled = changes / scale
+        for i in range(BOOSTING_LAGS, len(scaled)):
+            features.append(scaled[i - BOOSTING_LAGS:i])
+            targets.append(scaled[i])
+        histories.append((values[-1], scaled[-BOOSTING_LAGS:]))
+        scales.append(scale)
+
+    model = xgboost.XGBRegressor(n_estimators=200, max_depth=3, learning_rate=0.05, n_jobs=1)
+    model.fit(np.array(features), np.array(targets))
+
+    scales = np.array(scales)
+    level = np.array([last for last, _ in histories])
+    lags = np.array([lagged for _, lagged in histories])
+    forecasts = np.empty((len(series), horizon))
+    for step in range(horizon):
+        change = model.predict(lags)
+        level = level + change * scales
+        forecasts[:, step] = level
+        lags = np.column_stack([lags[:, 1:], change])
+    return forecasts
+
+
+FORECAST_MODELS = {
+    'polynomial': polynomial_forecasts,
+    'linear': linear_forecasts,
+    'exponential_smoothing': exponential_smoothing_forecasts
+}
+if xgboost is not None:
+    FORECAST_MODELS['gradient_boosting'] = gradient_boosting_forecasts
+
+
+def get_forecast_model(model):
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model '{model}', expected one of {', '.join(FORECAST_MODELS)}")
+    return FORECAST_MODELS[model]
+
+
+def fit_forecasts(model, series, horizon):
+    # (len(series), horizon) array, NaN rows for series too short to fit
+    forecasts = np.full((len(series), horizon), np.nan)
+    usable = [i for i, (years, _) in enumerate(series) if len(years) >= MIN_FORECAST_POINTS]
+    if usable:
+        forecasts[usable] = get_forecast_model(model)([series[i] for i in usable], horizon)
+    return forecasts
+
+
+class ForecastTable:
+    # forecasts for every (model, metric, country) fitted ahead of time; rows are
+    # indexed by store country code so a lookup is a slice
+    def __init__(self, countries, horizon):
+        self.countries = countries
+        self.horizon = horizon
+        self.last_years = {}
+        self.forecasts = {}
+
+    def models(self):
+        return sorted({model for model, _ in self.forecasts})
+
+    def lookup(self, model, metric_key, country_code, n_years):
+        values = self.forecasts[(model, metric_key)][country_code, :n_years]
+        if np.isnan(values).any():
+            return None
+        last_year = int(self.last_years[metric_key][country_code])
+        return {'years': forecast_years(last_year, n_years), 'values': values.tolist()}
+
+
+@timed('build_forecast_table')
+def build_forecast_table(store, models=None, horizon=FORECAST_HORIZON, max_workers=None, metrics=None):
+    # every (model, metric) pair is one task; tasks fan out over a process pool
+    metrics = list(store.metrics if metrics is None else metrics)
+    models = list(models or FORECAST_MODELS)
+    for model in models:
+        get_forecast_model(model)
+    table = ForecastTable(store.countries, horizon)
+
+    series = {}
+    for metric_key in metrics:
+        partition = store.partition(metric_key)
+        series[metric_key] = [
+            (np.asarray(years), np.asarray(values)) if years is not None else (np.empty(0), np.empty(0))
+            for years, values in (partition.series(c) for c in range(len(store.countries)))
+        ]
+        last_years = np.zeros(len(store.countries), dtype=np.int64)
+        present = partition.present_countries()
+        last_years[present] = np.asarray(partition.years)[partition.ends[present] - 1]
+        table.last_years[metric_key] = last_years
+
+    tasks = [(model, metric_key) for model in models for metric_key in metrics]
+    if max_workers is None:
+        max_workers = int(os.environ.get('CLIMATEPULSE_FORECAST_WORKERS', os.cpu_count() or 1))
+    args = ([model for model, _ in tasks], [series[metric_key] for _, metric_key in tasks], [horizon] * len(tasks))
+    if max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(max_workers, len(tasks))) as executor:
+            results = list(executor.map(fit_forecasts, *args))
+    else:
+        results = list(map(fit_forecasts, *args))
+
+    table.forecasts = dict(zip(tasks, results))
+    return table
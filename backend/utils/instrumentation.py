@@ -0,0 +1,311 @@
+import bisect
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+from functools import wraps
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_labels(label_names, values, extra=()):
+    pairs = list(zip(label_names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def dump(self):
+        return [[list(key), value] for key, value in self.snapshot().items()]
+
+    def merge(self, values, dumped):
+        for key, value in dumped:
+            key = tuple(key)
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield self.name + format_labels(self.label_names, key), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {key: [list(counts), total] for key, (counts, total) in self.values.items()}
+
+    def dump(self):
+        return [[list(key), counts, total] for key, (counts, total) in self.snapshot().items()]
+
+    def merge(self, values, dumped):
+        for key, counts, total in dumped:
+            current = values.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0])
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total
+
+    def samples(self, values):
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield self.name + '_bucket' + format_labels(self.label_names, key, [('le', bound)]), cumulative
+            yield self.name + '_sum' + format_labels(self.label_names, key), total
+            yield self.name + '_count' + format_labels(self.label_names, key), cumulative
+
+
+class Registry:
+    # metrics live in the process that records them; once shared, every process
+    # also writes them to a common directory and render() adds up all of them,
+    # so any gunicorn worker answers a scrape for the whole server
+    def __init__(self):
+        self.metrics = []
+        self.shared_dir = None
+
+    def counter(self, name, description, label_names=()):
+        metric = Counter(name, description, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, description, label_names, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def share(self, directory, interval=None, reset=False):
+        # reset drops values inherited through fork, the parent reports those
+        # itself; without an interval the process only writes on flush()
+        if reset:
+            for metric in self.metrics:
+                with metric.lock:
+                    metric.values.clear()
+        os.makedirs(directory, exist_ok=True)
+        self.shared_dir = directory
+        self.flush()
+        if interval:
+            threading.Thread(target=self.run_flusher, args=(interval,), daemon=True).start()
+
+    def process_path(self, pid):
+        return os.path.join(self.shared_dir, f'metrics-{pid}.json')
+
+    def flush(self):
+        if self.shared_dir is None:
+            return
+        path = self.process_path(os.getpid())
+        with open(path + '.tmp', 'w') as f:
+            json.dump({metric.name: metric.dump() for metric in self.metrics}, f)
+        os.replace(path + '.tmp', path)
+
+    def run_flusher(self, interval):
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+    def read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def absorb(self, pid):
+        # folds the last flush of an exited process into this one, so counters
+        # keep growing when gunicorn replaces a worker
+        path = self.process_path(pid)
+        dumped = self.read(path)
+        for metric in self.metrics:
+            with metric.lock:
+                metric.merge(metric.values, dumped.get(metric.name, []))
+        self.flush()
+        if os.path.exists(path):
+            os.remove(path)
+
+    def collect(self):
+        # the live values of this process plus the last flush of every other one
+        totals = {metric.name: metric.snapshot() for metric in self.metrics}
+        if self.shared_dir is None:
+            return totals
+        own = os.path.basename(self.process_path(os.getpid()))
+        for name in sorted(os.listdir(self.shared_dir)):
+            if name == own or not name.endswith('.json'):
+                continue
+            dumped = self.read(os.path.join(self.shared_dir, name))
+            for metric in self.metrics:
+                metric.merge(totals[metric.name], dumped.get(metric.name, []))
+        return totals
+
+    def render(self):
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{sample} {value}' for sample, value in metric.samples(totals[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+REQUEST_DURATION = registry.histogram(
+    'climatepulse_request_duration_seconds', 'Request latency by route', ('route', 'method', 'status')
+)
+RESPONSE_BYTES = registry.counter(
+    'climatepulse_response_bytes_total', 'Response payload bytes by route', ('route',)
+)
+REQUEST_ERRORS = registry.counter(
+    'climatepulse_request_errors_total', 'Exceptions turned into error responses', ('route', 'exception')
+)
+LOADER_DURATION = registry.histogram(
+    'climatepulse_loader_duration_seconds', 'Time spent in loader phases, getters and model fits', ('operation',)
+)
+CACHE_LOOKUPS = registry.counter(
+    'climatepulse_cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result')
+)
+
+
+def timed(operation):
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                LOADER_DURATION.observe(time.perf_counter() - start, operation=operation)
+        return wrapper
+    return decorate
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_request(route, method, status, duration, size):
+    REQUEST_DURATION.observe(duration, route=route, method=method, status=status)
+    if size:
+        RESPONSE_BYTES.inc(size, route=route)
+
+
+def record_error(route, error):
+    REQUEST_ERRORS.inc(route=route, exception=type(error).__name__)
+
+
+class SamplingProfiler:
+    # one background thread samples the stacks of the threads serving requests;
+    # a request slower than slow_ms leaves a folded-stack file that
+    # flamegraph.pl or speedscope turn into a flame graph
+    def __init__(self, output_dir, slow_ms=500, interval_ms=5):
+        self.output_dir = output_dir
+        self.slow_ms = slow_ms
+        self.interval_ms = interval_ms
+        self.enabled = False
+        self.active = {}
+        self.lock = threading.Lock()
+        self.sampler = None
+
+    def configure(self, enabled=None, slow_ms=None, interval_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+        if interval_ms is not None:
+            self.interval_ms = max(1.0, float(interval_ms))
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if self.enabled and self.sampler is None:
+            self.sampler = threading.Thread(target=self.run, daemon=True)
+            self.sampler.start()
+        return self.status()
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'interval_ms': self.interval_ms,
+            'output_dir': self.output_dir
+        }
+
+    def start_request(self):
+        if not self.enabled:
+            return None
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.active[thread_id] = collections.Counter()
+        return thread_id
+
+    def finish_request(self, token, duration, label):
+        if token is None:
+            return None
+        with self.lock:
+            stacks = self.active.pop(token, None)
+        if not stacks or duration * 1000 < self.slow_ms:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+        path = os.path.join(self.output_dir, f'{int(time.time() * 1000)}-{os.getpid()}-{name}.folded')
+        with open(path, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+        return path
+
+    def run(self):
+        while True:
+            time.sleep(self.interval_ms / 1000)
+            if not self.enabled:
+                continue
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
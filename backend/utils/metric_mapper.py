@@ -1,25 +1,21 @@
-METRIC_MAP = {
-    'co2'          : 'Carbon dioxide (CO2) emissions (total) excluding LULUCF (Mt CO2e)',
-    'renewable'    : 'Renewable energy consumption (% of total final energy consumption)',
-    'forest'       : 'Forest area (% of land area)',
-    'air_pollution': 'PM2.5 air pollution, mean annual exposure (micrograms per cubic meter)'
-}
-
-METRIC_MAP_INV = {
-    'Carbon dioxide (CO2) emissions (total) excluding LULUCF (Mt CO2e)'      : 'co2',
-    'Renewable energy consumption (% of total final energy consumption)'     : 'renewable',
-    'Forest area (% of land area)'                                           : 'forest',
-    'PM2.5 air pollution, mean annual exposure (micrograms per cubic meter)' : 'air_pollution'
-}
-
-NASA_MAP = {
-    'co2'           : 'carbon-dioxide',
-    'methane'       : 'methane',
-    'temperature'   : 'global-temperature',
-    'ocean_warming' : 'ocean-warming',
-    'sea_level'     : 'sea-level',
-    'arctic_sea_ice': 'arctic-sea-ice',
-}
+import json
+from config.get_path import get_indicators_path
+
+# the indicator registry is the single list of served metrics: the spider,
+# the loader and the API all read it from config/indicators.json
+with open(get_indicators_path(), encoding='utf-8') as f:
+    INDICATORS = json.load(f)
+
+WB_INDICATORS = [indicator for indicator in INDICATORS if indicator['source'] == 'worldbank']
+NASA_INDICATORS = [indicator for indicator in INDICATORS if indicator['source'] == 'nasa']
+
+METRIC_MAP = {indicator['key']: indicator['name'] for indicator in WB_INDICATORS}
+
+METRIC_MAP_INV = {indicator['name']: indicator['key'] for indicator in WB_INDICATORS}
+
+METRIC_CODE_MAP = {indicator['code']: indicator['key'] for indicator in WB_INDICATORS}
+
+NASA_MAP = {indicator['key']: indicator['code'] for indicator in NASA_INDICATORS}
 
 def get_metric_name(key):
     return METRIC_MAP.get(key.lower(), key)
@@ -27,8 +23,20 @@ def get_metric_name(key):
 def get_metric_key(name):
     return METRIC_MAP_INV.get(name, name)
 
+def get_metric_key_by_code(code):
+    return METRIC_CODE_MAP.get(code, code)
+
+def get_metric_column(key):
+    return next(indicator['column'] for indicator in WB_INDICATORS if indicator['key'] == key)
+
 def get_nasa_metric_name(key):
     return NASA_MAP.get(key.lower(), key)
 
+def get_indicators(source=None):
+    return [indicator for indicator in INDICATORS if source is None or indicator['source'] == source]
+
 def get_available_metrics():
-    return [{'key': k, 'name': v} for k, v in METRIC_MAP.items()]
\ No newline at end of file
+    return [
+        {'key': indicator['key'], 'name': indicator['name'], 'unit': indicator['unit'], 'code': indicator['code']}
+        for indicator in WB_INDICATORS
+    ]
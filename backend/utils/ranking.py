@@ -0,0 +1,49 @@
+import numpy as np
+
+AGGREGATES = ('mean', 'latest', 'min', 'max', 'growth')
+
+
+def compute_aggregates(partition, n_countries, year_from=None, year_to=None):
+    # per-country aggregates of one indicator over a year window, NaN where a
+    # country has no value in the window; rows are sorted by country then year
+    rows = np.ones(len(partition), dtype=bool)
+    if year_from is not None:
+        rows &= partition.years >= year_from
+    if year_to is not None:
+        rows &= partition.years <= year_to
+    codes = np.asarray(partition.country_codes)[rows]
+    years = np.asarray(partition.years)[rows].astype(np.float64)
+    values = np.asarray(partition.values)[rows]
+
+    aggregates = {name: np.full(n_countries, np.nan) for name in AGGREGATES}
+    if not len(values):
+        return aggregates
+
+    starts = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+    ends = np.append(starts[1:], len(codes)) - 1
+    present = codes[starts]
+
+    counts = ends - starts + 1
+    aggregates['mean'][present] = np.add.reduceat(values, starts) / counts
+    aggregates['min'][present] = np.minimum.reduceat(values, starts)
+    aggregates['max'][present] = np.maximum.reduceat(values, starts)
+    aggregates['latest'][present] = values[ends]
+
+    # compound annual growth rate between the first and last year in the window
+    first, last = values[starts], values[ends]
+    span = years[ends] - years[starts]
+    valid = (first > 0) & (last >= 0) & (span > 0)
+    growth = np.full(len(starts), np.nan)
+    growth[valid] = (last[valid] / first[valid]) ** (1 / span[valid]) - 1
+    aggregates['growth'][present] = growth
+    return aggregates
+
+
+def top_n(values, limit, ascending=False):
+    candidates = np.flatnonzero(~np.isnan(values))
+    keys = values[candidates] if ascending else -values[candidates]
+    if 0 <= limit < len(candidates):
+        selected = np.argpartition(keys, limit)[:limit] if limit else np.array([], dtype=int)
+        candidates, keys = candidates[selected], keys[selected]
+    order = np.lexsort((candidates, keys))
+    return candidates[order]
@@ -0,0 +1,98 @@
+import threading
+import time
+from config.get_path import get_file_fingerprint, get_reload_stamp_path
+
+
+class DataReloader:
+    # owns the live loader; every build, the first one included, runs off the
+    # request path and swaps the reference, so in-flight requests finish on the
+    # loader they read and the server answers 503 until the first build is done
+    def __init__(self, loader_factory):
+        self.loader_factory = loader_factory
+        self.lock = threading.Lock()
+        self.watcher = None
+        self.status = {'state': 'loading'}
+        self.loader = None
+        self.fingerprints = None
+        self.loaded = threading.Event()
+        self.reload_in_background()
+
+    def build(self):
+        start = time.perf_counter()
+        loader = self.loader_factory()
+        # everything too slow to build on a request is built here, before the
+        # swap; the cheap per-indicator tables stay lazy
+        loader.load_balance_snapshots()
+        loader.load_forecast_models()
+        loader.load_forecast_tables()
+        loader.load_map_classes()
+        loader.load_rollups()
+        status = {
+            'state': 'ready',
+            'duration_seconds': round(time.perf_counter() - start, 3),
+            'loaded_at': time.time(),
+            'records': loader.record_counts()
+        }
+        return loader, status
+
+    def ready(self):
+        # a failed reload keeps serving the previous loader
+        return self.status['state'] != 'loading' and self.loader is not None
+
+    def wait(self, timeout=None):
+        # blocks until the first build has finished or failed
+        return self.loaded.wait(timeout)
+
+    def reload(self):
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            self.status = dict(self.status, state='loading' if self.loader is None else 'reloading')
+            loader, status = self.build()
+            self.fingerprints = self.source_fingerprints(loader)
+            self.loader = loader
+            self.status = status
+        except Exception as e:
+            self.status = dict(self.status, state='failed', error=str(e))
+        finally:
+            self.lock.release()
+            self.loaded.set()
+        return True
+
+    def request_reload(self):
+        # touching the stamp reaches every process watching the same data
+        # directory, e.g. all gunicorn workers; this one reloads right away
+        with open(get_reload_stamp_path(), 'w') as f:
+            f.write(str(time.time_ns()))
+        return self.reload_in_background()
+
+    def scope(self):
+        return 'all workers' if self.watcher is not None else 'this process'
+
+    def reload_in_background(self):
+        if self.lock.locked():
+            return False
+        threading.Thread(target=self.reload, daemon=True).start()
+        return True
+
+    def source_fingerprints(self, loader):
+        fingerprints = {}
+        paths = dict(loader.source_paths(), csv=loader.wb_csv_path, reload_stamp=get_reload_stamp_path())
+        for name, path in paths.items():
+            try:
+                fingerprints[name] = get_file_fingerprint(path)
+            except OSError:
+                fingerprints[name] = None
+        return fingerprints
+
+    def watch(self, interval):
+        def poll():
+            while True:
+                time.sleep(interval)
+                loader = self.loader
+                if loader is not None and self.source_fingerprints(loader) != self.fingerprints:
+                    self.reload()
+
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=poll, daemon=True)
+            self.watcher.start()
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, current_app, request
+from utils.instrumentation import record_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CachedResponse:
+    def __init__(self, body, status):
+        self.status = status
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body}
+
+    def add_compressed_variants(self, min_size):
+        body = self.variants['identity']
+        if len(body) < min_size:
+            return
+        self.variants['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=5)
+
+    def variant_etag(self, encoding):
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+
+class ResponseCache:
+    # (endpoint, normalized params) -> encoded JSON bytes with a strong ETag and
+    # precompressed variants; everything is dropped when the data source changes
+    def __init__(self, max_entries=2048, min_compress_size=1024):
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self.entries = OrderedDict()
+        self.source = None
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def lookup(self, key, source):
+        with self.lock:
+            if source is not self.source:
+                self.entries.clear()
+                self.source = source
+                entry = None
+            else:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+        record_cache('response', entry is not None)
+        return entry
+
+    def store(self, key, entry, source):
+        with self.lock:
+            if source is not self.source:
+                return
+            self.entries[key] = entry
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def build(self, build):
+        result = build()
+        data, status = result if isinstance(result, tuple) else (result, 200)
+        if isinstance(data, bytes):
+            body = data
+        else:
+            body = current_app.json.dumps(data, separators=(',', ':')).encode('utf-8')
+        entry = CachedResponse(body, status)
+        if status == 200:
+            entry.add_compressed_variants(self.min_compress_size)
+        return entry
+
+    def respond(self, key, build, source):
+        entry = self.lookup(key, source)
+        if entry is None:
+            entry = self.build(build)
+            self.store(key, entry, source)
+
+        if entry.status == 200 and any(
+            request.if_none_match.contains(entry.variant_etag(encoding)) for encoding in entry.variants
+        ):
+            response = Response(status=304)
+            response.set_etag(entry.variant_etag(self.pick_encoding(entry)))
+            return response
+
+        encoding = self.pick_encoding(entry)
+        response = Response(entry.variants[encoding], status=entry.status, mimetype='application/json')
+        if entry.status == 200:
+            response.set_etag(entry.variant_etag(encoding))
+            response.headers['Cache-Control'] = 'no-cache'
+        if len(entry.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def pick_encoding(self, entry):
+        accepted = request.accept_encodings
+        for encoding in ('br', 'gzip'):
+            if encoding in entry.variants and accepted[encoding]:
+                return encoding
+        return 'identity'
+
+
+def normalize_params(items):
+    # params sorted by name only: repeated ones keep their order, which is
+    # meaningful, e.g. /api/batch answers its q params in the order given
+    return tuple(sorted(items, key=lambda item: item[0]))
+
+
+def request_cache_key():
+    return request.path, normalize_params(request.args.items(multi=True))
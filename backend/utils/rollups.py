@@ -0,0 +1,76 @@
+import numpy as np
+
+WORLD = 'World'
+
+
+def rollup_partition(partition, groups, n_groups):
+    # per (group, year) sum and reporting count of one indicator in a single
+    # bincount; groups maps a country code to its group, -1 leaves it out
+    years = np.asarray(partition.years, dtype=np.int64)
+    row_groups = groups[np.asarray(partition.country_codes)]
+    keep = row_groups >= 0
+    if not keep.any():
+        return np.empty(0, dtype=np.int64), np.zeros((n_groups, 0)), np.zeros((n_groups, 0), dtype=np.int64)
+
+    first, last = years[keep].min(), years[keep].max()
+    span = int(last - first + 1)
+    keys = row_groups[keep] * span + (years[keep] - first)
+    sums = np.bincount(keys, np.asarray(partition.values)[keep], n_groups * span).reshape(n_groups, span)
+    counts = np.bincount(keys, minlength=n_groups * span).reshape(n_groups, span)
+    return np.arange(first, last + 1), sums, counts
+
+
+class Rollups:
+    # sums, unweighted means and coverage per (region, metric, year); the world
+    # row adds up every region
+    def __init__(self, store, regions):
+        names = sorted({region for region in regions if region})
+        self.regions = names + [WORLD]
+        index = {region: r for r, region in enumerate(names)}
+        self.groups = np.array([index.get(region, -1) for region in regions], dtype=np.int64)
+        members = np.bincount(self.groups[self.groups >= 0], minlength=len(names))
+        self.members = np.append(members, members.sum())
+        self.store = store
+        self.tables = {}
+
+    def table(self, metric_key):
+        # materialized per indicator on first use and kept for the loader's lifetime
+        if metric_key not in self.tables:
+            years, sums, counts = rollup_partition(self.store.partition(metric_key), self.groups, len(self.regions) - 1)
+            sums = np.vstack([sums, sums.sum(axis=0)])
+            counts = np.vstack([counts, counts.sum(axis=0)])
+            self.tables[metric_key] = (years, sums, counts)
+        return self.tables[metric_key]
+
+    def region_index(self, region):
+        for r, name in enumerate(self.regions):
+            if name.casefold() == region.strip().casefold():
+                return r
+        raise ValueError(f"Unknown region '{region}', expected one of {', '.join(self.regions)}")
+
+    def get(self, metric_key, region=None, year_from=None, year_to=None):
+        years, sums, counts = self.table(metric_key)
+        in_window = np.ones(len(years), dtype=bool)
+        if year_from is not None:
+            in_window &= years >= year_from
+        if year_to is not None:
+            in_window &= years <= year_to
+
+        rows = range(len(self.regions)) if region is None else [self.region_index(region)]
+        result = {}
+        for r in rows:
+            columns = np.flatnonzero(in_window & (counts[r] > 0))
+            result[self.regions[r]] = {
+                'years': years[columns].tolist(),
+                'sum': sums[r, columns].tolist(),
+                'mean': (sums[r, columns] / counts[r, columns]).tolist(),
+                'countries': counts[r, columns].tolist(),
+                'coverage': (counts[r, columns] / self.members[r]).round(4).tolist()
+            }
+        return result
+
+    def describe(self):
+        return [
+            {'region': region, 'countries': int(self.members[r])}
+            for r, region in enumerate(self.regions)
+        ]
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+import numpy as np
+from utils.columnar_store import ColumnarStore, SeriesPartition
+from utils.countries import CountryDimension
+
+SNAPSHOT_VERSION = 6
+MANIFEST_NAME = 'manifest.json'
+ALIGNMENT = 64
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_sources(sources):
+    described = {}
+    for name, path in sources.items():
+        stat = os.stat(path)
+        described[name] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': hash_file(path)
+        }
+    return described
+
+
+def sources_match(recorded, sources):
+    if set(recorded) != set(sources):
+        return False
+    for name, path in sources.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != recorded[name]['size']:
+            return False
+        # mtime is the fast path, the hash covers copies that touched mtimes only
+        if stat.st_mtime_ns != recorded[name]['mtime_ns'] and hash_file(path) != recorded[name]['sha256']:
+            return False
+    return True
+
+
+def write_arrays(path, arrays):
+    # the arrays back to back at aligned offsets; the layout records where each
+    # one starts so a reader can view it in place
+    layout, offset = [], 0
+    with open(path, 'wb') as f:
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            array.tofile(f)
+            layout.append([array.dtype.str, offset, len(array)])
+            offset += array.nbytes
+    return layout, offset
+
+
+def write_snapshot(snapshot_dir, loader, sources):
+    described = describe_sources(sources)
+    tmp_dir = snapshot_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # every column of every indicator, then the NASA series, go into one file
+    # whose name is unique to this snapshot: a loader maps it with a single
+    # handle, and that mapping pins the snapshot it read across later swaps
+    metrics = loader.wb_store.metrics
+    arrays = [column for metric in metrics for column in loader.wb_store.partition(metric).columns().values()]
+    nasa_metrics = list(loader.nasa_data.keys())
+    nasa_keys = [key for metric in nasa_metrics for key in loader.nasa_data[metric].keys()]
+    nasa_values = [value for metric in nasa_metrics for value in loader.nasa_data[metric].values()]
+    nasa_offsets = np.cumsum([0] + [len(loader.nasa_data[metric]) for metric in nasa_metrics])
+    arrays += [np.array(nasa_keys, dtype=str), np.array(nasa_values, dtype=np.float64), nasa_offsets.astype(np.int64)]
+    data_name = f'data-{time.time_ns()}.bin'
+    layout, data_size = write_arrays(os.path.join(tmp_dir, data_name), arrays)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'sources': described,
+        'countries': loader.countries.columns(),
+        'metrics': metrics,
+        'data_file': data_name,
+        'data_size': data_size,
+        'layout': layout,
+        # what startup needs to know about the partitions without mapping them
+        'present_countries': loader.wb_store.data_countries().tolist(),
+        'row_counts': loader.wb_store.metric_row_counts(),
+        'nasa_metrics': nasa_metrics,
+        'country_metadata': loader.country_metadata
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f)
+
+    # running workers keep their mappings of the old files after the swap
+    old_dir = snapshot_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_snapshot(snapshot_dir, sources, retry=True):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION or not sources_match(manifest['sources'], sources):
+        return None
+
+    try:
+        with open(os.path.join(snapshot_dir, manifest['data_file']), 'rb') as f:
+            if os.fstat(f.fileno()).st_size != manifest['data_size']:
+                raise OSError(f"{manifest['data_file']} is not the size its manifest records")
+            # the mapping outlives the handle and keeps this file's inode alive
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if manifest['data_size'] else b''
+    except OSError:
+        # a swap between reading the manifest and opening its data file is seen
+        # whole on the next read; a snapshot that is still broken is rebuilt from
+        # the sources by the caller
+        return read_snapshot(snapshot_dir, sources, retry=False) if retry else None
+
+    def view(i):
+        dtype, offset, length = manifest['layout'][i]
+        return np.frombuffer(buffer, dtype=np.dtype(dtype), count=length, offset=offset)
+
+    n_columns = len(SeriesPartition.COLUMNS)
+    nasa_keys, nasa_values, nasa_offsets = (view(len(manifest['metrics']) * n_columns + i) for i in range(3))
+    metric_index = {metric: m for m, metric in enumerate(manifest['metrics'])}
+
+    def load_partition(metric):
+        first = metric_index[metric] * n_columns
+        return SeriesPartition(*(view(first + i) for i in range(n_columns)))
+
+    countries = CountryDimension(**manifest['countries'])
+    wb_store = ColumnarStore(
+        countries.names, manifest['metrics'], load_partition, countries,
+        present=manifest['present_countries'], row_counts=manifest['row_counts']
+    )
+
+    nasa_data = {
+        metric: dict(zip(
+            nasa_keys[nasa_offsets[i]:nasa_offsets[i + 1]].tolist(),
+            nasa_values[nasa_offsets[i]:nasa_offsets[i + 1]].tolist()
+        ))
+        for i, metric in enumerate(manifest['nasa_metrics'])
+    }
+    return {
+        'wb_store': wb_store,
+        'countries': countries,
+        'nasa_data': nasa_data,
+        'country_metadata': manifest['country_metadata']
+    }
@@ -0,0 +1,98 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def angular_distance(lat, lon, lats, lons):
+    # great-circle distance in degrees (haversine)
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))))
+
+
+def parse_bbox(text):
+    # "west,south,east,north" in degrees; west > east crosses the antimeridian
+    try:
+        west, south, east, north = (float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError('bbox must be west,south,east,north')
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError('bbox is out of range')
+    return west, south, east, north
+
+
+class CentroidGrid:
+    # country centroids bucketed into cell_degrees x cell_degrees cells; points
+    # are sorted by (row, col) so every cell, and every run of cells in one
+    # row, is a contiguous slice delimited by cell_starts/cell_ends
+    def __init__(self, keys, latitudes, longitudes, cell_degrees=10):
+        self.keys = np.asarray(keys)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self.n_rows = int(np.ceil(180 / cell_degrees))
+        self.n_cols = int(np.ceil(360 / cell_degrees))
+
+        rows, cols = self.row_of(self.latitudes), self.col_of(self.longitudes)
+        self.order = np.lexsort((cols, rows))
+        keys = (rows * self.n_cols + cols)[self.order]
+        all_cells = np.arange(self.n_rows * self.n_cols)
+        self.cell_starts = np.searchsorted(keys, all_cells, 'left')
+        self.cell_ends = np.searchsorted(keys, all_cells, 'right')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def row_of(self, latitude):
+        return np.clip(np.floor_divide(np.add(latitude, 90), self.cell_degrees).astype(int), 0, self.n_rows - 1)
+
+    def col_of(self, longitude):
+        return np.clip(np.floor_divide(np.add(longitude, 180), self.cell_degrees).astype(int), 0, self.n_cols - 1)
+
+    def cells(self, row, col_from=0, col_to=None):
+        col_to = self.n_cols - 1 if col_to is None else col_to
+        first, last = row * self.n_cols + col_from, row * self.n_cols + col_to
+        return self.order[self.cell_starts[first]:self.cell_ends[last]]
+
+    def within(self, west, south, east, north):
+        rows = range(int(self.row_of(south)), int(self.row_of(north)) + 1)
+        if west <= east:
+            col_ranges = [(int(self.col_of(west)), int(self.col_of(east)))]
+        else:
+            col_ranges = [(int(self.col_of(west)), self.n_cols - 1), (0, int(self.col_of(east)))]
+        candidates = np.concatenate(
+            [self.cells(row, *cols) for row in rows for cols in col_ranges] or [np.empty(0, dtype=np.intp)]
+        )
+
+        lats, lons = self.latitudes[candidates], self.longitudes[candidates]
+        inside = (lats >= south) & (lats <= north)
+        inside &= ((lons >= west) & (lons <= east)) if west <= east else ((lons >= west) | (lons <= east))
+        return np.unique(candidates[inside])
+
+    def nearest(self, latitude, longitude, k=1):
+        # sweep latitude bands outwards from the query row; a band further than
+        # the k-th best distance cannot hold a closer point, since a great-circle
+        # distance is never shorter than the latitude difference
+        k = min(k, len(self))
+        start_row = int(self.row_of(latitude))
+        found, distances = np.empty(0, dtype=np.intp), np.empty(0)
+        for step in range(self.n_rows):
+            rows = sorted({start_row - step, start_row + step} & set(range(self.n_rows)))
+            if not rows:
+                break
+            gap = min(
+                latitude - (row + 1) * self.cell_degrees + 90 if row < start_row else
+                row * self.cell_degrees - 90 - latitude if row > start_row else 0
+                for row in rows
+            )
+            if len(found) >= k and gap > distances[k - 1]:
+                break
+
+            band = np.concatenate([self.cells(row) for row in rows])
+            found = np.concatenate([found, band])
+            distances = np.concatenate([
+                distances, angular_distance(latitude, longitude, self.latitudes[band], self.longitudes[band])
+            ])
+            order = np.lexsort((found, distances))[:k]
+            found, distances = found[order], distances[order]
+        return found, np.radians(distances) * EARTH_RADIUS_KM
@@ -1,37 +1,62 @@
 import pandas as pd
 import numpy as np
-import json
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
+from utils.instrumentation import timed
 
-def predict_metrics(n_years, json_data):
+
+class PolynomialTrend:
+    def __init__(self, coefs, center, scale, last_year, last_value):
+        self.coefs = coefs
+        self.center = center
+        self.scale = scale
+        self.last_year = last_year
+        self.last_value = last_value
+
+    def predict(self, years):
+        t = (np.asarray(years, dtype=np.float64) - self.center) / self.scale
+        return np.vander(t, len(self.coefs), increasing=True) @ self.coefs
+
+    def forecast(self, n_years):
+        future_years = np.arange(self.last_year + 1, self.last_year + 1 + n_years)
+        future_pred = self.predict(future_years)
+        if len(future_pred) > 0:
+            # anchor the curve on the last observed value
+            return future_pred - future_pred[0] + self.last_value
+        return np.array([])
+
+
+@timed('fit_polynomial_models')
+def fit_polynomial_models(json_data, degree=2):
     df = pd.DataFrame(json_data)
     df['year'] = df['year'].astype(int)
     df = df.groupby(['metric', 'year'])['value'].mean().reset_index()
     df = df.sort_values(['metric', 'year'])
 
-    predictions = {}
-    for metric in df['metric'].unique():
-        metric_data = df[df['metric'] == metric]
+    codes, metrics = pd.factorize(df['metric'], sort=True)
+    years = df['year'].to_numpy(dtype=np.float64)
+    values = df['value'].to_numpy(dtype=np.float64)
+    n_metrics = len(metrics)
 
-        X = metric_data[['year']]
-        y = metric_data['value']
+    # years are centered and scaled per metric to keep the normal equations well conditioned
+    counts = np.bincount(codes, minlength=n_metrics)
+    center = np.bincount(codes, years, n_metrics) / counts
+    scale = np.sqrt(np.bincount(codes, (years - center[codes]) ** 2, n_metrics) / counts)
+    scale[scale == 0] = 1.0
+    t = (years - center[codes]) / scale[codes]
 
-        model = make_pipeline(
-            PolynomialFeatures(degree=2),
-            LinearRegression()
-        )
-        model.fit(X, y)
+    # one batched least-squares solve over all metrics
+    features = np.vander(t, degree + 1, increasing=True)
+    gram = np.zeros((n_metrics, degree + 1, degree + 1))
+    moments = np.zeros((n_metrics, degree + 1))
+    np.add.at(gram, codes, features[:, :, None] * features[:, None, :])
+    np.add.at(moments, codes, features * values[:, None])
+    coefs = (np.linalg.pinv(gram) @ moments[:, :, None])[:, :, 0]
 
-        last_real_year = X['year'].max()
-        future_years = np.arange(last_real_year + 1, last_real_year + 1 + n_years)
-        future_X = pd.DataFrame({'year': future_years})
-        future_pred = model.predict(future_X)
+    last_rows = np.flatnonzero(np.append(codes[1:] != codes[:-1], True))
+    return {
+        metric: PolynomialTrend(coefs[i], center[i], scale[i], int(years[last_rows[i]]), values[last_rows[i]])
+        for i, metric in enumerate(metrics)
+    }
 
-        if len(future_pred) > 0:
-            adjusted_pred = future_pred - future_pred[0] + y.iloc[-1]
-        else:
-            adjusted_pred = np.array([])
-        predictions[metric] = adjusted_pred.tolist()
-    return predictions
+
+def predict_metrics(n_years, models):
+    return {metric: model.forecast(n_years).tolist() for metric, model in models.items()}
@@ -0,0 +1,89 @@
+import os
+import pytest
+from datasets import data_dir
+from utils.data_loader import ClimateDataLoader
+from utils.snapshot import write_snapshot
+
+
+def reset_analytics(loader):
+    loader.analytics_cache.clear()
+    loader.panel_cubes.clear()
+    loader.map_classes.clear()
+
+
+GETTERS = {
+    'global_temperature': lambda loader: loader.get_global_data_by_metric('temperature'),
+    'global_sea_level': lambda loader: loader.get_global_data_by_metric('sea-level'),
+    'global_sea_level_downsampled': lambda loader: loader.get_global_data_by_metric('sea-level', max_points=300),
+    'local_by_country': lambda loader: loader.get_local_data_by_country('Germany'),
+    'local_by_country_metric': lambda loader: loader.get_local_data_by_country('Germany', 'co2'),
+    'local_by_metric': lambda loader: loader.get_local_data_by_metric('co2'),
+    'local_by_metric_window': lambda loader: loader.get_local_data_by_metric('co2', year_from=2010, year_to=2020),
+    'local_by_metric_country': lambda loader: loader.get_local_data_by_metric('co2', 'Germany'),
+    'country_names': lambda loader: loader.get_country_names(),
+    'top_countries': lambda loader: loader.get_top_countries_by_metric('co2'),
+    'top_countries_window': lambda loader: loader.get_top_countries_by_metric('renewable', aggregate='growth', year_from=2000, year_to=2020),
+    'forest_data': lambda loader: loader.get_forest_data(2015),
+    'forest_data_range': lambda loader: loader.get_forest_data_range(1990, 2020),
+    'predictions': lambda loader: loader.get_predictions(10),
+    'forecast_all_countries': lambda loader: loader.get_forecast('co2', n_years=20),
+    'map_data': lambda loader: loader.get_map_data('co2', 2020, (-10, 35, 30, 60)),
+    'map_classes': lambda loader: loader.get_map_classes('co2', 2020, 'jenks'),
+    'nearest_countries': lambda loader: loader.get_nearest_countries(48.8, 2.3, 5),
+    'correlations_by_year': lambda loader: loader.get_correlations(by_year=True),
+    'trend_slopes': lambda loader: loader.get_trend_slopes('co2', year_from=2000),
+    'rollups': lambda loader: loader.get_rollups('co2'),
+    'export_rows': lambda loader: sum(1 for _ in loader.iter_export_chunks('worldbank'))
+}
+
+COLD_STEPS = {
+    'rankings': (lambda loader: loader.ranking_cache.clear(), lambda loader: loader.get_top_countries_by_metric('co2')),
+    'analytics': (reset_analytics, lambda loader: loader.get_correlations(by_year=True)),
+    'rollups': (lambda loader: setattr(loader, 'rollups', None), lambda loader: loader.load_rollups()),
+    'map_classes': (reset_analytics, lambda loader: loader.get_map_classes('co2', 2020, 'jenks')),
+    'map_classes_table': (lambda loader: loader.map_classes.clear(), lambda loader: loader.load_map_classes()),
+    'balance_snapshots': (lambda loader: None, lambda loader: loader.load_balance_snapshots()),
+    'forecast_table': (
+        lambda loader: loader.forecast_tables.clear(),
+        lambda loader: loader.load_forecast_table('co2')
+    ),
+    'forecast_models': (
+        lambda loader: setattr(loader, 'forecast_models', {}),
+        lambda loader: loader.load_forecast_models()
+    )
+}
+
+
+@pytest.fixture(scope='session')
+def snapshot_dir(loader, dataset):
+    with data_dir(dataset[0]):
+        write_snapshot(loader.snapshot_path, loader, loader.source_paths())
+    return loader.snapshot_path
+
+
+@pytest.mark.benchmark(group='loader')
+def bench_construct_from_json(bench, dataset):
+    with data_dir(dataset[0]):
+        bench.pedantic(ClimateDataLoader, kwargs={'use_snapshot': False}, rounds=3)
+
+
+@pytest.mark.benchmark(group='loader')
+def bench_construct_from_snapshot(bench, dataset, snapshot_dir):
+    assert os.path.exists(snapshot_dir)
+    with data_dir(dataset[0]):
+        bench.pedantic(ClimateDataLoader, rounds=5)
+
+
+@pytest.mark.benchmark(group='getters')
+@pytest.mark.parametrize('getter', GETTERS)
+def bench_getter(bench, loader, getter):
+    call = GETTERS[getter]
+    call(loader)
+    bench(call, loader)
+
+
+@pytest.mark.benchmark(group='cold')
+@pytest.mark.parametrize('step', COLD_STEPS)
+def bench_cold(bench, loader, step):
+    reset, call = COLD_STEPS[step]
+    bench.pedantic(call, args=(loader,), setup=lambda: reset(loader), rounds=3)
@@ -0,0 +1,63 @@
+from urllib.parse import quote
+import pytest
+from datasets import ADMIN_TOKEN
+
+BATCH = '/api/batch?' + '&'.join('q=' + quote(url) for url in (
+    '/api/nasa/global-temperature', '/api/nasa/carbon-dioxide?max_points=300', '/api/top/co2?limit=5'
+))
+
+ROUTES = {
+    'list_metrics': ['/api/metrics'],
+    'list_indicators': ['/api/indicators?source=worldbank'],
+    'nasa_global_data': ['/api/nasa'],
+    'nasa_metric_data': ['/api/nasa/sea-level', '/api/nasa/sea-level?from=2000&max_points=200'],
+    'country_list': ['/api/countries'],
+    'wb_metric': ['/api/wb/metric?metric=co2', '/api/wb/metric?metric=co2&country=Germany'],
+    'wb_country': ['/api/wb/country?country=Germany', '/api/wb/country?country=Germany&metric=forest'],
+    'top_countries': ['/api/top/co2?limit=10', '/api/top/renewable?aggregate=growth&from=2000&to=2020'],
+    'country_metrics': ['/api/country/Germany/metrics'],
+    'map_data': ['/api/map?metric=co2&year=2020', '/api/map?metric=co2&year=2020&bbox=-10,35,30,60'],
+    'map_classes': ['/api/map/classes?metric=co2', '/api/map/classes?metric=co2&year=2020&method=jenks'],
+    'nearest_countries': ['/api/map/nearest?lat=48.8&lon=2.3&k=5'],
+    'correlations': ['/api/analytics/correlations', '/api/analytics/correlations?by=year&from=2000&to=2020'],
+    'trend_slopes': ['/api/analytics/trends/co2?from=2000'],
+    'year_over_year': ['/api/analytics/yoy/co2', '/api/analytics/yoy/co2?country=Germany'],
+    'regions': ['/api/regions'],
+    'rollups': ['/api/rollups/co2', '/api/rollups/co2?region=world&from=2000&to=2020'],
+    'predict_endpoint': ['/api/predict/10', '/api/predict/10?model=exponential_smoothing'],
+    'forecast': ['/api/forecast/co2?country=Germany&years=20', '/api/forecast/co2?model=linear'],
+    'countries_data': ['/api/countries_data'],
+    'get_balance_range': ['/api/balance?from=1990&to=2020'],
+    'get_balance_data': ['/api/balance/2015'],
+    'export': ['/api/export?format=ndjson', '/api/export?format=csv&source=nasa'],
+    'batch': [BATCH],
+    'admin_reload': ['/api/admin/reload'],
+    'admin_profiler': ['/api/admin/profiler'],
+    'metrics': ['/metrics'],
+    'health': ['/api/health'],
+    'ready': ['/api/ready']
+}
+CASES = [(endpoint, url) for endpoint, urls in ROUTES.items() for url in urls]
+
+
+def bench_every_route_is_covered(app_module):
+    endpoints = {rule.endpoint for rule in app_module.app.url_map.iter_rules()} - {'static'}
+    assert endpoints == set(ROUTES)
+
+
+@pytest.mark.benchmark(group='routes')
+@pytest.mark.parametrize('cache', ['warm', 'cold'])
+@pytest.mark.parametrize('endpoint, url', CASES, ids=[url for _, url in CASES])
+def bench_route(bench, app_module, endpoint, url, cache):
+    client = app_module.app.test_client()
+
+    def get():
+        response = client.get(url, headers={'X-Admin-Token': ADMIN_TOKEN})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return len(response.get_data())
+
+    bench.extra_info['bytes'] = get()
+    if cache == 'cold':
+        bench.pedantic(get, setup=app_module.response_cache.clear, rounds=10)
+    else:
+        bench(get)
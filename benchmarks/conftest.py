@@ -0,0 +1,68 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from datasets import ADMIN_TOKEN, build_dataset, data_dir
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--bench-scales',
+        default=os.environ.get('CLIMATEPULSE_BENCH_SCALES', '1,10'),
+        help='comma separated multiples of the shipped data to benchmark, e.g. 1,10,100,1000'
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        scales = [int(scale) for scale in metafunc.config.getoption('bench_scales').split(',')]
+        metafunc.parametrize('scale', scales, ids=[f'x{scale}' for scale in scales], scope='session')
+
+
+@pytest.fixture(scope='session')
+def dataset(scale, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp(f'data_x{scale}'))
+    return path, build_dataset(path, scale)
+
+
+@pytest.fixture(scope='session')
+def loader(dataset):
+    from utils.data_loader import ClimateDataLoader
+    with data_dir(dataset[0]):
+        loader = ClimateDataLoader(use_snapshot=False)
+        loader.load_balance_snapshots()
+        loader.load_forecast_models()
+    return loader
+
+
+@pytest.fixture(scope='session')
+def reloader(dataset):
+    from utils.data_loader import ClimateDataLoader
+    from utils.reloader import DataReloader
+    with data_dir(dataset[0]):
+        reloader = DataReloader(ClimateDataLoader)
+        reloader.wait()
+    assert reloader.ready(), reloader.status
+    return reloader
+
+
+@pytest.fixture
+def app_module(dataset, reloader, monkeypatch):
+    # app builds its own loader on import, so the first import reads a dataset too
+    with data_dir(dataset[0]):
+        import app
+        app.data_reloader.wait()
+    monkeypatch.setattr(app, 'data_reloader', reloader)
+    monkeypatch.setenv('CLIMATEPULSE_DATA_DIR', dataset[0])
+    monkeypatch.setenv('CLIMATEPULSE_ADMIN_TOKEN', ADMIN_TOKEN)
+    app.response_cache.clear()
+    return app
+
+
+@pytest.fixture
+def bench(benchmark, dataset):
+    # every result in --benchmark-json carries the dataset it was measured on
+    benchmark.extra_info.update(dataset[1])
+    return benchmark
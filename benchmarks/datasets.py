@@ -0,0 +1,105 @@
+import json
+import os
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from config.get_path import get_root_directory
+from utils.metric_mapper import WB_INDICATORS
+
+BASE_DATA_DIR = os.path.join(get_root_directory(), 'data')
+ADMIN_TOKEN = 'bench-admin-token'
+
+
+@contextmanager
+def data_dir(path):
+    # ClimateDataLoader resolves its files through CLIMATEPULSE_DATA_DIR
+    previous = os.environ.get('CLIMATEPULSE_DATA_DIR')
+    os.environ['CLIMATEPULSE_DATA_DIR'] = path
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop('CLIMATEPULSE_DATA_DIR')
+        else:
+            os.environ['CLIMATEPULSE_DATA_DIR'] = previous
+
+
+def load_base():
+    wb_csv = pd.read_csv(os.path.join(BASE_DATA_DIR, 'worldbank_data.csv'))
+    with open(os.path.join(BASE_DATA_DIR, 'nasa_data.json')) as f:
+        nasa = json.load(f)
+    with open(os.path.join(BASE_DATA_DIR, 'countries_data.json')) as f:
+        countries = json.load(f)
+    return wb_csv, nasa, countries
+
+
+def scale_worldbank(wb_csv, scale, rng):
+    # every country is copied scale times under a new name with jittered values
+    copies = []
+    for i in range(scale):
+        copy = wb_csv.copy()
+        if i:
+            copy['country'] = copy['country'] + f' ({i})'
+            columns = [indicator['column'] for indicator in WB_INDICATORS]
+            copy[columns] = copy[columns] * rng.uniform(0.8, 1.2, size=(len(copy), len(columns)))
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def scale_countries(countries, scale, rng):
+    scaled = []
+    for i in range(scale):
+        for country in countries[0]:
+            if i and country['name'] and country['longitude'] and country['latitude']:
+                country = dict(
+                    country,
+                    name=f"{country['name']} ({i})",
+                    latitude=str(np.clip(float(country['latitude']) + rng.normal(0, 2), -89, 89)),
+                    longitude=str(np.clip(float(country['longitude']) + rng.normal(0, 2), -179, 179))
+                )
+            elif i:
+                continue
+            scaled.append(country)
+    return [scaled]
+
+
+def scale_nasa(nasa, scale):
+    # series get scale times more points over the same span, linearly interpolated
+    scaled = {}
+    for metric, series in nasa.items():
+        years = np.array([float(year) for year in series.keys()])
+        values = np.array(list(series.values()), dtype=np.float64)
+        order = np.argsort(years)
+        years, values = years[order], values[order]
+        dense = np.linspace(years[0], years[-1], len(years) * scale)
+        scaled[metric] = {f'{year:.4f}': value for year, value in zip(dense, np.interp(dense, years, values))}
+    return scaled
+
+
+def worldbank_records(wb_csv):
+    records = []
+    for indicator in WB_INDICATORS:
+        rows = wb_csv[['country', 'year', indicator['column']]].dropna()
+        records.extend(
+            {'country': country, 'year': str(year), 'meaning': indicator['name'], 'value': value}
+            for country, year, value in zip(rows['country'], rows['year'], rows[indicator['column']])
+        )
+    return records
+
+
+def build_dataset(target_dir, scale, seed=0):
+    # writes the four files ClimateDataLoader reads, scale times the shipped data
+    rng = np.random.default_rng(seed)
+    wb_csv, nasa, countries = load_base()
+    wb_csv = scale_worldbank(wb_csv, scale, rng)
+    records = worldbank_records(wb_csv)
+
+    os.makedirs(target_dir, exist_ok=True)
+    wb_csv.to_csv(os.path.join(target_dir, 'worldbank_data.csv'), index=False)
+    with open(os.path.join(target_dir, 'worldbank_data.json'), 'w') as f:
+        json.dump(records, f)
+    with open(os.path.join(target_dir, 'nasa_data.json'), 'w') as f:
+        json.dump(scale_nasa(nasa, scale), f)
+    with open(os.path.join(target_dir, 'countries_data.json'), 'w') as f:
+        json.dump(scale_countries(countries, scale, rng), f)
+    return {'scale': scale, 'worldbank_records': len(records), 'countries': int(wb_csv['country'].nunique())}
@@ -10,3 +10,23 @@ class ClimateProjectItem(scrapy.Item):
     # define the fields for your item here like:
     # name = scrapy.Field()
     pass
+
+
+class WorldBankItem(scrapy.Item):
+    country = scrapy.Field()
+    year = scrapy.Field()
+    meaning = scrapy.Field()
+    value = scrapy.Field()
+
+
+class CrawlCheckpointItem(scrapy.Item):
+    # emitted after the last row of a page, marks the page as persisted
+    indicator = scrapy.Field()
+    page = scrapy.Field()
+    pages = scrapy.Field()
+    lastupdated = scrapy.Field()
+
+
+class NasaSeriesItem(scrapy.Item):
+    vital_sign = scrapy.Field()
+    values = scrapy.Field()
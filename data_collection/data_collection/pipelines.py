@@ -5,9 +5,148 @@
 
 
 # useful for handling different item types with a single interface
+import json
+import os
 from itemadapter import ItemAdapter
+from data_collection.items import CrawlCheckpointItem, NasaSeriesItem, WorldBankItem
+
+
+def load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def load_indicators(path, source):
+    with open(path, encoding='utf-8') as f:
+        return [indicator['code'] for indicator in json.load(f) if indicator['source'] == source]
+
+
+def file_fingerprint(path):
+    # what a checkpoint was written against; None while the file does not exist
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def save_json_atomic(path, data, **kwargs):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
 
 
 class ClimateProjectPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class WorldBankPipeline:
+    # merges scraped rows into worldbank_data.json; changed rows go to a journal
+    # first so an interrupted crawl resumes from its checkpoint without losing them.
+    # every checkpoint state records the data file its pages were merged into, so
+    # a deleted or replaced file invalidates it
+    def __init__(self, data_path, checkpoint_path):
+        self.data_path = data_path
+        self.checkpoint_path = checkpoint_path
+        self.journal_path = data_path + '.journal'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            crawler.settings.get('WORLDBANK_DATA_PATH'),
+            crawler.settings.get('WORLDBANK_CHECKPOINT_PATH')
+        )
+
+    def open_spider(self, spider):
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        self.rows = {
+            (entry['country'], entry['meaning'], str(entry['year'])): entry['value']
+            for entry in load_json(self.data_path, [])
+        }
+        self.checkpoint = load_json(self.checkpoint_path, {})
+        self.output = file_fingerprint(self.data_path)
+        self.changed = 0
+
+        # replay rows persisted by an interrupted run
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    self.rows[tuple(entry['key'])] = entry['value']
+                    self.changed += 1
+        self.journal = open(self.journal_path, 'a')
+
+    def process_item(self, item, spider):
+        if isinstance(item, WorldBankItem):
+            adapter = ItemAdapter(item)
+            key = (adapter['country'], adapter['meaning'], str(adapter['year']))
+            if self.rows.get(key) != adapter['value']:
+                self.rows[key] = adapter['value']
+                self.journal.write(json.dumps({'key': key, 'value': adapter['value']}) + '\n')
+                self.changed += 1
+        elif isinstance(item, CrawlCheckpointItem):
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.mark_page_done(ItemAdapter(item))
+        return item
+
+    def mark_page_done(self, adapter):
+        state = self.checkpoint.get(adapter['indicator'])
+        if not state or state['lastupdated'] != adapter['lastupdated'] or state.get('output') != self.output:
+            state = {'lastupdated': adapter['lastupdated'], 'pages_done': [], 'complete': False, 'output': self.output}
+        if adapter['page'] not in state['pages_done']:
+            state['pages_done'].append(adapter['page'])
+        state['complete'] = len(state['pages_done']) >= adapter['pages']
+        self.checkpoint[adapter['indicator']] = state
+        save_json_atomic(self.checkpoint_path, self.checkpoint)
+
+    def close_spider(self, spider):
+        self.journal.close()
+        if self.changed:
+            save_json_atomic(self.data_path, [
+                {'country': country, 'year': year, 'meaning': meaning, 'value': value}
+                for (country, meaning, year), value in self.rows.items()
+            ], indent=4)
+        os.remove(self.journal_path)
+        output = file_fingerprint(self.data_path)
+        for state in self.checkpoint.values():
+            if state.get('output') == self.output:
+                state['output'] = output
+        save_json_atomic(self.checkpoint_path, self.checkpoint)
+        spider.logger.info(f"{self.changed} World Bank rows changed, {len(self.rows)} rows stored")
+
+
+class NasaPipeline:
+    # every changed series is merged into nasa_data.json as it arrives and the
+    # file is replaced atomically, so a crash keeps every series finished before it
+    def __init__(self, data_path):
+        self.data_path = data_path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.get('NASA_DATA_PATH'))
+
+    def open_spider(self, spider):
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        self.series = load_json(self.data_path, {})
+        self.changed = 0
+
+    def process_item(self, item, spider):
+        if isinstance(item, NasaSeriesItem):
+            adapter = ItemAdapter(item)
+            if self.series.get(adapter['vital_sign']) != adapter['values']:
+                self.series[adapter['vital_sign']] = adapter['values']
+                save_json_atomic(self.data_path, self.series, indent=4)
+                self.changed += 1
+        return item
+
+    def close_spider(self, spider):
+        spider.logger.info(f"{self.changed} NASA series changed, {len(self.series)} series stored")
@@ -7,6 +7,8 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
 BOT_NAME = "data_collection"
 
 SPIDER_MODULES = ["data_collection.spiders"]
@@ -21,6 +23,7 @@ ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
 #CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
@@ -86,7 +89,24 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_DIR = "httpcache"
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_POLICY = "scrapy.extensions.httpcache.RFC2616Policy"
 
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
+
+# World Bank ingestion: the API base can point to a local fixture server
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+# the backend's indicator registry decides which series both spiders crawl
+INDICATORS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend", "config", "indicators.json"))
+# crawls land in data/raw; backend/run_etl.py builds the served files from them
+RAW_DATA_DIR = os.path.join(DATA_DIR, "raw")
+WORLDBANK_API_URL = "https://api.worldbank.org/v2"
+WORLDBANK_PAGE_SIZE = 1000
+WORLDBANK_DATA_PATH = os.path.join(RAW_DATA_DIR, "worldbank_data.json")
+WORLDBANK_CHECKPOINT_PATH = os.path.join(DATA_DIR, ".worldbank_checkpoint.json")
+
+# NASA vital signs: pages are revalidated against the HTTP cache with ETag/Last-Modified
+NASA_BASE_URL = "https://climate.nasa.gov"
+NASA_DATA_PATH = os.path.join(RAW_DATA_DIR, "nasa_data.json")
+HTTPCACHE_DIR = os.path.join(DATA_DIR, ".httpcache")
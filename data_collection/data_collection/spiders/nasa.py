@@ -1,49 +1,75 @@
 import scrapy # type: ignore
 import json
-from urllib.parse import urljoin
-from collections import defaultdict
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-from config.get_path import get_root_directory
+import re
+from data_collection.items import NasaSeriesItem
+from data_collection.pipelines import load_indicators, load_json
+
+SEPARATORS = re.compile(r'[\s,:]*')
+
+
+def iter_chart_points(props):
+    # walks the top-level props object and decodes the chart items one at a
+    # time instead of loading the whole payload first
+    decoder = json.JSONDecoder()
+    pos = props.index('{') + 1
+    while True:
+        pos = SEPARATORS.match(props, pos).end()
+        if pos >= len(props) or props[pos] == '}':
+            return
+        key, pos = decoder.raw_decode(props, pos)
+        pos = SEPARATORS.match(props, pos).end()
+        if key != 'items':
+            _, pos = decoder.raw_decode(props, pos)
+            continue
+
+        pos += 1
+        while True:
+            pos = SEPARATORS.match(props, pos).end()
+            if props[pos] == ']':
+                pos += 1
+                break
+            entry, pos = decoder.raw_decode(props, pos)
+            yield entry.get('x'), entry.get('y')
 
 
 class NasaClimateSpider(scrapy.Spider):
     name = 'nasa_spider'
-    allowed_domains = ['climate.nasa.gov']
-    start_urls = ['https://climate.nasa.gov/vital-signs/global-temperature/']
-    merged_data = defaultdict()
+    custom_settings = {
+        "ITEM_PIPELINES": {"data_collection.pipelines.NasaPipeline": 300},
+        "HTTPCACHE_ENABLED": True,
+    }
 
+    async def start(self):
+        # Scrapy >= 2.13 entry point, older versions call start_requests directly
+        for request in self.start_requests():
+            yield request
 
-    def parse(self, response):
-        links = response.xpath('//*[@id="page"]/div[3]/nav/ul/li')
-        for i,link in enumerate(links):
-            link = link.xpath('a').attrib.get('href')
-            link = urljoin(response.url, link)
+    def start_requests(self):
+        base_url = self.settings.get('NASA_BASE_URL')
+        self.stored = load_json(self.settings.get('NASA_DATA_PATH'), {})
+        for vital_sign in load_indicators(self.settings.get('INDICATORS_PATH'), 'nasa'):
             yield scrapy.Request(
-                url=link,
-                callback=self.parse_nav
-            )            
-            
-
-    def parse_nav(self, response):
-        multi_line_chart = response.xpath('//div[@data-react-class="MultiLineChart"]')[0]
-        vital_sign = response.url.split('/')[-2]
-
-        data = multi_line_chart.attrib.get('data-react-props')
-        data = json.loads(data).get('items')
-
-        stats = defaultdict()
-        for entry in data:
-            year = entry.get('x')
-            indicator = float(entry.get('y'))
-            if year and indicator:
-                stats[year] = indicator
-
-        self.merged_data[vital_sign] = stats
-
-    def closed(self, reason):
-        root = get_root_directory()
-        target_path = root + '/data/nasa_data.json'
-        with open(target_path, 'w') as f:
-            json.dump(self.merged_data, f, indent=4)
+                f"{base_url}/vital-signs/{vital_sign}/",
+                callback=self.parse,
+                cb_kwargs={'vital_sign': vital_sign},
+                # max-age=0 makes the cache revalidate every page with If-None-Match/If-Modified-Since
+                headers={'Cache-Control': 'max-age=0'}
+            )
+
+    def parse(self, response, vital_sign):
+        # a 304 comes back as the cached page, flagged 'cached'
+        if 'cached' in response.flags and vital_sign in self.stored:
+            self.logger.info(f"{vital_sign} not modified, skipping")
+            return
+
+        props = response.xpath('//div[@data-react-class="MultiLineChart"]/@data-react-props').get()
+        if not props:
+            self.logger.warning(f"{vital_sign}: no chart found on {response.url}")
+            return
+
+        values = {}
+        for year, indicator in iter_chart_points(props):
+            if year and indicator is not None:
+                values[str(year)] = float(indicator)
+        if values:
+            yield NasaSeriesItem(vital_sign=vital_sign, values=values)
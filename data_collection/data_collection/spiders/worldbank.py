@@ -1,32 +1,70 @@
 import scrapy
 import json
-import requests
+import math
+from data_collection.items import CrawlCheckpointItem, WorldBankItem
+from data_collection.pipelines import file_fingerprint, load_indicators, load_json
+
 
 class WorldBankSpider(scrapy.Spider):
     name = "worldbank_spider"
-    def get_total():
-        response = requests.get(f"https://api.worldbank.org/v2/country/all/indicator/EN.GHG.CO2.MT.CE.AR5?format=json")
-        data = json.loads(response.text)
-        try:
-            return data[0]["total"]
-        except:
-            return 0
-
-    total_pages = get_total() # all the data sources have the same amount of pages
-    start_urls = [
-        f"https://api.worldbank.org/v2/country/all/indicator/EN.GHG.CO2.MT.CE.AR5?format=json&per_page={total_pages}",
-        f"https://api.worldbank.org/v2/country/all/indicator/AG.LND.FRST.ZS?format=json&per_page={total_pages}",
-        f"https://api.worldbank.org/v2/country/all/indicator/EN.ATM.PM25.MC.M3?format=json&per_page={total_pages}",
-        f"https://api.worldbank.org/v2/country/all/indicator/EG.FEC.RNEW.ZS?format=json&per_page={total_pages}"
-    ]
-
-    def parse(self, response):
+    custom_settings = {
+        "ITEM_PIPELINES": {"data_collection.pipelines.WorldBankPipeline": 300},
+    }
+
+    async def start(self):
+        # Scrapy >= 2.13 entry point, older versions call start_requests directly
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        self.api_url = self.settings.get('WORLDBANK_API_URL')
+        self.page_size = self.settings.getint('WORLDBANK_PAGE_SIZE')
+        self.checkpoint = load_json(self.settings.get('WORLDBANK_CHECKPOINT_PATH'), {})
+        # progress only counts for the data file it was merged into
+        self.output = file_fingerprint(self.settings.get('WORLDBANK_DATA_PATH'))
+        self.indicators = load_indicators(self.settings.get('INDICATORS_PATH'), 'worldbank')
+
+        # a one-row probe tells whether the indicator changed and how many pages it has
+        for indicator in self.indicators:
+            yield scrapy.Request(
+                self.page_url(indicator, 1, per_page=1),
+                callback=self.parse_probe,
+                cb_kwargs={'indicator': indicator},
+                dont_filter=True
+            )
+
+    def page_url(self, indicator, page, per_page=None):
+        per_page = per_page or self.page_size
+        return f"{self.api_url}/country/all/indicator/{indicator}?format=json&per_page={per_page}&page={page}"
+
+    def parse_probe(self, response, indicator):
+        meta = json.loads(response.text)[0]
+        lastupdated = meta.get('lastupdated')
+        state = self.checkpoint.get(indicator)
+        if not state or state['lastupdated'] != lastupdated or state.get('output') != self.output:
+            state = {'pages_done': [], 'complete': False}
+        elif state['complete']:
+            self.logger.info(f"{indicator} unchanged since {lastupdated}, skipping")
+            return
+
+        pages = max(1, math.ceil(int(meta.get('total', 0)) / self.page_size))
+        for page in range(1, pages + 1):
+            if page in state['pages_done']:
+                continue
+            yield scrapy.Request(
+                self.page_url(indicator, page),
+                callback=self.parse,
+                cb_kwargs={'indicator': indicator, 'page': page, 'pages': pages, 'lastupdated': lastupdated}
+            )
+
+    def parse(self, response, indicator, page, pages, lastupdated):
         data = json.loads(response.text)
-        for entry in data[1]:
+        for entry in data[1] or []:
             if entry["value"] is not None:
-                yield {
-                    "country": entry["country"]["value"],
-                    "year": entry["date"],
-                    "meaning": entry["indicator"]["value"],
-                    "value": float(entry["value"])
-                }
+                yield WorldBankItem(
+                    country=entry["country"]["value"],
+                    year=entry["date"],
+                    meaning=entry["indicator"]["value"],
+                    value=float(entry["value"])
+                )
+        yield CrawlCheckpointItem(indicator=indicator, page=page, pages=pages, lastupdated=lastupdated)
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureServer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDICATORS = [
+    {'source': 'worldbank', 'code': 'EN.TEST.CO2', 'name': 'Test CO2 emissions'},
+    {'source': 'worldbank', 'code': 'AG.TEST.FRST', 'name': 'Test forest area'},
+    {'source': 'nasa', 'code': 'carbon-dioxide', 'name': 'Carbon Dioxide'},
+    {'source': 'nasa', 'code': 'sea-level', 'name': 'Sea Level'},
+    {'source': 'nasa', 'code': 'methane', 'name': 'Methane'}
+]
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def settings(tmp_path, server):
+    # every path the spiders write to lives under tmp_path
+    indicators_path = tmp_path / 'indicators.json'
+    indicators_path.write_text(json.dumps(INDICATORS))
+    return {
+        'INDICATORS_PATH': str(indicators_path),
+        'WORLDBANK_API_URL': server.url + '/v2',
+        'WORLDBANK_PAGE_SIZE': 4,
+        'WORLDBANK_DATA_PATH': str(tmp_path / 'raw' / 'worldbank_data.json'),
+        'WORLDBANK_CHECKPOINT_PATH': str(tmp_path / '.worldbank_checkpoint.json'),
+        'NASA_BASE_URL': server.url,
+        'NASA_DATA_PATH': str(tmp_path / 'raw' / 'nasa_data.json'),
+        'HTTPCACHE_DIR': str(tmp_path / '.httpcache'),
+        'ROBOTSTXT_OBEY': False,
+        'TELNETCONSOLE_ENABLED': False,
+        'LOG_LEVEL': 'INFO'
+    }
+
+
+def crawl_command(spider, settings):
+    command = [sys.executable, '-m', 'scrapy', 'crawl', spider]
+    for name, value in settings.items():
+        command += ['-s', f'{name}={value}']
+    return command
+
+
+@pytest.fixture
+def crawl(settings):
+    # each crawl runs in its own process, a Twisted reactor cannot be restarted
+    def run(spider, **overrides):
+        return subprocess.run(
+            crawl_command(spider, dict(settings, **overrides)),
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True, timeout=120
+        )
+    return run
+
+
+@pytest.fixture
+def start_crawl(settings):
+    def start(spider, **overrides):
+        return subprocess.Popen(
+            crawl_command(spider, dict(settings, **overrides)),
+            cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    return start
@@ -0,0 +1,105 @@
+import hashlib
+import html
+import json
+import math
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FixtureServer:
+    # stands in for api.worldbank.org and climate.nasa.gov on a local port; the
+    # tests edit worldbank and nasa between crawls and read back requests
+    def __init__(self):
+        self.worldbank = {}
+        self.nasa = {}
+        self.requests = []
+        self.on_request = None
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def take_requests(self):
+        with self.lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+    def worldbank_page(self, code, query):
+        # the API's [meta, rows] pair; rows are ordered by country then year
+        indicator = self.worldbank[code]
+        rows = indicator['rows']
+        per_page = int(query['per_page'][0])
+        page = int(query['page'][0])
+        meta = {
+            'page': page,
+            'pages': max(1, math.ceil(len(rows) / per_page)),
+            'per_page': per_page,
+            'total': len(rows),
+            'lastupdated': indicator['lastupdated']
+        }
+        entries = [
+            {
+                'indicator': {'id': code, 'value': indicator['name']},
+                'country': {'id': country[:2].upper(), 'value': country},
+                'date': str(year),
+                'value': value
+            }
+            for country, year, value in rows[(page - 1) * per_page:page * per_page]
+        ]
+        return json.dumps([meta, entries]).encode()
+
+    def nasa_page(self, vital_sign):
+        props = json.dumps({'title': vital_sign, 'items': [{'x': x, 'y': y} for x, y in self.nasa[vital_sign]]})
+        return (
+            '<html><body>'
+            f'<div data-react-class="MultiLineChart" data-react-props="{html.escape(props)}"></div>'
+            '</body></html>'
+        ).encode()
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                parts = url.path.strip('/').split('/')
+                if server.on_request is not None:
+                    server.on_request(self.path)
+
+                if parts[:4] == ['v2', 'country', 'all', 'indicator'] and parts[4] in server.worldbank:
+                    self.reply(200, server.worldbank_page(parts[4], parse_qs(url.query)), 'application/json')
+                elif parts[0] == 'vital-signs' and parts[1] in server.nasa:
+                    body = server.nasa_page(parts[1])
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self.reply(304, b'', 'text/html', {'ETag': etag})
+                    else:
+                        self.reply(200, body, 'text/html', {'ETag': etag, 'Last-Modified': formatdate(usegmt=True)})
+                else:
+                    self.reply(404, b'', 'text/plain')
+
+            def reply(self, status, body, content_type, headers=None):
+                with server.lock:
+                    server.requests.append((self.path, status))
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,47 @@
+import json
+import os
+import pytest
+
+
+@pytest.fixture
+def nasa(server):
+    server.nasa = {
+        'carbon-dioxide': [(2000 + i / 12, 370 + i / 10) for i in range(36)],
+        # a reading of 0 is a value, not a missing point
+        'sea-level': [(1993 + i, float(i * 3)) for i in range(10)],
+        'methane': [(1984 + i, 1650 + i * 4.5) for i in range(10)]
+    }
+    return server
+
+
+def stored_series(settings):
+    with open(settings['NASA_DATA_PATH']) as f:
+        return json.load(f)
+
+
+def expected_series(points):
+    return {str(x): float(y) for x, y in points}
+
+
+def statuses(requests):
+    return {path.strip('/').split('/')[1]: status for path, status in requests}
+
+
+def test_first_run_revalidated_rerun_and_one_changed_series(nasa, settings, crawl):
+    crawl('nasa_spider')
+    assert stored_series(settings) == {sign: expected_series(points) for sign, points in nasa.nasa.items()}
+    assert statuses(nasa.take_requests()) == dict.fromkeys(nasa.nasa, 200)
+
+    # every page is revalidated, answered 304 and skipped without touching the file
+    modified = os.stat(settings['NASA_DATA_PATH']).st_mtime_ns
+    result = crawl('nasa_spider')
+    assert statuses(nasa.take_requests()) == dict.fromkeys(nasa.nasa, 304)
+    assert result.stderr.count('not modified, skipping') == len(nasa.nasa)
+    assert os.stat(settings['NASA_DATA_PATH']).st_mtime_ns == modified
+
+    nasa.nasa['methane'].append((1994, 1700.25))
+    result = crawl('nasa_spider')
+    assert statuses(nasa.take_requests()) == {'carbon-dioxide': 304, 'sea-level': 304, 'methane': 200}
+    assert result.stderr.count('not modified, skipping') == 2
+    assert '1 NASA series changed' in result.stderr
+    assert stored_series(settings)['methane'] == expected_series(nasa.nasa['methane'])
@@ -0,0 +1,131 @@
+import json
+import os
+import signal
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+COUNTRIES = ['Argentina', 'Brazil', 'Chad']
+YEARS = range(2000, 2006)
+
+
+def rows(scale):
+    # a missing reading is served as null and never stored
+    return [
+        (country, year, None if (c + year) % 7 == 0 else round(scale * (c + 1) + (year - 2000) / 10, 3))
+        for c, country in enumerate(COUNTRIES) for year in YEARS
+    ]
+
+
+@pytest.fixture
+def worldbank(server):
+    server.worldbank = {
+        'EN.TEST.CO2': {'name': 'Test CO2 emissions', 'lastupdated': '2024-01-01', 'rows': rows(10)},
+        'AG.TEST.FRST': {'name': 'Test forest area', 'lastupdated': '2024-01-01', 'rows': rows(1)}
+    }
+    return server
+
+
+def expected_rows(server):
+    return {
+        (country, indicator['name'], str(year)): value
+        for indicator in server.worldbank.values()
+        for country, year, value in indicator['rows'] if value is not None
+    }
+
+
+def stored_rows(settings):
+    with open(settings['WORLDBANK_DATA_PATH']) as f:
+        return {(entry['country'], entry['meaning'], entry['year']): entry['value'] for entry in json.load(f)}
+
+
+def load_checkpoint(settings):
+    with open(settings['WORLDBANK_CHECKPOINT_PATH']) as f:
+        return json.load(f)
+
+
+def page_requests(requests):
+    # (indicator, page) of every full-size page request, probes left out
+    pages = []
+    for path, _ in requests:
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        if query['per_page'] != ['1']:
+            pages.append((url.path.rsplit('/', 1)[-1], int(query['page'][0])))
+    return pages
+
+
+def test_full_run_then_no_op_rerun(worldbank, settings, crawl):
+    crawl('worldbank_spider')
+    assert stored_rows(settings) == expected_rows(worldbank)
+    assert sorted(page_requests(worldbank.take_requests())) == sorted(
+        (code, page) for code in worldbank.worldbank for page in range(1, 6)
+    )
+    assert all(state['complete'] for state in load_checkpoint(settings).values())
+    assert not os.path.exists(settings['WORLDBANK_DATA_PATH'] + '.journal')
+
+    # nothing changed upstream: one probe per indicator and the file is left alone
+    modified = os.stat(settings['WORLDBANK_DATA_PATH']).st_mtime_ns
+    crawl('worldbank_spider')
+    requests = worldbank.take_requests()
+    assert len(requests) == len(worldbank.worldbank)
+    assert page_requests(requests) == []
+    assert os.stat(settings['WORLDBANK_DATA_PATH']).st_mtime_ns == modified
+
+
+def test_updated_indicator_is_fetched_again(worldbank, settings, crawl):
+    crawl('worldbank_spider')
+    worldbank.take_requests()
+
+    indicator = worldbank.worldbank['AG.TEST.FRST']
+    indicator['lastupdated'] = '2024-06-01'
+    indicator['rows'][0] = (indicator['rows'][0][0], indicator['rows'][0][1], 99.5)
+    crawl('worldbank_spider')
+    assert {code for code, _ in page_requests(worldbank.take_requests())} == {'AG.TEST.FRST'}
+    assert stored_rows(settings) == expected_rows(worldbank)
+
+
+def test_killed_crawl_resumes_from_its_checkpoint(worldbank, settings, crawl, start_crawl):
+    # one request at a time, killed without warning when the sixth of ten pages is asked for
+    crawler = {}
+
+    def kill_on_sixth_page(path):
+        if len(page_requests(worldbank.requests + [(path, None)])) == 6:
+            worldbank.on_request = None
+            os.kill(crawler['process'].pid, signal.SIGKILL)
+
+    worldbank.on_request = kill_on_sixth_page
+    crawler['process'] = start_crawl('worldbank_spider', CONCURRENT_REQUESTS=1)
+    assert crawler['process'].wait(timeout=120) == -signal.SIGKILL
+    done = {
+        (code, page) for code, state in load_checkpoint(settings).items() for page in state['pages_done']
+    }
+    assert done and not os.path.exists(settings['WORLDBANK_DATA_PATH'])
+    worldbank.take_requests()
+
+    crawl('worldbank_spider')
+    fetched = page_requests(worldbank.take_requests())
+    assert not done & set(fetched)
+    assert len(done) + len(fetched) == 10
+    assert stored_rows(settings) == expected_rows(worldbank)
+    assert not os.path.exists(settings['WORLDBANK_DATA_PATH'] + '.journal')
+
+
+def test_checkpoint_is_dropped_with_a_deleted_or_replaced_data_file(worldbank, settings, crawl):
+    crawl('worldbank_spider')
+    worldbank.take_requests()
+    all_pages = sorted((code, page) for code in worldbank.worldbank for page in range(1, 6))
+
+    os.remove(settings['WORLDBANK_DATA_PATH'])
+    crawl('worldbank_spider')
+    assert sorted(page_requests(worldbank.take_requests())) == all_pages
+    assert stored_rows(settings) == expected_rows(worldbank)
+
+    with open(settings['WORLDBANK_DATA_PATH'], 'w') as f:
+        json.dump([], f)
+    crawl('worldbank_spider')
+    assert sorted(page_requests(worldbank.take_requests())) == all_pages
+    assert stored_rows(settings) == expected_rows(worldbank)
+
+    # and kept while the file is the one the crawl wrote
+    crawl('worldbank_spider')
+    assert page_requests(worldbank.take_requests()) == []
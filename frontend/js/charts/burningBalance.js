@@ -1,5 +1,19 @@
 import { fetchData } from '../utils/helpers.js';
 
+// Both globes share one prefetch of every slider year
+let balanceYearsRequest = null;
+
+function fetchBalanceYears(minYear, maxYear) {
+    if (!balanceYearsRequest) {
+        balanceYearsRequest = fetchData(`/api/balance?from=${minYear}&to=${maxYear}`)
+            .then(data => {
+                if (!data) balanceYearsRequest = null;
+                return data || {};
+            });
+    }
+    return balanceYearsRequest;
+}
+
 export class BurningBalanceLeft {
     constructor(containerId) {
         this.container = document.getElementById(containerId);
@@ -133,8 +147,8 @@ export class BurningBalanceLeft {
 
     async fetchDataForYear(year) {
         try {
-            const response = await fetchData(`/api/balance/${year}`);
-            return await response;
+            const years = await fetchBalanceYears(this.minYear, this.maxYear);
+            return years[year] || [];
         } catch (error) {
             console.error('Error fetching data:', error);
             return [];
@@ -347,8 +361,8 @@ export class BurningBalanceRight {
 
     async fetchDataForYear(year) {
         try {
-            const response = await fetchData(`/api/balance/${year}`);
-            return await response;
+            const years = await fetchBalanceYears(this.minYear, this.maxYear);
+            return years[year] || [];
         } catch (error) {
             console.error('Error fetching data:', error);
             return [];
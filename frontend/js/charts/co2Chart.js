@@ -1,4 +1,4 @@
-import { fetchData, formatTooltip } from '../utils/helpers.js';
+import { fetchData, fetchShared, formatTooltip } from '../utils/helpers.js';
 
 class CO2Chart {
     constructor(container) {
@@ -16,7 +16,7 @@ class CO2Chart {
     }
     
     async init() {
-        this.data = await fetchData('/api/nasa/carbon-dioxide');
+        this.data = await fetchData('/api/nasa/carbon-dioxide?max_points=400');
         if (!this.data) return;
         this.renderChart();
         this.setupEventListeners();
@@ -140,7 +140,7 @@ class CO2Chart {
             .attr('transform', `translate(${this.margin.left}, ${this.margin.top})`);
 
         try {
-            const countries = await fetchData('/api/countries');
+            const countries = await fetchShared('/api/countries');
             countries.forEach(country => {
                 countryDropdown.append('option')
                     .attr('value', country)
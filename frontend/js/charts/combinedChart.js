@@ -1,4 +1,4 @@
-import { fetchData } from '../utils/helpers.js';
+import { fetchBatch } from '../utils/helpers.js';
 
 export class CombinedClimateChart {
     constructor(container) {
@@ -23,12 +23,12 @@ export class CombinedClimateChart {
     async init() {
         try {
             // Fetch data for all metrics
-            let [temperatureData, co2Data, seaLevelData, iceData, methaneData] = await Promise.all([
-                fetchData('/api/nasa/global-temperature'),
-                fetchData('/api/nasa/carbon-dioxide'),
-                fetchData('/api/nasa/sea-level'),
-                fetchData('/api/nasa/arctic-sea-ice'),
-                fetchData('/api/nasa/methane')
+            let [temperatureData, co2Data, seaLevelData, iceData, methaneData] = await fetchBatch([
+                '/api/nasa/global-temperature?from=1983&to=2023&max_points=300',
+                '/api/nasa/carbon-dioxide?from=1983&to=2023&max_points=300',
+                '/api/nasa/sea-level?from=1983&to=2023&max_points=300',
+                '/api/nasa/arctic-sea-ice?from=1983&to=2023&max_points=300',
+                '/api/nasa/methane?from=1983&to=2023&max_points=300'
             ]);
             temperatureData = this.filterDataFromYear(temperatureData, 1983);
             co2Data = this.filterDataFromYear(co2Data, 1983);
@@ -1,4 +1,4 @@
-import { fetchData, formatTooltip } from '../utils/helpers.js';
+import { fetchData, fetchShared, formatTooltip } from '../utils/helpers.js';
 
 class CountryStatsChart {
     constructor(container) {
@@ -61,7 +61,7 @@ class CountryStatsChart {
             .attr('transform', `translate(${this.margin.left}, ${this.margin.top})`);
 
         try {
-            const countries = await fetchData('/api/countries');
+            const countries = await fetchShared('/api/countries');
             const metrics = ['co2', 'renewable', 'forest', 'air_pollution'];
             countries.forEach(country => {
                 countryDropdown.append('option')
@@ -1,12 +1,17 @@
 import * as d3 from 'https://cdn.jsdelivr.net/npm/d3@7.8.5/+esm';
 import * as topojson from "https://cdn.skypack.dev/topojson@3.0.2";
-import { fetchData, formatNumber } from '../utils/helpers.js';
+import { fetchData, formatNumber, debounce } from '../utils/helpers.js';
 
 export class WorldMapVisualization {
     constructor(containerId) {
         this.container = document.getElementById(containerId);
         this.countryData = {};
         this.countryMetadata = {};
+        this.availableYears = [];
+        this.valueRanges = {};
+        this.classes = {};
+        this.classMethod = 'quantile';
+        this.loadedYears = new Set();
         this.currentYear = 2023;
         this.metric = 'co2';
         this.currentTransform = d3.zoomIdentity;
@@ -19,7 +24,15 @@ export class WorldMapVisualization {
             this.updatePointSizes();
         };
 
-        this.zoom = d3.zoom().scaleExtent([1, 8]).on('zoom', this.zoomed.bind(this));
+        this.refreshVisible = debounce(async () => {
+            if (this.loadedYears.has(this.currentYear)) return;
+            await this.loadEmissionsData();
+            this.updateMap();
+        }, 250);
+
+        this.zoom = d3.zoom().scaleExtent([1, 8])
+            .on('zoom', this.zoomed.bind(this))
+            .on('end', () => this.refreshVisible());
 
         this.initMap();
         this.loadData();
@@ -34,6 +47,29 @@ export class WorldMapVisualization {
         return d3.interpolateReds(normalized * 0.9 + 0.1);
     }
 
+    // the server ships precomputed class breaks and each country's class,
+    // the continuous scale is only a fallback while they load
+    colorForCountry(country) {
+        const classes = this.classes[this.currentYear];
+        if (classes && classes.bins.has(country)) {
+            return d3.interpolateReds(0.1 + 0.9 * (classes.bins.get(country) + 1) / (classes.breaks.length - 1));
+        }
+        return this.getColorForValue(this.countryData[country][this.currentYear], this.minValue, this.maxValue);
+    }
+
+    async loadClasses() {
+        if (this.classes[this.currentYear]) return;
+        const data = await fetchData(
+            `/api/map/classes?metric=${this.metric}&year=${this.currentYear}&method=${this.classMethod}`
+        );
+        if (data) {
+            this.classes[data.year] = {
+                breaks: data.breaks,
+                bins: new Map(data.countries.map((country, i) => [country, data.bins[i]]))
+            };
+        }
+    }
+
     async initMap() {
         this.width = this.container.clientWidth;
         this.height = this.container.clientHeight;
@@ -50,7 +86,8 @@ export class WorldMapVisualization {
 
         this.yearSelect.on('change', async () => {
             this.currentYear = +this.yearSelect.node().value;
-            await this.updateMap();
+            await this.loadEmissionsData();
+            this.updateMap();
         });
 
         this.tooltip = d3.select('body').append('div')
@@ -96,25 +133,32 @@ export class WorldMapVisualization {
         }
     }
 
+    // [west, south, east, north] of the visible area, null when the whole map is shown
+    visibleBBox() {
+        if (!this.projection || this.currentTransform.k <= 1) return null;
+
+        const [west, north] = this.projection.invert(this.currentTransform.invert([0, 0]));
+        const [east, south] = this.projection.invert(this.currentTransform.invert([this.width, this.height]));
+        const clamp = (value, limit) => Math.max(-limit, Math.min(limit, value));
+        return [clamp(west, 180), clamp(south, 90), clamp(east, 180), clamp(north, 90)];
+    }
+
     async loadEmissionsData() {
         try {
-            const data = await fetchData(`/api/wb/metric?metric=${this.metric}`);
+            const bbox = this.visibleBBox();
+            const query = `metric=${this.metric}&year=${this.currentYear}` +
+                (bbox ? `&bbox=${bbox.map(value => value.toFixed(2)).join(',')}` : '');
+            const [data] = await Promise.all([fetchData(`/api/map?${query}`), this.loadClasses()]);
 
             if (data) {
-                this.countryData = {};
-                this.minValue = Infinity;
-                this.maxValue = -Infinity;
+                this.availableYears = data.years;
+                this.valueRanges[data.year] = data.range;
+                if (!bbox) this.loadedYears.add(data.year);
 
-                for (const [country, yearsData] of Object.entries(data)) {
+                for (const { country, value } of data.countries) {
                     if (this.countryMetadata[country]) {
-                        this.countryData[country] = {};
-
-                        for (const [year, value] of Object.entries(yearsData)) {
-                            const numericValue = parseFloat(value);
-                            if (!isNaN(numericValue)) {
-                                this.countryData[country][year] = numericValue;
-                            }
-                        }
+                        this.countryData[country] = this.countryData[country] || {};
+                        this.countryData[country][data.year] = value;
                     }
                 }
             }
@@ -124,21 +168,8 @@ export class WorldMapVisualization {
     }
 
     async getAvailableYears() {
-        try {
-            const data = await fetchData('/api/wb/metric?metric=co2');
-            const years = new Set();
-
-            Object.values(data).forEach(countryData => {
-                Object.keys(countryData).forEach(year => {
-                    years.add(parseInt(year));
-                });
-            });
-
-            return Array.from(years).sort((a, b) => b - a);
-        } catch (error) {
-            console.error('Error getting available years:', error);
-            return [this.currentYear];
-        }
+        if (!this.availableYears.length) return [this.currentYear];
+        return [...this.availableYears].sort((a, b) => b - a);
     }
 
     populateYearSelect(years) {
@@ -172,11 +203,7 @@ export class WorldMapVisualization {
                 const countryName = this.findCountryByFeature(d);
 
                 if (countryName && this.countryData[countryName]?.[this.currentYear]) {
-                    return this.getColorForValue(
-                        this.countryData[countryName][this.currentYear],
-                        this.minValue,
-                        this.maxValue
-                    );
+                    return this.colorForCountry(countryName);
                 }
                 return '#ddd';
             })
@@ -259,6 +286,14 @@ export class WorldMapVisualization {
     }
 
     calculateMinMaxForCurrentYear() {
+        // the server range covers every country, so panning keeps the scale stable
+        const range = this.valueRanges[this.currentYear];
+        if (range && range.min !== null) {
+            this.minValue = range.min;
+            this.maxValue = range.max;
+            return;
+        }
+
         this.minValue = Infinity;
         this.maxValue = -Infinity;
 
@@ -297,10 +332,7 @@ export class WorldMapVisualization {
                 return this.projection([meta.longitude, meta.latitude])?.[1] || 0;
             })
             .attr('r', 3)
-            .attr('fill', ([country, yearsData]) => {
-                const value = yearsData[this.currentYear];
-                return this.getColorForValue(value, this.minValue, this.maxValue);
-            })
+            .attr('fill', ([country]) => this.colorForCountry(country))
             .attr('stroke', '#fff')
             .attr('stroke-width', 0.5)
             .on('mouseover', this.handlePointMouseover.bind(this))
@@ -330,6 +362,19 @@ export class WorldMapVisualization {
             .attr('class', 'legend')
             .attr('transform', `translate(${this.width - legendWidth - 40}, 40)`);
 
+        legend.append('text')
+            .attr('x', 0)
+            .attr('y', -5)
+            .text(`CO₂ Emissions (Mt) - ${this.currentYear}`)
+            .style('font-weight', 'bold')
+            .style('font-size', '12px');
+
+        const classes = this.classes[this.currentYear];
+        if (classes) {
+            this.addClassLegend(legend, classes, legendWidth, legendHeight);
+            return;
+        }
+
         const logMin = this.minValue > 0 ? Math.log10(this.minValue) : 0;
         const logMax = Math.log10(this.maxValue);
         const logRange = logMax - logMin;
@@ -355,13 +400,6 @@ export class WorldMapVisualization {
             .attr('stroke', '#000')
             .attr('stroke-width', 0.5);
 
-        legend.append('text')
-            .attr('x', 0)
-            .attr('y', -5)
-            .text(`CO₂ Emissions (Mt) - ${this.currentYear}`)
-            .style('font-weight', 'bold')
-            .style('font-size', '12px');
-
         const tickValues = [
             this.minValue,
             Math.pow(10, logMin + logRange * 0.5),
@@ -396,6 +434,35 @@ export class WorldMapVisualization {
             .style('pointer-events', 'none');
     }
 
+    addClassLegend(legend, classes, legendWidth, legendHeight) {
+        const k = classes.breaks.length - 1;
+        const swatchWidth = legendWidth / k;
+        const formatBreak = d => (d >= 1000 ? d3.format('.2s')(d).replace('G', 'B') : d3.format('.1f')(d));
+
+        legend.selectAll('.legend-class')
+            .data(d3.range(k))
+            .enter()
+            .append('rect')
+            .attr('class', 'legend-class')
+            .attr('x', i => i * swatchWidth)
+            .attr('width', swatchWidth)
+            .attr('height', legendHeight)
+            .style('fill', i => d3.interpolateReds(0.1 + 0.9 * (i + 1) / k))
+            .attr('stroke', '#000')
+            .attr('stroke-width', 0.5);
+
+        legend.selectAll('.legend-label')
+            .data(classes.breaks)
+            .enter()
+            .append('text')
+            .attr('x', (d, i) => i * swatchWidth)
+            .attr('y', legendHeight + 15)
+            .text(formatBreak)
+            .style('text-anchor', 'middle')
+            .style('font-size', '10px')
+            .style('pointer-events', 'none');
+    }
+
     handleCountryMouseover = (event, d) => {
         const countryName = this.findCountryByFeature(d);
         if (countryName) {
@@ -462,11 +529,7 @@ export class WorldMapVisualization {
                 const countryName = this.findCountryByFeature(d);
 
                 if (countryName && this.countryData[countryName]?.[this.currentYear]) {
-                    return this.getColorForValue(
-                        this.countryData[countryName][this.currentYear],
-                        this.minValue,
-                        this.maxValue
-                    );
+                    return this.colorForCountry(countryName);
                 }
                 return '#ddd';
             });
@@ -35,6 +35,29 @@ async function fetchData(endpoint) {
     }
 }
 
+// Shares one in-flight or finished request per endpoint across charts
+const sharedRequests = new Map();
+
+function fetchShared(endpoint) {
+    if (!sharedRequests.has(endpoint)) {
+        sharedRequests.set(endpoint, fetchData(endpoint).then(data => {
+            if (data === null) sharedRequests.delete(endpoint);
+            return data;
+        }));
+    }
+    return sharedRequests.get(endpoint);
+}
+
+// Runs several GET endpoints in one round trip, resolves to their data in order
+async function fetchBatch(endpoints) {
+    const query = endpoints.map(endpoint => `q=${encodeURIComponent(endpoint)}`).join('&');
+    const response = await fetchData(`/api/batch?${query}`);
+    if (!response) {
+        return endpoints.map(() => null);
+    }
+    return response.results.map(result => (result.status === 200 ? result.data : null));
+}
+
 function debounce(func, wait) {
     let timeout;
     return function (...args) {
@@ -74,4 +97,4 @@ function formatTooltip(data, metric) {
     `;
 }
 
-export { formatNumber, getColorForValue, fetchData, debounce, formatTooltip };
+export { formatNumber, getColorForValue, fetchData, fetchShared, fetchBatch, debounce, formatTooltip };
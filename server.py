@@ -1,20 +1,268 @@
+import copy
+import gzip
+import hashlib
 import http.server
-import socketserver
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote, urlsplit
 
-PORT = 8000
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PORT = int(os.environ.get('CLIMATEPULSE_STATIC_PORT', 8000))
+ROOT = os.environ.get('CLIMATEPULSE_FRONTEND_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend'))
+ENTRY = 'index.html'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 1024
+
+# local references that get rewritten to fingerprinted names; absolute URLs,
+# bare module specifiers and fragments are left alone
+REFERENCES = {
+    '.js': re.compile(r'''((?:\bfrom|\bimport)\s*\(?\s*)(['"])(\.{1,2}/[^'"]+)\2'''),
+    '.css': re.compile(r'''(url\(\s*)(['"]?)((?![a-z]+:|/|#)[^'")]+)\2'''),
+    '.html': re.compile(r'''(\b(?:src|href)=)(['"])((?![a-z]+:|/|#)[^'"]+)\2''')
+}
+
+
+class Asset:
+    def __init__(self, body, content_type, mtime, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.mtime = int(mtime)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body}
+        if content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+
+    def variant_etag(self, encoding):
+        return f'"{self.etag}"' if encoding == 'identity' else f'"{self.etag}-{encoding}"'
+
+
+class StaticSite:
+    # every file under root is read once, its local references rewritten to
+    # content-hashed names and compressed ahead of time; a hashed name never
+    # changes content, so it is cached forever, while the entry page and the
+    # plain names stay revalidated
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.assets = {}
+        self.refresh()
+
+    def scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, self.root).replace(os.sep, '/')] = os.stat(path).st_mtime
+        return files
+
+    def refresh(self):
+        files = self.scan()
+        stamp = sorted(files.items())
+        if stamp == self.stamp:
+            return
+        with self.lock:
+            if stamp == self.stamp:
+                return
+            self.assets = self.build(files)
+            self.stamp = stamp
+
+    def build(self, files):
+        contents, fingerprinted = {}, {}
+
+        def fingerprint(name, visiting=()):
+            # hashed after its own references are rewritten, so a change in a
+            # dependency renames everything that imports it
+            if name in fingerprinted:
+                return fingerprinted[name]
+            with open(os.path.join(self.root, name), 'rb') as f:
+                body = f.read()
+            body = self.rewrite(name, body, lambda target: fingerprint(target, visiting + (name,)) if target not in visiting else target)
+            contents[name] = body
+            if name == ENTRY:
+                return name
+            stem, ext = posixpath.splitext(name)
+            fingerprinted[name] = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+            return fingerprinted[name]
+
+        for name in files:
+            fingerprint(name)
+
+        assets = {}
+        for name, body in contents.items():
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if name.endswith('.js'):
+                content_type = 'application/javascript'
+            if content_type.startswith('text/') or content_type == 'application/javascript':
+                content_type += '; charset=utf-8'
+            asset = assets['/' + name] = Asset(body, content_type, files[name], REVALIDATE)
+            if name in fingerprinted:
+                assets['/' + fingerprinted[name]] = copy.copy(asset)
+                assets['/' + fingerprinted[name]].cache_control = IMMUTABLE
+        assets['/'] = assets.get('/' + ENTRY)
+        return assets
+
+    def rewrite(self, name, body, resolve):
+        pattern = REFERENCES.get(posixpath.splitext(name)[1])
+        if pattern is None:
+            return body
+        directory = posixpath.dirname(name)
+
+        def replace(match):
+            prefix, quote, reference = match.groups()
+            path, suffix = re.match(r'([^?#]*)(.*)', reference).groups()
+            target = posixpath.normpath(posixpath.join(directory, path))
+            if not os.path.isfile(os.path.join(self.root, target)):
+                return match.group(0)
+            relative = posixpath.relpath(resolve(target), directory or '.')
+            if reference.startswith('./') and not relative.startswith('.'):
+                relative = './' + relative
+            return f'{prefix}{quote}{relative}{suffix}{quote}'
+
+        return pattern.sub(replace, body.decode('utf-8')).encode('utf-8')
+
+    def get(self, path):
+        if path in ('/', '/' + ENTRY):
+            self.refresh()
+        return self.assets.get(path)
+
+
+class StaticRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    site = None
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body):
+        asset = self.site.get(unquote(urlsplit(self.path).path))
+        if asset is None:
+            return self.send_status(404)
+
+        encoding = self.pick_encoding(asset)
+        etag = asset.variant_etag(encoding)
+        if self.not_modified(asset):
+            return self.send_status(304, asset, etag)
+
+        body = asset.variants[encoding]
+        byte_range = self.requested_range(asset, etag)
+        if byte_range == 'unsatisfiable':
+            return self.send_status(416, extra={'Content-Range': f'bytes */{len(body)}'})
+        if byte_range is not None:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+            body = body[start:end + 1]
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_asset_headers(asset, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_status(self, status, asset=None, etag=None, extra=None):
+        self.send_response(status)
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        if asset is not None:
+            self.send_asset_headers(asset, etag)
+        if status != 304:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_asset_headers(self, asset, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', asset.last_modified)
+        self.send_header('Cache-Control', asset.cache_control)
+        self.send_header('Accept-Ranges', 'bytes')
+        if len(asset.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
 
-class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
         super().end_headers()
 
-    def guess_type(self, path):
-        if path.endswith('.js'):
-            return 'application/javascript'
-        return super().guess_type(path)
+    def pick_encoding(self, asset):
+        # ranges are served from the identity body so offsets stay stable
+        if self.headers.get('Range'):
+            return 'identity'
+        accepted = {}
+        for token in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = token.partition(';')
+            try:
+                accepted[name.strip()] = float(params.strip().removeprefix('q=')) if params else 1.0
+            except ValueError:
+                accepted[name.strip()] = 0.0
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.variants and accepted.get(encoding, 0) > 0:
+                return encoding
+        return 'identity'
+
+    def not_modified(self, asset):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or any(asset.variant_etag(encoding) in tags for encoding in asset.variants)
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return asset.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def requested_range(self, asset, etag):
+        header = self.headers.get('Range')
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() not in (etag, asset.last_modified):
+            return None
+
+        size = len(asset.variants['identity'])
+        first, _, last = header[len('bytes='):].strip().partition('-')
+        try:
+            if first:
+                start, end = int(first), int(last) if last else size - 1
+            else:
+                start, end = max(0, size - int(last)), size - 1
+        except ValueError:
+            return None
+        if start > end or start >= size:
+            return 'unsatisfiable'
+        return start, min(end, size - 1)
+
+    def log_message(self, format, *args):
+        if os.environ.get('CLIMATEPULSE_STATIC_LOG') == '1':
+            super().log_message(format, *args)
+
 
-with socketserver.TCPServer(("", PORT), CORSRequestHandler) as httpd:
-    print(f"Serving at http://localhost:{PORT}")
-    httpd.serve_forever()
\ No newline at end of file
+if __name__ == '__main__':
+    StaticRequestHandler.site = StaticSite(ROOT)
+    httpd = http.server.ThreadingHTTPServer(('', PORT), StaticRequestHandler)
+    httpd.daemon_threads = True
+    print(f"Serving {ROOT} at http://localhost:{PORT}")
+    httpd.serve_forever()
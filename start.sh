@@ -1,6 +1,6 @@
 #!/bin/sh
+# static frontend: threaded, fingerprinted and precompressed assets on port 8000
 python server.py &
-python backend/app.py & 
-python -m http.server 8000 --directory ./frontend --bind 0.0.0.0 &
 
-tail -f /dev/null
\ No newline at end of file
+# gunicorn runs in the foreground so SIGTERM reaches it for a graceful shutdown
+exec gunicorn -c backend/gunicorn.conf.py app:app
@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from datasets import ADMIN_TOKEN, build_dataset, data_dir
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    # the shipped data at 1x, as the benchmarks generate it
+    path = str(tmp_path_factory.mktemp('data'))
+    build_dataset(path, 1)
+    return path
+
+
+@pytest.fixture(scope='session')
+def loader(dataset):
+    from utils.data_loader import ClimateDataLoader
+    with data_dir(dataset):
+        return ClimateDataLoader(use_snapshot=False)
+
+
+@pytest.fixture(scope='session')
+def reloader(dataset):
+    from utils.data_loader import ClimateDataLoader
+    from utils.reloader import DataReloader
+    with data_dir(dataset):
+        reloader = DataReloader(ClimateDataLoader)
+        reloader.wait()
+    assert reloader.ready(), reloader.status
+    return reloader
+
+
+@pytest.fixture
+def app_module(dataset, reloader, monkeypatch):
+    with data_dir(dataset):
+        import app
+        app.data_reloader.wait()
+    monkeypatch.setattr(app, 'data_reloader', reloader)
+    monkeypatch.setenv('CLIMATEPULSE_DATA_DIR', dataset)
+    monkeypatch.setenv('CLIMATEPULSE_ADMIN_TOKEN', ADMIN_TOKEN)
+    app.response_cache.clear()
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,78 @@
+import numpy as np
+from utils.analytics import PanelCube, pairwise_correlations, to_json_list, trend_slopes, year_over_year
+
+
+def test_correlations_match_numpy_on_complete_data():
+    x = np.random.default_rng(1).normal(size=(50, 4))
+    x[:, 1] += x[:, 0]
+    r, n = pairwise_correlations(x)
+    assert np.allclose(r, np.corrcoef(x, rowvar=False))
+    assert (n == 50).all()
+
+
+def test_correlations_use_pairwise_complete_observations():
+    x = np.random.default_rng(2).normal(size=(30, 3))
+    x[:10, 0] = np.nan
+    x[20:, 2] = np.nan
+    r, n = pairwise_correlations(x)
+    both = ~np.isnan(x[:, 0]) & ~np.isnan(x[:, 2])
+    assert n[0, 2] == both.sum() == 10
+    assert np.isclose(r[0, 2], np.corrcoef(x[both, 0], x[both, 2])[0, 1])
+
+
+def test_correlations_need_three_observations_and_some_spread():
+    x = np.array([[1.0, 2.0, 5.0], [2.0, np.nan, 5.0], [3.0, np.nan, 5.0], [4.0, 1.0, 5.0]])
+    r, n = pairwise_correlations(x)
+    assert n[0, 1] == 2 and np.isnan(r[0, 1])
+    assert np.isnan(r[0, 2])
+
+
+def test_correlations_are_batched_over_leading_axes():
+    x = np.random.default_rng(3).normal(size=(5, 40, 3))
+    r, _ = pairwise_correlations(x)
+    assert r.shape == (5, 3, 3)
+    assert np.allclose(r[2], np.corrcoef(x[2], rowvar=False))
+
+
+def test_trend_slopes_match_a_least_squares_fit():
+    years = np.arange(2000, 2010)
+    values = np.full((2, 10, 1), np.nan)
+    values[0, :, 0] = 3 * (years - 2000) + np.random.default_rng(4).normal(size=10)
+    values[1, [2, 7], 0] = [1.0, 2.0]
+    slopes, n = trend_slopes(values, years)
+    assert np.isclose(slopes[0, 0], np.polyfit(years, values[0, :, 0], 1)[0])
+    assert np.isclose(slopes[1, 0], 0.2) and n[1, 0] == 2
+
+    values[1, 7, 0] = np.nan
+    slopes, _ = trend_slopes(values, years)
+    assert np.isnan(slopes[1, 0])
+
+
+def test_year_over_year_changes():
+    values = np.array([[[2.0], [3.0], [np.nan], [0.0], [1.0]]])
+    absolute, relative = year_over_year(values)
+    assert to_json_list(absolute[0, :, 0]) == [1.0, None, None, 1.0]
+    assert to_json_list(relative[0, :, 0]) == [0.5, None, None, None]
+
+
+def test_trends_and_yoy_build_a_cube_of_their_metric_only(loader):
+    full = PanelCube(loader.wb_store)
+    metric = full.metrics[1]
+    loader.get_trend_slopes(metric)
+    loader.get_year_over_year(metric)
+    cube = loader.panel_cubes[metric]
+    assert cube.metrics == [metric] and cube.values.shape[2] == 1
+    assert all(key == other.metrics[0] for key, other in loader.panel_cubes.items())
+    window = full.window(cube.years[0], cube.years[-1])
+    assert np.array_equal(cube.values[:, :, 0], full.values[:, window, 1], equal_nan=True)
+    assert np.isnan(np.delete(full.values[:, :, 1], np.arange(window.start, window.stop), axis=1)).all()
+
+
+def test_correlations_over_a_metric_subset(loader):
+    full = PanelCube(loader.wb_store)
+    metrics = full.metrics[:2]
+    result = loader.get_correlations(metrics)
+    values = full.values[loader.located][:, :, :2].reshape(-1, 2)
+    matrix, observations = pairwise_correlations(values)
+    assert result['matrix'] == to_json_list(matrix, 4)
+    assert result['observations'] == observations.tolist()
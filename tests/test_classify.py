@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from utils.classify import JENKS_SAMPLE, assign_bins, classify, equal_interval_breaks, jenks_breaks, quantile_breaks
+
+
+def test_quantile_and_equal_interval_breaks():
+    values = np.arange(101, dtype=np.float64)
+    assert quantile_breaks(values, 4).tolist() == [0, 25, 50, 75, 100]
+    assert equal_interval_breaks(np.array([0.0, 3.0, 10.0]), 5).tolist() == [0, 2, 4, 6, 8, 10]
+
+
+def test_jenks_separates_clusters():
+    values = np.concatenate([np.full(10, 1.0), np.full(10, 5.0), np.full(10, 20.0)]) + np.arange(30) * 0.01
+    breaks = jenks_breaks(values, 3)
+    assert breaks[0] == values.min() and breaks[-1] == values.max()
+    assert (assign_bins(values, breaks) == np.repeat([0, 1, 2], 10)).all()
+
+
+def test_jenks_matches_brute_force_on_small_input():
+    values = np.sort(np.random.default_rng(5).gamma(2, size=12))
+
+    def cost(groups):
+        return sum(((group - group.mean()) ** 2).sum() for group in groups)
+
+    best = min(
+        cost(np.split(values, [i, j])) for i in range(1, 11) for j in range(i + 1, 12)
+    )
+    breaks = jenks_breaks(values, 3)
+    assert np.isclose(cost([values[assign_bins(values, breaks) == b] for b in range(3)]), best)
+
+
+def test_jenks_on_large_input_stays_within_the_sample():
+    values = np.random.default_rng(6).lognormal(size=JENKS_SAMPLE * 20)
+    breaks = jenks_breaks(values, 5)
+    assert len(breaks) == 6
+    assert breaks[0] == values.min() and breaks[-1] == values.max()
+    assert (np.diff(breaks) > 0).all()
+
+
+def test_bins_are_upper_inclusive_and_the_first_includes_its_lower_bound():
+    breaks = np.array([0.0, 1.0, 2.0, 3.0])
+    assert assign_bins(np.array([0.0, 0.5, 1.0, 1.5, 2.0, 3.0]), breaks).tolist() == [0, 0, 0, 1, 1, 2]
+
+
+def test_classify_marks_missing_values():
+    breaks, bins = classify(np.array([1.0, np.nan, 3.0, 2.0, np.nan, 4.0]), 'equal_interval', k=3)
+    assert bins.dtype == np.int8
+    assert breaks.tolist() == [1, 2, 3, 4]
+    assert bins.tolist() == [0, -1, 1, 0, -1, 2]
+    with pytest.raises(ValueError):
+        classify(np.array([1.0]), 'natural')
+
+
+def test_precomputed_map_classes_match_the_request_path(reloader, loader):
+    warmed = reloader.loader
+    assert warmed.map_classes
+    metric = warmed.wb_store.metrics[0]
+    years = np.unique(np.asarray(warmed.wb_store.partition(metric).years)).tolist()
+    for year in [None, years[0], years[len(years) // 2]]:
+        for method in ['quantile', 'equal_interval', 'jenks']:
+            assert warmed.get_map_classes(metric, year, method) == loader.get_map_classes(metric, year, method)
+
+    assert (metric, years[-1], 'jenks') in warmed.map_classes
+    with pytest.raises(ValueError):
+        warmed.get_map_classes(metric, years[0] - 1)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from utils.downsample import lttb_indices, select_series
+
+
+def test_lttb_keeps_the_ends_and_the_requested_number_of_points():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 25)
+    keep = lttb_indices(x, y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[237] = 100.0
+    assert 237 in lttb_indices(x, y, 20)
+
+
+def test_lttb_returns_everything_when_asked_for_as_many_points():
+    x = np.arange(10, dtype=np.float64)
+    assert lttb_indices(x, x, 10).tolist() == list(range(10))
+    assert lttb_indices(x, x, 2).tolist() == [0, 9]
+
+
+def test_window_counts_fractional_years_in_their_calendar_year():
+    years = np.array([1999.5, 2000.0, 2000.5, 2001.0, 2001.9, 2002.0])
+    values = np.arange(6, dtype=np.float64)
+    window_years, window_values = select_series(years, values, year_from=2000, year_to=2001)
+    assert window_years.tolist() == [2000.0, 2000.5, 2001.0, 2001.9]
+    assert window_values.tolist() == [1, 2, 3, 4]
+
+
+def test_window_is_downsampled_to_max_points():
+    years = np.arange(1900, 2000)
+    values = np.random.default_rng(0).normal(size=100)
+    window_years, window_values = select_series(years, values, year_from=1950, max_points=10)
+    assert len(window_years) == 10
+    assert window_years[0] == 1950 and window_years[-1] == 1999
+    assert np.isin(window_values, values).all()
+
+
+def test_max_points_below_two_is_rejected():
+    with pytest.raises(ValueError):
+        select_series(np.arange(5), np.arange(5), max_points=1)
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import pandas as pd
+from utils.etl import run_etl
+from utils.metric_mapper import get_indicators
+
+
+def write_raw(data_dir, dataset, entries):
+    os.makedirs(os.path.join(data_dir, 'raw'))
+    shutil.copy(os.path.join(dataset, 'countries_data.json'), data_dir)
+    shutil.copy(os.path.join(dataset, 'nasa_data.json'), os.path.join(data_dir, 'raw'))
+    with open(os.path.join(data_dir, 'raw', 'worldbank_data.json'), 'w') as f:
+        json.dump(entries, f)
+
+
+def test_worldbank_outputs_are_joined_from_per_indicator_parts(dataset, tmp_path, monkeypatch):
+    monkeypatch.setenv('CLIMATEPULSE_DATA_DIR', str(tmp_path))
+    indicators = get_indicators('worldbank')
+    first, second = indicators[0], indicators[1]
+    entries = [
+        {'country': 'Chad', 'year': '2001', 'meaning': first['name'], 'value': 2.5},
+        {'country': 'Brazil', 'year': '2001', 'meaning': first['name'], 'value': 1.0},
+        # the last reading for a country and year wins; missing ones are dropped
+        {'country': 'Chad', 'year': '2001', 'meaning': first['name'], 'value': 3.5},
+        {'country': 'Brazil', 'year': '2000', 'meaning': first['name'], 'value': None},
+        {'country': 'Brazil', 'year': '2000', 'meaning': second['name'], 'value': 0.1},
+        {'country': 'Brazil', 'year': '2001', 'meaning': second['name'], 'value': '7'},
+        {'country': 'Brazil', 'year': '2001', 'meaning': 'Not an indicator', 'value': 9.0}
+    ]
+    write_raw(str(tmp_path), dataset, entries)
+
+    assert run_etl(max_workers=2, log=lambda message: None)['worldbank'] == 'built'
+    with open(tmp_path / 'worldbank_data.json') as f:
+        rows = json.load(f)
+    assert rows == [
+        {'country': 'Brazil', 'year': '2001', 'meaning': first['name'], 'value': 1.0},
+        {'country': 'Chad', 'year': '2001', 'meaning': first['name'], 'value': 3.5},
+        {'country': 'Brazil', 'year': '2000', 'meaning': second['name'], 'value': 0.1},
+        {'country': 'Brazil', 'year': '2001', 'meaning': second['name'], 'value': 7.0}
+    ]
+
+    # the merged wide table is the pivot of the long rows
+    long = pd.DataFrame(rows).astype({'year': int})
+    columns = {indicator['name']: indicator['column'] for indicator in indicators}
+    expected = long.assign(column=long['meaning'].map(columns)).pivot(
+        index=['country', 'year'], columns='column', values='value'
+    )
+    expected = expected[[columns[name] for name in sorted(columns) if columns[name] in expected.columns]]
+    wide = pd.read_csv(tmp_path / 'worldbank_data.csv', index_col=['country', 'year'])
+    pd.testing.assert_frame_equal(wide, expected.rename_axis(columns=None))
+
+    # the spooled rows and parts are gone
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.etl-')]
@@ -0,0 +1,41 @@
+import threading
+import pytest
+import utils.data_loader
+from datasets import data_dir
+from utils.data_loader import ClimateDataLoader
+
+
+def test_reload_precomputes_every_forecast_table(reloader):
+    loader = reloader.loader
+    assert set(loader.forecast_tables) == set(loader.wb_store.metrics)
+    forecast = loader.get_forecast('co2', n_years=3)
+    assert forecast['countries'] and all(len(values['years']) == 3 for values in forecast['countries'].values())
+
+
+def test_a_fit_on_first_use_only_blocks_its_own_indicator(dataset, monkeypatch):
+    with data_dir(dataset):
+        loader = ClimateDataLoader(use_snapshot=False)
+    build = utils.data_loader.build_forecast_table
+    release = threading.Event()
+
+    def slow_build(store, models=None, metrics=None):
+        if metrics == ['co2']:
+            release.wait(10)
+        return build(store, models, max_workers=1, metrics=metrics)
+
+    monkeypatch.setattr(utils.data_loader, 'build_forecast_table', slow_build)
+    blocked = threading.Thread(target=loader.load_forecast_table, args=('co2',))
+    blocked.start()
+    try:
+        assert 'forest' in loader.load_forecast_table('forest').last_years
+        assert loader.load_forecast_models()
+        assert blocked.is_alive()
+    finally:
+        release.set()
+        blocked.join()
+    assert 'co2' in loader.forecast_tables
+
+
+def test_unknown_metric_has_no_forecast_table(reloader):
+    with pytest.raises(ValueError):
+        reloader.loader.has_forecast_table('nope')
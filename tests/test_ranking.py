@@ -0,0 +1,39 @@
+import numpy as np
+from utils.columnar_store import SeriesPartition
+from utils.ranking import compute_aggregates, top_n
+
+
+def test_top_n_orders_by_value_and_skips_missing_ones():
+    values = np.array([3.0, np.nan, 7.0, 1.0, 7.0, 5.0])
+    assert top_n(values, 3).tolist() == [2, 4, 5]
+    assert top_n(values, 2, ascending=True).tolist() == [3, 0]
+
+
+def test_top_n_limits():
+    values = np.array([2.0, np.nan, 1.0])
+    assert top_n(values, 0).tolist() == []
+    # a limit past the number of values, or a negative one, returns all of them
+    assert top_n(values, 10).tolist() == [0, 2]
+    assert top_n(values, -1).tolist() == [0, 2]
+
+
+def test_aggregates_over_a_year_window():
+    partition = SeriesPartition.from_codes(
+        3,
+        country_codes=[0, 0, 0, 2, 2],
+        years=[2000, 2001, 2002, 2000, 2002],
+        values=[1.0, 2.0, 4.0, 10.0, 5.0]
+    )
+    aggregates = compute_aggregates(partition, 3, year_from=2000, year_to=2002)
+    assert aggregates['mean'][[0, 2]].tolist() == [7 / 3, 7.5]
+    assert aggregates['latest'][[0, 2]].tolist() == [4.0, 5.0]
+    assert aggregates['min'][[0, 2]].tolist() == [1.0, 5.0]
+    assert aggregates['max'][[0, 2]].tolist() == [4.0, 10.0]
+    assert np.isclose(aggregates['growth'][0], 1.0)
+    assert np.isclose(aggregates['growth'][2], 0.5 ** 0.5 - 1)
+    assert all(np.isnan(aggregates[name][1]) for name in aggregates)
+
+    later = compute_aggregates(partition, 3, year_from=2001)
+    assert later['mean'][[0, 2]].tolist() == [3.0, 5.0]
+    # a single year has no growth
+    assert np.isnan(later['growth'][2])
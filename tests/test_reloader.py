@@ -0,0 +1,39 @@
+import time
+from utils.reloader import DataReloader
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_reload_request_reaches_every_watching_process(dataset, loader, monkeypatch):
+    # two reloaders over one data directory stand in for two gunicorn workers
+    monkeypatch.setenv('CLIMATEPULSE_DATA_DIR', dataset)
+    builds = {'receiver': 0, 'other': 0}
+
+    def factory(name):
+        def build():
+            builds[name] += 1
+            return loader
+        return build
+
+    receiver = DataReloader(factory('receiver'))
+    other = DataReloader(factory('other'))
+    receiver.wait()
+    other.wait()
+    assert other.scope() == 'this process'
+    receiver.watch(0.05)
+    other.watch(0.05)
+    assert other.scope() == 'all workers'
+
+    time.sleep(0.2)
+    assert builds == {'receiver': 1, 'other': 1}
+
+    assert receiver.request_reload()
+    wait_for(lambda: builds['other'] == 2 and builds['receiver'] == 2)
+    time.sleep(0.2)
+    assert builds == {'receiver': 2, 'other': 2}
+    assert receiver.ready() and other.ready()
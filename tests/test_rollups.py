@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from utils.columnar_store import ColumnarStore
+from utils.rollups import Rollups
+
+
+@pytest.fixture
+def rollups():
+    # countries 0 and 1 are in Europe, 2 in Asia, 3 has no region
+    store = ColumnarStore.from_codes(
+        ['A', 'B', 'C', 'D'], ['co2'],
+        country_codes=[0, 0, 1, 2, 2, 3],
+        metric_codes=[0] * 6,
+        years=[2000, 2001, 2000, 2000, 2001, 2000],
+        values=[1.0, 2.0, 3.0, 10.0, 20.0, 100.0]
+    )
+    return Rollups(store, ['Europe', 'Europe', 'Asia', None])
+
+
+def test_regions_and_world(rollups):
+    assert rollups.describe() == [
+        {'region': 'Asia', 'countries': 1}, {'region': 'Europe', 'countries': 2}, {'region': 'World', 'countries': 3}
+    ]
+
+
+def test_sums_means_and_coverage(rollups):
+    result = rollups.get('co2')
+    assert result['Europe'] == {
+        'years': [2000, 2001], 'sum': [4.0, 2.0], 'mean': [2.0, 2.0], 'countries': [2, 1], 'coverage': [1.0, 0.5]
+    }
+    # a country without a region is left out of the world row too
+    assert result['World']['sum'] == [14.0, 22.0]
+    assert result['World']['coverage'] == [1.0, 0.6667]
+
+
+def test_region_and_year_window(rollups):
+    assert list(rollups.get('co2', region=' asia ', year_from=2001)) == ['Asia']
+    assert rollups.get('co2', region='asia', year_from=2001)['Asia']['years'] == [2001]
+    with pytest.raises(ValueError):
+        rollups.get('co2', region='Atlantis')
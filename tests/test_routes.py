@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+from urllib.parse import quote
+import pytest
+from bench_routes import CASES, ROUTES
+from datasets import ADMIN_TOKEN, data_dir
+
+
+def test_routes_wait_for_the_first_build(app_module, client, monkeypatch):
+    built = app_module.data_reloader.loader
+    release = threading.Event()
+    reloader = type(app_module.data_reloader)(lambda: release.wait() and built)
+    monkeypatch.setattr(app_module, 'data_reloader', reloader)
+    assert client.get('/api/ready').status_code == 503
+    assert client.get('/api/top/co2').status_code == 503
+    assert client.get('/api/health').status_code == 200
+
+    release.set()
+    reloader.wait()
+    assert client.get('/api/ready').status_code == 200
+    assert client.get('/api/top/co2').status_code == 200
+
+
+@pytest.mark.parametrize('endpoint', ['admin_reload', 'admin_profiler'])
+@pytest.mark.parametrize('token', [None, '', 'wrong'])
+def test_admin_routes_need_the_token(client, monkeypatch, endpoint, token):
+    if token is None:
+        monkeypatch.delenv('CLIMATEPULSE_ADMIN_TOKEN')
+    headers = {} if token is None else {'X-Admin-Token': token}
+    assert client.get(ROUTES[endpoint][0], headers=headers).status_code == 403
+
+
+def reject_constant(name):
+    raise ValueError(f'{name} is not valid JSON')
+
+
+@pytest.mark.parametrize('endpoint, url', CASES, ids=[url for _, url in CASES])
+def test_routes_serve_strict_json(client, endpoint, url):
+    response = client.get(url, headers={'X-Admin-Token': ADMIN_TOKEN})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    if response.mimetype == 'application/json':
+        json.loads(response.get_data(as_text=True), parse_constant=reject_constant)
+
+
+def test_unchanged_response_revalidates_with_304(client):
+    first = client.get('/api/top/co2?limit=5')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get('/api/top/co2?limit=5', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag and not again.get_data()
+    other = client.get('/api/top/co2?limit=6', headers={'If-None-Match': etag})
+    assert other.status_code == 200 and other.headers['ETag'] != etag
+
+
+def test_compressed_variant_has_its_own_etag(client):
+    plain = client.get('/api/balance')
+    gzipped = client.get('/api/balance', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+    assert 'Accept-Encoding' in gzipped.headers['Vary']
+
+    # either variant's tag revalidates the entry
+    revalidated = client.get('/api/balance', headers={'If-None-Match': plain.headers['ETag'], 'Accept-Encoding': 'gzip'})
+    assert revalidated.status_code == 304
+
+
+def test_cache_is_dropped_when_the_loader_changes(app_module, client):
+    cache = app_module.response_cache
+    client.get('/api/top/co2')
+    assert len(cache.entries) == 1
+    cache.lookup(('/api/top/co2', ()), object())
+    assert len(cache.entries) == 0
+
+
+BATCH_QUERIES = ['/api/nasa/sea-level?max_points=20', '/api/top/co2?limit=3']
+
+
+def batch_url(queries):
+    return '/api/batch?' + '&'.join('q=' + quote(query) for query in queries)
+
+
+def test_batch_answers_in_query_order_whatever_was_cached(client):
+    forward = client.get(batch_url(BATCH_QUERIES)).get_json()['results']
+    backward = client.get(batch_url(BATCH_QUERIES[::-1])).get_json()['results']
+    assert [result['query'] for result in forward] == BATCH_QUERIES
+    assert [result['query'] for result in backward] == BATCH_QUERIES[::-1]
+    assert backward == forward[::-1]
+
+
+def test_async_batch_answers_in_query_order_whatever_was_cached(dataset):
+    from aiohttp.test_utils import TestClient, TestServer
+    with data_dir(dataset):
+        import async_app
+        async_app.data_reloader.wait()
+
+    async def fetch():
+        async with TestClient(TestServer(async_app.create_app())) as async_client:
+            results = []
+            for queries in (BATCH_QUERIES, BATCH_QUERIES[::-1]):
+                response = await async_client.get(batch_url(queries))
+                results.append([result['query'] for result in (await response.json())['results']])
+            return results
+
+    assert asyncio.run(fetch()) == [BATCH_QUERIES, BATCH_QUERIES[::-1]]
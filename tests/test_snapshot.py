@@ -0,0 +1,65 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from datasets import data_dir
+from utils.data_loader import ClimateDataLoader
+from utils.snapshot import MANIFEST_NAME, read_snapshot, write_snapshot
+
+
+@pytest.fixture
+def snapshot_loader(loader, dataset, tmp_path):
+    # a private copy of the dataset, so the snapshot can be broken freely
+    path = str(tmp_path / 'data')
+    shutil.copytree(dataset, path, ignore=shutil.ignore_patterns('snapshot*'))
+    with data_dir(path):
+        source = ClimateDataLoader(use_snapshot=False)
+        write_snapshot(source.snapshot_path, source, source.source_paths())
+        yield source, lambda: ClimateDataLoader()
+
+
+def data_file(snapshot_path):
+    return next(os.path.join(snapshot_path, name) for name in os.listdir(snapshot_path) if name.endswith('.bin'))
+
+
+def open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def test_snapshot_round_trip_maps_one_file(snapshot_loader):
+    source, build = snapshot_loader
+    before = open_fds()
+    loader = build()
+    assert loader.wb_store is not source.wb_store and loader.wb_store.partitions == {}
+    for metric in source.wb_store.metrics:
+        expected, actual = source.wb_store.partition(metric), loader.wb_store.partition(metric)
+        for name in expected.COLUMNS:
+            assert np.array_equal(getattr(expected, name), getattr(actual, name))
+    assert loader.nasa_data == source.nasa_data
+    assert open_fds() - before <= 1
+
+
+def test_a_loader_keeps_the_snapshot_it_read(snapshot_loader):
+    source, build = snapshot_loader
+    loader = build()
+    metric = loader.wb_store.metrics[0]
+    write_snapshot(source.snapshot_path, source, source.source_paths())
+    write_snapshot(source.snapshot_path, source, source.source_paths())
+    assert np.array_equal(loader.wb_store.partition(metric).values, source.wb_store.partition(metric).values)
+
+
+@pytest.mark.parametrize('damage', ['missing data', 'truncated data', 'missing manifest'])
+def test_a_broken_snapshot_falls_back_to_the_sources(snapshot_loader, damage):
+    source, build = snapshot_loader
+    if damage == 'missing data':
+        os.remove(data_file(source.snapshot_path))
+    elif damage == 'truncated data':
+        with open(data_file(source.snapshot_path), 'r+b') as f:
+            f.truncate(100)
+    else:
+        os.remove(os.path.join(source.snapshot_path, MANIFEST_NAME))
+    assert read_snapshot(source.snapshot_path, source.source_paths()) is None
+    loader = build()
+    # parsed from the sources: no manifest row counts
+    assert loader.wb_store.row_counts is None
+    assert len(loader.wb_store) == len(source.wb_store)
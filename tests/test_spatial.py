@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from utils.spatial import CentroidGrid, angular_distance, parse_bbox, EARTH_RADIUS_KM
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(7)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, 400)))
+    longitudes = rng.uniform(-180, 180, 400)
+    return latitudes, longitudes
+
+
+def test_parse_bbox():
+    assert parse_bbox('-10,35,30,60') == (-10.0, 35.0, 30.0, 60.0)
+    for text in ('1,2,3', 'a,b,c,d', '0,50,10,40', '0,-95,10,40'):
+        with pytest.raises(ValueError):
+            parse_bbox(text)
+
+
+@pytest.mark.parametrize('bbox', [(-10, 35, 30, 60), (170, -40, -170, 10), (-180, -90, 180, 90), (5, 5, 5.5, 5.5)])
+def test_within_matches_a_full_scan(points, bbox):
+    latitudes, longitudes = points
+    grid = CentroidGrid(np.arange(len(latitudes)), latitudes, longitudes)
+    west, south, east, north = bbox
+    inside = (latitudes >= south) & (latitudes <= north)
+    inside &= ((longitudes >= west) & (longitudes <= east)) if west <= east else ((longitudes >= west) | (longitudes <= east))
+    assert grid.within(*bbox).tolist() == np.flatnonzero(inside).tolist()
+
+
+@pytest.mark.parametrize('query', [(0, 0), (51.5, -0.1), (-89, 179), (89.9, 0), (10, -179.9)])
+def test_nearest_matches_a_full_scan(points, query):
+    latitudes, longitudes = points
+    grid = CentroidGrid(np.arange(len(latitudes)), latitudes, longitudes)
+    found, distances = grid.nearest(*query, k=5)
+    expected = np.radians(angular_distance(*query, latitudes, longitudes)) * EARTH_RADIUS_KM
+    order = np.lexsort((np.arange(len(expected)), expected))[:5]
+    assert found.tolist() == order.tolist()
+    assert np.allclose(distances, expected[order])
+
+
+def test_nearest_with_more_neighbours_than_points():
+    grid = CentroidGrid(['a', 'b'], [0, 10], [0, 10])
+    found, _ = grid.nearest(0, 0, k=5)
+    assert found.tolist() == [0, 1]